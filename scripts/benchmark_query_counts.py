@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+エンドポイント別SQLクエリ数ベンチマーク
+
+ランドマーク・人流系エンドポイントが1リクエストあたり何回DBに問い合わせるかを計測し、
+行ごとの座標取得（N+1）が再発していないかを確認する回帰チェック。
+DATABASE_URLが指すデータベースにデータが投入済みであることが前提。
+
+使い方:
+    cd src/backend && python ../../scripts/benchmark_query_counts.py
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+# バックエンドのappパッケージをインポートできるようにする
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "backend"))
+
+import httpx
+from sqlalchemy import event
+
+from app.main import app
+from app.core.database import async_engine
+
+# 広島県全域
+BOUNDS = {"north": 34.9, "south": 34.0, "east": 133.3, "west": 132.0}
+
+# (名前, パス, パラメータ, 許容クエリ数)
+ENDPOINTS = [
+    ("landmarks/list", "/api/v1/landmarks/list", {**BOUNDS, "limit": 200}, 1),
+    ("landmarks/nearby", "/api/v1/landmarks/nearby/34.3955/132.4536", {"radius": 5000, "limit": 50}, 1),
+    ("mobility/flows", "/api/v1/mobility/flows", {**BOUNDS, "min_flow_count": 0, "limit": 200}, 1),
+    ("mobility/heatmap", "/api/v1/mobility/heatmap", BOUNDS, 1),
+    ("mobility/accommodation", "/api/v1/mobility/accommodation", {}, 1),
+    ("mobility/consumption", "/api/v1/mobility/consumption", {}, 1),
+]
+
+
+class QueryCounter:
+    """エンジンで実行されたSQL文を数える"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.count += 1
+
+
+def count_items(payload) -> int:
+    """レスポンス内の件数（features / facilities / top_stores / landmarks）"""
+    if not isinstance(payload, dict):
+        return 0
+    for key in ("features", "facilities", "top_stores", "landmarks"):
+        if key in payload:
+            return len(payload[key])
+    return 0
+
+
+async def run_benchmark() -> bool:
+    counter = QueryCounter()
+    event.listen(async_engine.sync_engine, "before_cursor_execute", counter)
+
+    all_passed = True
+    async with httpx.AsyncClient(app=app, base_url="http://localhost") as client:
+        print(f"{'endpoint':<26}{'status':>8}{'items':>8}{'queries':>9}{'budget':>8}{'ms':>10}")
+        print("-" * 69)
+
+        for name, path, params, budget in ENDPOINTS:
+            # 接続確立時の初期化クエリを除外するため1回空打ちする
+            await client.get(path, params=params)
+
+            counter.count = 0
+            started = time.perf_counter()
+            response = await client.get(path, params=params)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+
+            items = count_items(response.json()) if response.status_code == 200 else 0
+            passed = response.status_code == 200 and counter.count <= budget
+            all_passed = all_passed and passed
+
+            mark = "" if passed else "  NG"
+            print(f"{name:<26}{response.status_code:>8}{items:>8}{counter.count:>9}{budget:>8}{elapsed_ms:>10.1f}{mark}")
+
+    event.remove(async_engine.sync_engine, "before_cursor_execute", counter)
+    await async_engine.dispose()
+    return all_passed
+
+
+def main():
+    """メイン処理"""
+    passed = asyncio.run(run_benchmark())
+    if not passed:
+        print("\nクエリ数が上限を超えたエンドポイントがあります")
+        sys.exit(1)
+    print("\n全エンドポイントが1リクエスト1クエリ以内で応答しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,8 @@
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'backend', 'app'))
+# 収集モジュールが使う共有HTTPクライアント（app.core.http_client）用
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'backend'))
 
 import asyncio
 import logging
@@ -77,20 +79,18 @@ async def download_phase1_basic_data():
     return results
 
 
-def collect_phase2_api_data():
-    """フェーズ2: API経由のデータ収集"""
+async def collect_phase2_api_data():
+    """フェーズ2: API経由のデータ収集（気象とイベントは同時に収集）"""
     logger.info("=== Phase 2: Collecting API Data ===")
     
     results = {}
     
-    # 1. 気象データ（Open-Meteo）
-    weather = WeatherCollector()
-    weather_data = weather.collect_all_weather()
+    # 1. 気象データ（Open-Meteo）、2. イベントデータ
+    weather_data, event_data = await asyncio.gather(
+        WeatherCollector().collect_all_weather(),
+        EventCollector().collect_all_event_data()
+    )
     results["weather"] = len(weather_data)
-    
-    # 2. イベントデータ
-    event = EventCollector()
-    event_data = event.collect_all_event_data()
     results["events"] = event_data
     
     return results
@@ -226,7 +226,7 @@ async def main():
         all_results["phase1_basic"] = phase1_results
         
         # フェーズ2: APIデータ
-        phase2_results = collect_phase2_api_data()
+        phase2_results = await collect_phase2_api_data()
         all_results["phase2_api"] = phase2_results
         
         # フェーズ3: 交通データ
@@ -10,10 +10,16 @@ import os
 import sys
 import json
 import csv
+import hashlib
+import shutil
+import tempfile
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from pathlib import Path
+import argparse
 import psycopg2
+from psycopg2 import sql
 from psycopg2.extras import execute_batch
 import logging
 
@@ -53,12 +59,331 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+# GTFSファイルの読み込み順（外部キーの依存順）
+GTFS_LOAD_ORDER = [
+    "agency.txt",
+    "routes.txt",
+    "stops.txt",
+    "calendar.txt",
+    "trips.txt",
+    "stop_times.txt",
+    "shapes.txt",
+    "calendar_dates.txt",
+    "fare_attributes.txt",
+    "fare_rules.txt",
+    "translations.txt",
+]
+
+# 並列ロード時のステージ（同じステージ内のファイルは互いに依存しない）
+# agency → routes → trips → stop_times、calendar → calendar_dates / trips、
+# fare_attributes → fare_rules の外部キー順を守る
+GTFS_LOAD_STAGES = [
+    ["agency.txt", "stops.txt", "calendar.txt"],
+    ["routes.txt", "calendar_dates.txt", "fare_attributes.txt"],
+    ["trips.txt", "fare_rules.txt"],
+    ["stop_times.txt", "shapes.txt", "translations.txt"],
+]
+
+# 行単位ロード用のメソッド
+GTFS_ROW_LOADERS = {
+    "agency.txt": "_load_agency",
+    "routes.txt": "_load_routes",
+    "stops.txt": "_load_stops",
+    "calendar.txt": "_load_calendar",
+    "trips.txt": "_load_trips",
+    "stop_times.txt": "_load_stop_times",
+    "shapes.txt": "_load_shapes",
+    "calendar_dates.txt": "_load_calendar_dates",
+    "fare_attributes.txt": "_load_fare_attributes",
+    "fare_rules.txt": "_load_fare_rules",
+    "translations.txt": "_load_translations",
+}
+
+# 一括ロード（COPY）用のファイル定義
+# columns: (列名, 型, ファイルに列がない・空の場合の既定値SQL)
+# conflict: 主キー（Noneの場合はON CONFLICTなしで追記）
+# update: 主キー重複時に更新する列（行単位ロードと同じ列）
+BULK_LOAD_SPECS = {
+    "agency.txt": {
+        "table": "gtfs_agency",
+        "columns": [
+            ("agency_id", "text", None),
+            ("agency_name", "text", None),
+            ("agency_url", "text", None),
+            ("agency_timezone", "text", "'Asia/Tokyo'"),
+            ("agency_lang", "text", "'ja'"),
+            ("agency_phone", "text", None),
+            ("agency_fare_url", "text", None),
+        ],
+        "conflict": ["agency_id"],
+        "update": ["agency_name", "agency_url"],
+    },
+    "routes.txt": {
+        "table": "gtfs_routes",
+        "columns": [
+            ("route_id", "text", None),
+            ("agency_id", "text", None),
+            ("route_short_name", "text", None),
+            ("route_long_name", "text", None),
+            ("route_desc", "text", None),
+            ("route_type", "int", "3"),  # 3 = バス
+            ("route_url", "text", None),
+            ("route_color", "text", None),
+            ("route_text_color", "text", None),
+            ("route_sort_order", "int", None),
+        ],
+        "conflict": ["route_id"],
+        "update": ["route_long_name", "route_desc"],
+    },
+    "stops.txt": {
+        "table": "gtfs_stops",
+        "columns": [
+            ("stop_id", "text", None),
+            ("stop_code", "text", None),
+            ("stop_name", "text", None),
+            ("stop_desc", "text", None),
+            ("stop_lat", "float", "0"),
+            ("stop_lon", "float", "0"),
+            ("zone_id", "text", None),
+            ("stop_url", "text", None),
+            ("location_type", "int", "0"),
+            ("parent_station", "text", None),
+            ("stop_timezone", "text", None),
+            ("wheelchair_boarding", "int", None),
+            ("platform_code", "text", None),
+            ("geom", "point", None),
+        ],
+        "conflict": ["stop_id"],
+        "update": ["stop_name", "stop_lat", "stop_lon", "geom"],
+    },
+    "calendar.txt": {
+        "table": "gtfs_calendar",
+        "columns": [
+            ("service_id", "text", None),
+            ("monday", "bool", None),
+            ("tuesday", "bool", None),
+            ("wednesday", "bool", None),
+            ("thursday", "bool", None),
+            ("friday", "bool", None),
+            ("saturday", "bool", None),
+            ("sunday", "bool", None),
+            ("start_date", "date", None),
+            ("end_date", "date", None),
+        ],
+        "conflict": ["service_id"],
+        "update": [
+            "monday", "tuesday", "wednesday", "thursday", "friday",
+            "saturday", "sunday", "start_date", "end_date"
+        ],
+    },
+    "trips.txt": {
+        "table": "gtfs_trips",
+        "columns": [
+            ("trip_id", "text", None),
+            ("route_id", "text", None),
+            ("service_id", "text", None),
+            ("trip_headsign", "text", None),
+            ("trip_short_name", "text", None),
+            ("direction_id", "int", None),
+            ("block_id", "text", None),
+            ("shape_id", "text", None),
+            ("wheelchair_accessible", "int", None),
+            ("bikes_allowed", "int", None),
+        ],
+        "conflict": ["trip_id"],
+        "update": ["trip_headsign"],
+    },
+    "stop_times.txt": {
+        "table": "gtfs_stop_times",
+        "columns": [
+            ("trip_id", "text", None),
+            ("arrival_time", "time", None),
+            ("departure_time", "time", None),
+            ("arrival_sec", "seconds", None),
+            ("departure_sec", "seconds", None),
+            ("stop_id", "text", None),
+            ("stop_sequence", "int", "0"),
+            ("stop_headsign", "text", None),
+            ("pickup_type", "int", "0"),
+            ("drop_off_type", "int", "0"),
+            ("shape_dist_traveled", "float", None),
+            ("timepoint", "int", None),
+        ],
+        "conflict": ["trip_id", "stop_sequence"],
+        "update": ["arrival_time", "departure_time", "arrival_sec", "departure_sec"],
+    },
+    "shapes.txt": {
+        "table": "gtfs_shapes",
+        "columns": [
+            ("shape_id", "text", None),
+            ("shape_pt_lat", "float", "0"),
+            ("shape_pt_lon", "float", "0"),
+            ("shape_pt_sequence", "int", "0"),
+            ("shape_dist_traveled", "float", None),
+        ],
+        "conflict": ["shape_id", "shape_pt_sequence"],
+        "update": ["shape_pt_lat", "shape_pt_lon"],
+    },
+    "calendar_dates.txt": {
+        "table": "gtfs_calendar_dates",
+        "columns": [
+            ("service_id", "text", None),
+            ("date", "date", None),
+            ("exception_type", "int", "1"),
+        ],
+        "conflict": ["service_id", "date"],
+        "update": ["exception_type"],
+    },
+    "fare_attributes.txt": {
+        "table": "gtfs_fare_attributes",
+        "columns": [
+            ("fare_id", "text", None),
+            ("price", "float", "0"),
+            ("currency_type", "text", "'JPY'"),
+            ("payment_method", "int", "0"),
+            ("transfers", "int", None),
+            ("agency_id", "text", None),
+            ("transfer_duration", "int", None),
+        ],
+        "conflict": ["fare_id"],
+        "update": ["price"],
+    },
+    "fare_rules.txt": {
+        "table": "gtfs_fare_rules",
+        "columns": [
+            ("fare_id", "text", None),
+            ("route_id", "text", None),
+            ("origin_id", "text", None),
+            ("destination_id", "text", None),
+            ("contains_id", "text", None),
+        ],
+        "conflict": None,
+        "update": [],
+    },
+    "translations.txt": {
+        "table": "gtfs_translations",
+        "columns": [
+            ("table_name", "text", None),
+            ("field_name", "text", None),
+            ("language", "text", None),
+            ("translation", "text", None),
+            ("record_id", "text", None),
+            ("record_sub_id", "text", None),
+            ("field_value", "text", None),
+        ],
+        "conflict": None,
+        "update": [],
+    },
+}
+
+
+# ZIPアーカイブ自体のハッシュを記録するマニフェスト上のファイル名
+ARCHIVE_MANIFEST_NAME = "*archive*"
+
+# 統合後にリフレッシュする分析用マテリアライズドビュー
+SUMMARY_VIEWS = ("v_route_stop_count", "v_stop_density", "v_service_frequency")
+
+# 差分削除時にキー（TEXT配列）を対象テーブルの型に戻すための型名
+BULK_KIND_SQL_TYPES = {
+    "text": "text",
+    "int": "integer",
+    "float": "double precision",
+    "bool": "boolean",
+    "date": "date",
+    "time": "time",
+    "seconds": "integer",
+}
+
+
+def _gtfs_time_to_seconds(time_str):
+    """
+    GTFS時刻（H:MM:SS、24時以降も可）を0時からの秒数に変換
+    stop_timesの全行で呼ばれるため正規表現を使わずに分割する
+    """
+    if not time_str:
+        return None
+    hours, _, rest = time_str.partition(':')
+    minutes, separator, seconds = rest.partition(':')
+    if not separator:
+        return None
+    try:
+        return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+    except ValueError:
+        return None
+
+
+def _file_hash(file_path):
+    """ファイル内容のSHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _bulk_column_expression(name, kind, default, header):
+    """ステージング列（すべてTEXT）から対象テーブルの型に変換するSQL式を生成"""
+    if kind == "point":
+        # 停留所の座標からPostGISのPOINTジオメトリを作成
+        lon = _bulk_column_expression("stop_lon", "float", "0", header)
+        lat = _bulk_column_expression("stop_lat", "float", "0", header)
+        return f"ST_SetSRID(ST_MakePoint({lon}, {lat}), 4326)"
+    
+    if kind == "seconds":
+        # arrival_sec ← arrival_time のように対応する時刻列から秒数を求める（24時以降もそのまま）
+        source_name = name[:-len("_sec")] + "_time"
+        if source_name not in header:
+            return "NULL::integer"
+        source = '"' + source_name.replace('"', '""') + '"'
+        return f"EXTRACT(EPOCH FROM NULLIF(TRIM({source}), '')::interval)::integer"
+    
+    if name not in header:
+        # 定数のままだとDISTINCT ON / ORDER BYで使えないため型を明示する
+        value = default if default is not None else ("''" if kind == "text" else "NULL")
+        return f"{value}::{BULK_KIND_SQL_TYPES[kind]}"
+    
+    source = '"' + name.replace('"', '""') + '"'
+    if kind == "text":
+        return source
+    
+    value = f"NULLIF(TRIM({source}), '')"
+    if kind == "int":
+        expression = f"{value}::integer"
+    elif kind == "float":
+        expression = f"{value}::double precision"
+    elif kind == "bool":
+        return f"COALESCE({value}, '0')::integer <> 0"
+    elif kind == "date":
+        expression = f"to_date({value}, 'YYYYMMDD')"
+    elif kind == "time":
+        # 24時間を超える時刻は interval → time の変換で24時間以内に正規化される
+        expression = f"{value}::interval::time"
+    else:
+        raise ValueError(f"unknown column kind: {kind}")
+    
+    return f"COALESCE({expression}, {default})" if default is not None else expression
+
+
+def _bulk_select_columns(spec, header):
+    """対象テーブルの列名と、ステージングからの変換式のリスト"""
+    columns = [name for name, _, _ in spec["columns"]]
+    expressions = [
+        _bulk_column_expression(name, kind, default, header)
+        for name, kind, default in spec["columns"]
+    ]
+    return columns, expressions
+
+
 class GTFSIntegrator:
     """GTFSデータをPostgreSQLに統合するクラス"""
     
-    def __init__(self):
+    def __init__(self, bulk=False, incremental=False):
         self.conn = None
         self.cursor = None
+        # Trueの場合はCOPY＋集合演算の一括ロードを使用
+        self.bulk = bulk
+        # Trueの場合はマニフェストと比較し、変更のあったファイルの差分のみ反映
+        self.incremental = incremental
         # Check if running in Docker container
         if os.path.exists("/uesugi-engine-data"):
             self.data_dir = Path("/uesugi-engine-data")
@@ -187,6 +512,8 @@ class GTFSIntegrator:
             trip_id VARCHAR(255),
             arrival_time TIME,
             departure_time TIME,
+            arrival_sec INTEGER,
+            departure_sec INTEGER,
             stop_id VARCHAR(255),
             stop_sequence INTEGER,
             stop_headsign VARCHAR(255),
@@ -264,17 +591,54 @@ class GTFSIntegrator:
             updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
         
+        -- フィードマニフェスト（差分取り込み用：ファイルごとのハッシュ・版・行数）
+        CREATE TABLE IF NOT EXISTS gtfs_feed_manifest (
+            feed_key VARCHAR(512),
+            file_name VARCHAR(255),
+            content_hash CHAR(64),
+            feed_version VARCHAR(255),
+            row_count INTEGER,
+            loaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (feed_key, file_name)
+        );
+        
+        -- フィードの行キーと行ハッシュ（差分取り込み用）
+        CREATE TABLE IF NOT EXISTS gtfs_feed_rows (
+            feed_key VARCHAR(512),
+            file_name VARCHAR(255),
+            row_key TEXT[],
+            row_hash CHAR(32),
+            PRIMARY KEY (feed_key, file_name, row_key)
+        );
+        
+        -- 既存の時刻表テーブルに秒数列を追加（24時以降の時刻を保持する）
+        ALTER TABLE gtfs_stop_times ADD COLUMN IF NOT EXISTS arrival_sec INTEGER;
+        ALTER TABLE gtfs_stop_times ADD COLUMN IF NOT EXISTS departure_sec INTEGER;
+        
         -- インデックス作成
         CREATE INDEX IF NOT EXISTS idx_gtfs_stops_geom ON gtfs_stops USING GIST (geom);
         CREATE INDEX IF NOT EXISTS idx_gtfs_stop_times_stop_id ON gtfs_stop_times (stop_id);
         CREATE INDEX IF NOT EXISTS idx_gtfs_stop_times_trip_id ON gtfs_stop_times (trip_id);
+        CREATE INDEX IF NOT EXISTS idx_gtfs_stop_times_stop_departure ON gtfs_stop_times (stop_id, departure_sec);
         CREATE INDEX IF NOT EXISTS idx_gtfs_trips_route_id ON gtfs_trips (route_id);
         CREATE INDEX IF NOT EXISTS idx_gtfs_trips_service_id ON gtfs_trips (service_id);
         CREATE INDEX IF NOT EXISTS idx_gtfs_shapes_shape_id ON gtfs_shapes (shape_id);
         """
         
+        # 秒数列が未設定の時刻表が残っている場合は、差分取り込みで再読み込みされるよう
+        # stop_times.txtとアーカイブのマニフェストを破棄する
+        backfill_sql = f"""
+        DELETE FROM gtfs_feed_manifest
+        WHERE file_name IN ('stop_times.txt', '{ARCHIVE_MANIFEST_NAME}')
+          AND EXISTS (
+              SELECT 1 FROM gtfs_stop_times
+              WHERE departure_sec IS NULL AND departure_time IS NOT NULL
+          )
+        """
+        
         try:
             self.cursor.execute(tables_sql)
+            self.cursor.execute(backfill_sql)
             self.conn.commit()
             logger.info("GTFSテーブルの作成が完了しました")
         except Exception as e:
@@ -286,6 +650,21 @@ class GTFSIntegrator:
         """GTFSデータを読み込んでデータベースに挿入"""
         logger.info(f"{region}のGTFSデータを読み込んでいます...")
         
+        for feed in self._find_gtfs_feeds(region):
+            logger.info(f"GTFSファイルを処理中: {feed}")
+            if self.incremental:
+                self._process_feed_incremental(feed)
+            elif feed.is_dir():
+                self._process_operator_gtfs(feed)
+            else:
+                self._process_gtfs_zip(feed)
+                
+    def _find_gtfs_feeds(self, region):
+        """
+        地域のGTFSフィードを列挙
+        .txtを含むディレクトリがあればそれを1フィードとし、
+        なければ事業者ごとのサブディレクトリ・ZIPファイルをそれぞれ1フィードとする
+        """
         # GTFSデータディレクトリ - 複数の可能性をチェック
         possible_dirs = [
             self.data_dir / region / "transport" / "bus" / "gtfs",
@@ -293,24 +672,94 @@ class GTFSIntegrator:
             self.data_dir / region / "transport" / "bus"
         ]
         
-        gtfs_dir = None
         for dir_path in possible_dirs:
-            if dir_path.exists():
-                # .txtファイルが存在するか確認
-                txt_files = list(dir_path.glob("*.txt"))
-                if txt_files:
-                    gtfs_dir = dir_path
-                    logger.info(f"GTFSファイルが見つかりました: {gtfs_dir}")
-                    break
-                    
-        if not gtfs_dir:
-            logger.error(f"GTFSファイルが見つかりません。確認したディレクトリ: {possible_dirs}")
+            if not dir_path.exists():
+                continue
+                
+            # .txtファイルが存在するか確認
+            if list(dir_path.glob("*.txt")):
+                logger.info(f"GTFSファイルが見つかりました: {dir_path}")
+                return [dir_path]
+                
+            # 事業者ごとのサブディレクトリ（.txt優先、なければ.zip）とZIPファイル
+            feeds = []
+            for operator_dir in sorted(path for path in dir_path.iterdir() if path.is_dir()):
+                if list(operator_dir.glob("*.txt")):
+                    feeds.append(operator_dir)
+                else:
+                    feeds.extend(sorted(operator_dir.glob("*.zip"))[:1])
+            feeds.extend(sorted(dir_path.glob("*.zip")))
+            if feeds:
+                logger.info(f"{len(feeds)}件の事業者フィードが見つかりました: {dir_path}")
+                return feeds
+                
+        logger.error(f"GTFSファイルが見つかりません。確認したディレクトリ: {possible_dirs}")
+        return []
+        
+    def load_gtfs_data_parallel(self, regions, workers):
+        """
+        複数地域・事業者のGTFSデータをプロセスプールで並列に読み込み
+        ステージ（GTFS_LOAD_STAGES）ごとに全事業者のファイルを投入し、
+        ステージ完了を待ってから次へ進むことで外部キーの依存順を守る
+        各ワーカーはDB接続を1本ずつ持つ
+        """
+        feeds = []
+        for region in regions:
+            logger.info(f"{region}のGTFSデータを読み込んでいます...")
+            feeds.extend(self._find_gtfs_feeds(region))
+        if not feeds:
             return
             
-        # GTFSファイルを直接処理
-        if list(gtfs_dir.glob("*.txt")):
-            logger.info(f"GTFSファイルを処理中: {gtfs_dir}")
-            self._process_operator_gtfs(gtfs_dir)
+        if self.incremental:
+            # 差分取り込みはフィード単位のトランザクションのため、フィードごとにワーカーへ割り当てる
+            logger.info(f"{len(feeds)}件のフィードを{workers}ワーカーで差分取り込みします")
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.bulk, self.incremental, str(self.data_dir))
+            ) as pool:
+                futures = [pool.submit(_process_feed_in_worker, str(feed)) for feed in feeds]
+                for future in as_completed(futures):
+                    future.result()
+            return
+            
+        # ZIPはワーカーに渡す前に一時ディレクトリへ展開（データディレクトリは読み取り専用の場合がある）
+        feed_dirs = []
+        temp_dirs = []
+        try:
+            for feed in feeds:
+                if feed.is_dir():
+                    feed_dirs.append(feed)
+                    continue
+                temp_dir = Path(tempfile.mkdtemp(prefix="gtfs_"))
+                temp_dirs.append(temp_dir)
+                with zipfile.ZipFile(feed, 'r') as zip_ref:
+                    zip_ref.extractall(temp_dir)
+                feed_dirs.append(temp_dir)
+                
+            logger.info(f"{len(feed_dirs)}件のフィードを{workers}ワーカーで並列処理します")
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=(self.bulk, self.incremental, str(self.data_dir))
+            ) as pool:
+                for stage, file_names in enumerate(GTFS_LOAD_STAGES, 1):
+                    file_paths = [
+                        feed_dir / file_name
+                        for feed_dir in feed_dirs
+                        for file_name in file_names
+                        if (feed_dir / file_name).exists()
+                    ]
+                    # 大きいファイルから投入して待ち時間の偏りを減らす
+                    file_paths.sort(key=lambda path: path.stat().st_size, reverse=True)
+                    
+                    futures = [pool.submit(_load_file_in_worker, str(path)) for path in file_paths]
+                    for future in as_completed(futures):
+                        future.result()
+                    logger.info(f"ステージ{stage}/{len(GTFS_LOAD_STAGES)}完了: {len(file_paths)}ファイル")
+        finally:
+            for temp_dir in temp_dirs:
+                shutil.rmtree(temp_dir, ignore_errors=True)
                 
     def _process_operator_gtfs(self, operator_dir):
         """事業者ごとのGTFSデータを処理"""
@@ -319,17 +768,7 @@ class GTFSIntegrator:
         
         if txt_files:
             # .txtファイルが存在する場合
-            self._load_agency(operator_dir / "agency.txt")
-            self._load_routes(operator_dir / "routes.txt")
-            self._load_stops(operator_dir / "stops.txt")
-            self._load_calendar(operator_dir / "calendar.txt")
-            self._load_trips(operator_dir / "trips.txt")
-            self._load_stop_times(operator_dir / "stop_times.txt")
-            self._load_shapes(operator_dir / "shapes.txt")
-            self._load_calendar_dates(operator_dir / "calendar_dates.txt")
-            self._load_fare_attributes(operator_dir / "fare_attributes.txt")
-            self._load_fare_rules(operator_dir / "fare_rules.txt")
-            self._load_translations(operator_dir / "translations.txt")
+            self._load_gtfs_files(operator_dir)
         else:
             # .zipファイルを探す
             zip_files = list(operator_dir.glob("*.zip"))
@@ -347,22 +786,365 @@ class GTFSIntegrator:
             zip_ref.extractall(temp_dir)
             
             # 展開したファイルを処理
-            self._load_agency(temp_dir / "agency.txt")
-            self._load_routes(temp_dir / "routes.txt")
-            self._load_stops(temp_dir / "stops.txt")
-            self._load_calendar(temp_dir / "calendar.txt")
-            self._load_trips(temp_dir / "trips.txt")
-            self._load_stop_times(temp_dir / "stop_times.txt")
-            self._load_shapes(temp_dir / "shapes.txt")
-            self._load_calendar_dates(temp_dir / "calendar_dates.txt")
-            self._load_fare_attributes(temp_dir / "fare_attributes.txt")
-            self._load_fare_rules(temp_dir / "fare_rules.txt")
-            self._load_translations(temp_dir / "translations.txt")
+            self._load_gtfs_files(temp_dir)
             
             # 一時ディレクトリを削除
-            import shutil
             shutil.rmtree(temp_dir)
             
+    def _load_gtfs_files(self, gtfs_dir):
+        """ディレクトリ内のGTFSファイルを外部キーの依存順に読み込み"""
+        for file_name in GTFS_LOAD_ORDER:
+            self._load_file(gtfs_dir / file_name)
+            
+    def _load_file(self, file_path):
+        """GTFSファイルを1つ読み込み（一括ロード / 行単位ロード）"""
+        if self.bulk:
+            self._bulk_load_file(file_path, BULK_LOAD_SPECS[file_path.name])
+        else:
+            getattr(self, GTFS_ROW_LOADERS[file_path.name])(file_path)
+            
+    def _bulk_load_file(self, file_path, spec):
+        """
+        GTFSファイルを一括ロード
+        ファイルをUNLOGGEDのステージングテーブル（全列TEXT）にCOPY FROM STDINで流し込み、
+        対象テーブルへは型変換しながら1回のINSERT ... SELECT（ON CONFLICT）でマージする
+        """
+        if not file_path.exists():
+            logger.warning(f"ファイルが見つかりません: {file_path}")
+            return
+            
+        table = spec["table"]
+        staging = self._staging_table(table)
+        logger.info(f"{file_path.name}を一括ロード中: {file_path}")
+        
+        try:
+            header = self._stage_file(file_path, staging)
+            if header is None:
+                logger.warning(f"ヘッダーがありません: {file_path}")
+                return
+                
+            loaded_count = self._merge_staging(staging, spec, header)
+            self.cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging))
+            self.conn.commit()
+            logger.info(f"{loaded_count}件を{table}にマージしました")
+            
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"{file_path.name}一括ロードエラー: {e}")
+            
+    def _staging_table(self, table):
+        """ステージングテーブル名（並列実行時に衝突しないようプロセスIDを付ける）"""
+        return sql.Identifier(f"staging_{table}_{os.getpid()}")
+        
+    def _stage_file(self, file_path, staging):
+        """
+        GTFSファイルをUNLOGGEDのステージングテーブル（全列TEXT）にCOPY FROM STDINで流し込む
+        ファイルのヘッダー列名の集合を返す（ヘッダーがない場合はNone）
+        """
+        with open(file_path, 'r', encoding='utf-8-sig', newline='') as f:
+            header = [name.strip() for name in next(csv.reader([f.readline()]), [])]
+            if not header:
+                return None
+                
+            header_columns = sql.SQL(", ").join(sql.Identifier(name) for name in header)
+            self.cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging))
+            self.cursor.execute(sql.SQL("CREATE UNLOGGED TABLE {} ({})").format(
+                staging,
+                sql.SQL(", ").join(
+                    sql.SQL("{} TEXT").format(sql.Identifier(name)) for name in header
+                )
+            ))
+            
+            # 空文字はNULLにせず空文字のまま取り込む（行単位ロードと同じ扱い）
+            copy_sql = sql.SQL(
+                "COPY {} ({}) FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({}))"
+            ).format(staging, header_columns, header_columns)
+            self.cursor.copy_expert(copy_sql.as_string(self.conn), f)
+            
+        return set(header)
+        
+    def _feed_key(self, feed):
+        """マニフェスト上のフィード識別子（データディレクトリからの相対パス）"""
+        try:
+            return str(feed.relative_to(self.data_dir))
+        except ValueError:
+            return str(feed)
+            
+    def _read_manifest(self, feed_key):
+        """フィードのマニフェスト {ファイル名: ハッシュ}"""
+        self.cursor.execute(
+            "SELECT file_name, content_hash FROM gtfs_feed_manifest WHERE feed_key = %s",
+            (feed_key,)
+        )
+        return dict(self.cursor.fetchall())
+        
+    def _read_feed_version(self, feed_dir):
+        """feed_info.txtのfeed_version（なければNone）"""
+        feed_info = feed_dir / "feed_info.txt"
+        if not feed_info.exists():
+            return None
+        with open(feed_info, 'r', encoding='utf-8-sig') as f:
+            row = next(csv.DictReader(f), None)
+        return (row or {}).get('feed_version') or None
+        
+    def _process_feed_incremental(self, feed):
+        """
+        フィードを差分取り込み
+        ZIPはアーカイブのハッシュが前回と同じなら展開せずにスキップする
+        """
+        feed_key = self._feed_key(feed)
+        if feed.is_dir():
+            self._load_feed_incremental(feed, feed_key)
+            return
+            
+        archive_hash = _file_hash(feed)
+        if self._read_manifest(feed_key).get(ARCHIVE_MANIFEST_NAME) == archive_hash:
+            logger.info(f"変更なしのためスキップします: {feed_key}")
+            return
+            
+        temp_dir = Path(tempfile.mkdtemp(prefix="gtfs_"))
+        try:
+            with zipfile.ZipFile(feed, 'r') as zip_ref:
+                zip_ref.extractall(temp_dir)
+            self._load_feed_incremental(temp_dir, feed_key, archive_hash)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+            
+    def _load_feed_incremental(self, feed_dir, feed_key, archive_hash=None):
+        """
+        マニフェストのファイルハッシュと比較し、変更のあったファイルだけを行単位の差分で反映
+        1. 変更ファイルを依存順に、追加・更新行のみUPSERT
+        2. 削除行を依存の逆順（子テーブルから）に削除
+           （親の削除が先だとON DELETE CASCADEで未変更ファイルの行まで消えるため）
+        3. マニフェストを更新
+        フィード全体を1トランザクションで反映する。ファイル単位でセーブポイントを置き、
+        反映に失敗したファイルは取り消してマニフェストも更新しない（次回再試行される）
+        """
+        manifest = self._read_manifest(feed_key)
+        hashes = {
+            file_name: _file_hash(feed_dir / file_name)
+            for file_name in GTFS_LOAD_ORDER + ["feed_info.txt"]
+            if (feed_dir / file_name).exists()
+        }
+        
+        changed_files = [
+            file_name for file_name in GTFS_LOAD_ORDER
+            if hashes.get(file_name) != manifest.get(file_name)
+        ]
+        if not changed_files and hashes.get("feed_info.txt") == manifest.get("feed_info.txt"):
+            logger.info(f"変更なしのためスキップします: {feed_key}")
+            if archive_hash:
+                self._update_manifest(feed_key, {ARCHIVE_MANIFEST_NAME: archive_hash}, {}, None)
+                self.conn.commit()
+            return
+            
+        feed_version = self._read_feed_version(feed_dir)
+        logger.info(
+            f"差分取り込み: {feed_key}（版: {feed_version or '不明'}、"
+            f"変更ファイル: {', '.join(changed_files) or 'なし'}）"
+        )
+        
+        try:
+            row_counts = {}
+            deletions = []
+            failed_files = []
+            for index, file_name in enumerate(GTFS_LOAD_ORDER):
+                if file_name not in changed_files:
+                    continue
+                spec = BULK_LOAD_SPECS[file_name]
+                self.cursor.execute("SAVEPOINT gtfs_file_diff")
+                try:
+                    row_count, deleted_table = self._apply_file_diff(
+                        feed_dir / file_name, spec, feed_key, index
+                    )
+                except Exception as e:
+                    self.cursor.execute("ROLLBACK TO SAVEPOINT gtfs_file_diff")
+                    logger.error(f"{file_name}差分取り込みエラー（{feed_key}）: {e}")
+                    hashes.pop(file_name, None)
+                    failed_files.append(file_name)
+                    continue
+                self.cursor.execute("RELEASE SAVEPOINT gtfs_file_diff")
+                row_counts[file_name] = row_count
+                deletions.append((spec, deleted_table))
+                
+            for spec, deleted_table in reversed(deletions):
+                deleted_count = self._delete_diff_rows(spec, deleted_table)
+                if deleted_count:
+                    logger.info(f"{deleted_count}件を{spec['table']}から削除しました")
+                    
+            # アーカイブのハッシュはすべてのファイルを反映できた場合のみ記録する
+            # （記録すると次回はZIPごとスキップされ、失敗したファイルが再試行されないため）
+            if archive_hash and not failed_files:
+                hashes[ARCHIVE_MANIFEST_NAME] = archive_hash
+            self._update_manifest(feed_key, hashes, row_counts, feed_version)
+            
+            # フィードから消えたファイルはマニフェストからも削除
+            removed_files = [
+                name for name in manifest
+                if name not in hashes and not (feed_dir / name).exists()
+            ]
+            if removed_files:
+                self.cursor.execute(
+                    "DELETE FROM gtfs_feed_manifest WHERE feed_key = %s AND file_name = ANY(%s)",
+                    (feed_key, removed_files)
+                )
+            self.conn.commit()
+            
+        except Exception as e:
+            self.conn.rollback()
+            logger.error(f"差分取り込みエラー（{feed_key}）: {e}")
+            
+    def _apply_file_diff(self, file_path, spec, feed_key, index):
+        """
+        1ファイル分の差分を反映（追加・更新のみ）
+        行キー（主キー、主キーがないテーブルは全列）と行ハッシュを前回分（gtfs_feed_rows）と比較し、
+        新規・変更行だけを対象テーブルにUPSERTする
+        戻り値は (ファイルの行数, 削除対象キーを入れた一時テーブル名)
+        """
+        table = spec["table"]
+        file_name = file_path.name
+        new_rows = f"gtfs_diff_new_{index}"
+        changed_rows = f"gtfs_diff_changed_{index}"
+        deleted_rows = f"gtfs_diff_deleted_{index}"
+        params = {"feed_key": feed_key, "file_name": file_name}
+        
+        staging = self._staging_table(table)
+        header = self._stage_file(file_path, staging) if file_path.exists() else None
+        
+        if header is None:
+            # ファイルが消えた（または空）場合は全行を削除対象にする
+            self.cursor.execute(
+                f"CREATE TEMP TABLE {new_rows} (row_key TEXT[], row_hash TEXT, row_ctid TID) ON COMMIT DROP"
+            )
+        else:
+            columns, expressions = _bulk_select_columns(spec, header)
+            key_columns = spec["conflict"] or columns
+            key_expressions = ", ".join(expressions[columns.index(name)] for name in key_columns)
+            key_array = ", ".join(
+                f"({expressions[columns.index(name)]})::text" for name in key_columns
+            )
+            self.cursor.execute(sql.SQL(f"""
+                CREATE TEMP TABLE {new_rows} ON COMMIT DROP AS
+                SELECT DISTINCT ON ({key_expressions})
+                    ARRAY[{key_array}] AS row_key,
+                    md5(ROW({', '.join(expressions)})::text) AS row_hash,
+                    ctid AS row_ctid
+                FROM {{}}
+                ORDER BY {key_expressions}, ctid DESC
+            """).format(staging))
+            
+        self.cursor.execute(f"""
+            CREATE TEMP TABLE {changed_rows} ON COMMIT DROP AS
+            SELECT n.row_key, n.row_hash, n.row_ctid
+            FROM {new_rows} n
+            LEFT JOIN gtfs_feed_rows o
+                ON o.feed_key = %(feed_key)s AND o.file_name = %(file_name)s AND o.row_key = n.row_key
+            WHERE o.row_hash IS DISTINCT FROM n.row_hash
+        """, params)
+        self.cursor.execute(f"""
+            CREATE TEMP TABLE {deleted_rows} ON COMMIT DROP AS
+            SELECT o.row_key
+            FROM gtfs_feed_rows o
+            WHERE o.feed_key = %(feed_key)s AND o.file_name = %(file_name)s
+              AND NOT EXISTS (SELECT 1 FROM {new_rows} n WHERE n.row_key = o.row_key)
+        """, params)
+        
+        upserted_count = 0
+        if header is not None:
+            select_list = ", ".join(
+                f"{expression} AS {name}" for name, expression in zip(columns, expressions)
+            )
+            conflict = spec["conflict"]
+            conflict_sql = ""
+            if conflict:
+                # 差分の更新は行全体を置き換える
+                update_list = ", ".join(
+                    [f"{name} = EXCLUDED.{name}" for name in columns if name not in conflict]
+                    + ["updated_at = CURRENT_TIMESTAMP"]
+                )
+                conflict_sql = f" ON CONFLICT ({', '.join(conflict)}) DO UPDATE SET {update_list}"
+            self.cursor.execute(sql.SQL(f"""
+                INSERT INTO {table} ({', '.join(columns)})
+                SELECT {select_list}
+                FROM {{}} JOIN {changed_rows} ON {{}}.ctid = {changed_rows}.row_ctid
+                {conflict_sql}
+            """).format(staging, staging))
+            upserted_count = self.cursor.rowcount
+            self.cursor.execute(sql.SQL("DROP TABLE IF EXISTS {}").format(staging))
+            
+        # 行キー・行ハッシュを更新
+        self.cursor.execute(f"""
+            DELETE FROM gtfs_feed_rows o
+            USING {deleted_rows} d
+            WHERE o.feed_key = %(feed_key)s AND o.file_name = %(file_name)s AND o.row_key = d.row_key
+        """, params)
+        self.cursor.execute(f"""
+            INSERT INTO gtfs_feed_rows (feed_key, file_name, row_key, row_hash)
+            SELECT %(feed_key)s, %(file_name)s, row_key, row_hash FROM {changed_rows}
+            ON CONFLICT (feed_key, file_name, row_key) DO UPDATE SET row_hash = EXCLUDED.row_hash
+        """, params)
+        
+        self.cursor.execute(f"SELECT COUNT(*) FROM {new_rows}")
+        row_count = self.cursor.fetchone()[0]
+        logger.info(f"{file_name}: {row_count}行中{upserted_count}件を{table}に追加・更新しました")
+        return row_count, deleted_rows
+        
+    def _delete_diff_rows(self, spec, deleted_rows):
+        """差分で消えた行を対象テーブルから削除"""
+        kinds = {name: kind for name, kind, _ in spec["columns"]}
+        key_columns = spec["conflict"] or [name for name, _, _ in spec["columns"]]
+        conditions = " AND ".join(
+            f"t.{name} IS NOT DISTINCT FROM (d.row_key[{position}])::{BULK_KIND_SQL_TYPES[kinds[name]]}"
+            for position, name in enumerate(key_columns, 1)
+        )
+        self.cursor.execute(f"DELETE FROM {spec['table']} t USING {deleted_rows} d WHERE {conditions}")
+        return self.cursor.rowcount
+        
+    def _update_manifest(self, feed_key, hashes, row_counts, feed_version):
+        """マニフェストにファイルごとのハッシュ・行数・版を記録"""
+        execute_batch(self.cursor, """
+            INSERT INTO gtfs_feed_manifest (feed_key, file_name, content_hash, feed_version, row_count)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (feed_key, file_name) DO UPDATE SET
+                content_hash = EXCLUDED.content_hash,
+                feed_version = COALESCE(EXCLUDED.feed_version, gtfs_feed_manifest.feed_version),
+                row_count = COALESCE(EXCLUDED.row_count, gtfs_feed_manifest.row_count),
+                loaded_at = CURRENT_TIMESTAMP
+        """, [
+            (feed_key, file_name, content_hash, feed_version, row_counts.get(file_name))
+            for file_name, content_hash in hashes.items()
+        ])
+        
+    def _merge_staging(self, staging, spec, header):
+        """ステージングテーブルから対象テーブルへ集合演算でUPSERT"""
+        columns, expressions = _bulk_select_columns(spec, header)
+        select_list = ", ".join(
+            f"{expression} AS {name}" for name, expression in zip(columns, expressions)
+        )
+        
+        conflict = spec["conflict"]
+        if conflict:
+            # 同一ファイル内の主キー重複はON CONFLICTで扱えないため、後に出現した行を採用する
+            key_expressions = ", ".join(expressions[columns.index(name)] for name in conflict)
+            select_sql = (
+                f"SELECT DISTINCT ON ({key_expressions}) {select_list} "
+                f"FROM {{}} ORDER BY {key_expressions}, ctid DESC"
+            )
+            update_list = ", ".join(
+                [f"{name} = EXCLUDED.{name}" for name in spec["update"]]
+                + ["updated_at = CURRENT_TIMESTAMP"]
+            )
+            conflict_sql = f" ON CONFLICT ({', '.join(conflict)}) DO UPDATE SET {update_list}"
+        else:
+            select_sql = f"SELECT {select_list} FROM {{}}"
+            conflict_sql = ""
+            
+        query = sql.SQL(
+            f"INSERT INTO {spec['table']} ({', '.join(columns)}) {select_sql}{conflict_sql}"
+        ).format(staging)
+        self.cursor.execute(query)
+        return self.cursor.rowcount
+        
     def _load_agency(self, file_path):
         """agency.txtを読み込み"""
         if not file_path.exists():
@@ -631,13 +1413,15 @@ class GTFSIntegrator:
                 
                 for row in reader:
                     # 時刻の形式を確認（24時間を超える場合の処理）
-                    arrival_time = self._parse_gtfs_time(row.get('arrival_time', ''))
-                    departure_time = self._parse_gtfs_time(row.get('departure_time', ''))
+                    arrival_sec = _gtfs_time_to_seconds(row.get('arrival_time', ''))
+                    departure_sec = _gtfs_time_to_seconds(row.get('departure_time', ''))
                     
                     batch_data.append((
                         row.get('trip_id', ''),
-                        arrival_time,
-                        departure_time,
+                        self._format_gtfs_seconds(arrival_sec),
+                        self._format_gtfs_seconds(departure_sec),
+                        arrival_sec,
+                        departure_sec,
                         row.get('stop_id', ''),
                         int(row.get('stop_sequence', 0)),
                         row.get('stop_headsign', ''),
@@ -666,34 +1450,33 @@ class GTFSIntegrator:
             
     def _parse_gtfs_time(self, time_str):
         """GTFS時刻形式をパース（24時間を超える場合の処理）"""
-        if not time_str:
-            return None
-            
-        parts = time_str.split(':')
-        if len(parts) != 3:
-            return None
-            
-        hours = int(parts[0])
-        minutes = int(parts[1])
-        seconds = int(parts[2])
+        return self._format_gtfs_seconds(_gtfs_time_to_seconds(time_str))
         
-        # 24時間を超える場合は24時間以内に正規化
-        if hours >= 24:
-            hours = hours % 24
+    def _format_gtfs_seconds(self, total_seconds):
+        """
+        秒数をTIME列用の文字列に変換
+        24時間を超える場合は24時間以内に正規化（正確な値はarrival_sec/departure_secに保持）
+        """
+        if total_seconds is None:
+            return None
             
+        hours, remainder = divmod(total_seconds % 86400, 3600)
+        minutes, seconds = divmod(remainder, 60)
         return f"{hours:02d}:{minutes:02d}:{seconds:02d}"
         
     def _insert_stop_times_batch(self, batch_data):
         """stop_timesデータをバッチ挿入"""
         query = """
         INSERT INTO gtfs_stop_times (
-            trip_id, arrival_time, departure_time, stop_id,
+            trip_id, arrival_time, departure_time, arrival_sec, departure_sec, stop_id,
             stop_sequence, stop_headsign, pickup_type, drop_off_type,
             shape_dist_traveled, timepoint
-        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
         ON CONFLICT (trip_id, stop_sequence) DO UPDATE SET
             arrival_time = EXCLUDED.arrival_time,
             departure_time = EXCLUDED.departure_time,
+            arrival_sec = EXCLUDED.arrival_sec,
+            departure_sec = EXCLUDED.departure_sec,
             updated_at = CURRENT_TIMESTAMP
         """
         execute_batch(self.cursor, query, batch_data)
@@ -916,12 +1699,22 @@ class GTFSIntegrator:
             logger.error(f"translations.txt読み込みエラー: {e}")
             
     def create_summary_views(self):
-        """分析用のビューを作成"""
+        """
+        分析用のマテリアライズドビューを作成
+        読み取りのたびにgtfs_stop_timesを集計しないよう結果を保持し、統合後にリフレッシュする
+        """
         logger.info("分析用ビューを作成しています...")
         
+        # 旧バージョンの通常ビューは同名のマテリアライズドビューに置き換える
+        drop_sql = """
+        SELECT format('DROP VIEW %%I', viewname)
+        FROM pg_views
+        WHERE schemaname = current_schema() AND viewname = ANY(%s)
+        """
+        
         views_sql = """
         -- 路線別停留所数ビュー
-        CREATE OR REPLACE VIEW v_route_stop_count AS
+        CREATE MATERIALIZED VIEW IF NOT EXISTS v_route_stop_count AS
         SELECT 
             r.route_id,
             r.route_long_name,
@@ -934,26 +1727,41 @@ class GTFSIntegrator:
         JOIN gtfs_stop_times st ON t.trip_id = st.trip_id
         GROUP BY r.route_id, r.route_long_name, r.route_short_name, a.agency_name;
         
-        -- エリア別停留所密度ビュー
-        CREATE OR REPLACE VIEW v_stop_density AS
+        -- エリア別停留所密度ビュー（grid_x / grid_y は0.01度単位のセル番号）
+        CREATE MATERIALIZED VIEW IF NOT EXISTS v_stop_density AS
         SELECT 
-            ST_SnapToGrid(geom, 0.01) as grid_geom,
-            COUNT(*) as stop_count
-        FROM gtfs_stops
-        WHERE location_type = 0
-        GROUP BY grid_geom;
-        
-        -- 時間帯別運行本数ビュー
-        CREATE OR REPLACE VIEW v_service_frequency AS
+            ROUND(ST_X(grid_geom) / 0.01)::integer as grid_x,
+            ROUND(ST_Y(grid_geom) / 0.01)::integer as grid_y,
+            grid_geom,
+            stop_count
+        FROM (
+            SELECT 
+                ST_SnapToGrid(geom, 0.01) as grid_geom,
+                COUNT(*) as stop_count
+            FROM gtfs_stops
+            WHERE location_type = 0 AND geom IS NOT NULL
+            GROUP BY grid_geom
+        ) cells;
+        
+        -- 時間帯別運行本数ビュー（24時以降の便は24, 25...時として集計）
+        CREATE MATERIALIZED VIEW IF NOT EXISTS v_service_frequency AS
         SELECT 
-            EXTRACT(HOUR FROM arrival_time) as hour,
+            departure_sec / 3600 as hour,
             COUNT(DISTINCT trip_id) as trip_count
         FROM gtfs_stop_times
-        GROUP BY hour
-        ORDER BY hour;
+        WHERE departure_sec IS NOT NULL
+        GROUP BY hour;
+        
+        -- CONCURRENTLYでのリフレッシュには一意インデックスが必要
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_v_route_stop_count_route_id ON v_route_stop_count (route_id);
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_v_stop_density_grid ON v_stop_density (grid_x, grid_y);
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_v_service_frequency_hour ON v_service_frequency (hour);
         """
         
         try:
+            self.cursor.execute(drop_sql, (list(SUMMARY_VIEWS),))
+            for (statement,) in self.cursor.fetchall():
+                self.cursor.execute(statement)
             self.cursor.execute(views_sql)
             self.conn.commit()
             logger.info("分析用ビューの作成が完了しました")
@@ -961,6 +1769,19 @@ class GTFSIntegrator:
             self.conn.rollback()
             logger.error(f"ビュー作成エラー: {e}")
             
+    def refresh_summary_views(self):
+        """分析用ビューをリフレッシュ（読み取りをブロックしないようCONCURRENTLYで実行）"""
+        for view in SUMMARY_VIEWS:
+            try:
+                self.cursor.execute(
+                    sql.SQL("REFRESH MATERIALIZED VIEW CONCURRENTLY {}").format(sql.Identifier(view))
+                )
+                self.conn.commit()
+                logger.info(f"{view}をリフレッシュしました")
+            except Exception as e:
+                self.conn.rollback()
+                logger.error(f"{view}のリフレッシュエラー: {e}")
+            
     def verify_data(self):
         """統合されたデータを検証"""
         logger.info("統合データを検証しています...")
@@ -992,7 +1813,7 @@ class GTFSIntegrator:
         bounds = self.cursor.fetchone()
         logger.info(f"地理的範囲: 緯度 {bounds[0]:.4f} - {bounds[1]:.4f}, 経度 {bounds[2]:.4f} - {bounds[3]:.4f}")
         
-    def run(self):
+    def run(self, regions=("hiroshima",), workers=1):
         """統合処理を実行"""
         try:
             # データベース接続
@@ -1002,10 +1823,15 @@ class GTFSIntegrator:
             self.create_gtfs_tables()
             
             # GTFSデータ読み込み
-            self.load_gtfs_data("hiroshima")
+            if workers > 1:
+                self.load_gtfs_data_parallel(regions, workers)
+            else:
+                for region in regions:
+                    self.load_gtfs_data(region)
             
-            # 分析用ビュー作成
+            # 分析用ビュー作成・リフレッシュ
             self.create_summary_views()
+            self.refresh_summary_views()
             
             # データ検証
             self.verify_data()
@@ -1019,10 +1845,59 @@ class GTFSIntegrator:
             self.close_db()
 
 
+# ワーカープロセスごとのインテグレーター（DB接続はワーカーごとに1本）
+_worker_integrator = None
+
+
+def _init_worker(bulk, incremental, data_dir):
+    """プロセスプールのワーカー初期化"""
+    global _worker_integrator
+    _worker_integrator = GTFSIntegrator(bulk=bulk, incremental=incremental)
+    _worker_integrator.data_dir = Path(data_dir)
+    _worker_integrator.connect_db()
+
+
+def _load_file_in_worker(file_path):
+    """ワーカーでGTFSファイルを1つ読み込み"""
+    _worker_integrator._load_file(Path(file_path))
+    return file_path
+
+
+def _process_feed_in_worker(feed):
+    """ワーカーでフィードを1つ差分取り込み"""
+    _worker_integrator._process_feed_incremental(Path(feed))
+    return feed
+
+
 def main():
     """メイン処理"""
-    integrator = GTFSIntegrator()
-    integrator.run()
+    parser = argparse.ArgumentParser(description="GTFSデータをPostgreSQLに統合")
+    parser.add_argument(
+        "--bulk",
+        action="store_true",
+        help="COPY FROM STDINによる一括ロードを使用（大規模フィード向け）"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="前回取り込み時から変更のあったファイルの差分（追加・更新・削除）のみ反映"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="並列ワーカー数（2以上で事業者・ファイル単位の並列ロード）"
+    )
+    parser.add_argument(
+        "--regions",
+        nargs="+",
+        default=["hiroshima"],
+        help="読み込む地域（データディレクトリ名）"
+    )
+    args = parser.parse_args()
+    
+    integrator = GTFSIntegrator(bulk=args.bulk, incremental=args.incremental)
+    integrator.run(regions=args.regions, workers=args.workers)
 
 
 if __name__ == "__main__":
@@ -12,6 +12,13 @@ from loguru import logger
 
 from app.core.database import get_db
 from app.core.config import settings
+from app.core.cache import invalidate_cache
+from app.services.density_cube import rebuild_density_cube
+from app.services.gtfs_stop_catalog import gtfs_stop_catalog
+from app.services.mobility_precompute import mobility_payload_store
+from app.services.route_geometry import route_geometry
+from app.services.transit_router import transit_router
+from app.services.transit_supply import refresh_transit_supply
 
 router = APIRouter()
 
@@ -59,7 +66,7 @@ async def run_gtfs_integration():
         
         # Run the script
         result = subprocess.run(
-            [sys.executable, str(script_path)],
+            [sys.executable, str(script_path), "--bulk"],
             capture_output=True,
             text=True,
             env={
@@ -75,6 +82,13 @@ async def run_gtfs_integration():
         
         if result.returncode == 0:
             logger.info(f"GTFS integration completed successfully: {result.stdout}")
+            await invalidate_cache("transport", "mobility")
+            gtfs_stop_catalog.clear()
+            transit_router.clear()
+            route_geometry.clear()
+            # 形状の追加前に直線で作った人流データを破棄（次回アクセス時に経路付きで再計算）
+            mobility_payload_store.clear()
+            await refresh_transit_supply(settings.TRANSIT_SUPPLY_PRECOMPUTE_DAYS)
         else:
             logger.error(f"GTFS integration failed: {result.stderr}")
             
@@ -82,6 +96,41 @@ async def run_gtfs_integration():
         logger.error(f"Error during GTFS integration: {e}")
 
 
+@router.post("/rebuild/density-cube")
+async def rebuild_heatmap_density_cube():
+    """
+    Rebuild the pre-aggregated heatmap density cube from heatmap_points
+    Needed only after bulk loads that bypass the incremental ingest path
+    """
+    try:
+        row_count = await rebuild_density_cube()
+        return {
+            "status": "completed",
+            "rows": row_count
+        }
+    except Exception as e:
+        logger.error(f"Failed to rebuild density cube: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/rebuild/transit-supply")
+async def rebuild_transit_supply():
+    """
+    Recompute per-stop and per-route transit supply (departures, headways, span of service)
+    for the next TRANSIT_SUPPLY_PRECOMPUTE_DAYS days from the GTFS tables
+    """
+    try:
+        days = await refresh_transit_supply(settings.TRANSIT_SUPPLY_PRECOMPUTE_DAYS)
+        await invalidate_cache("transport")
+        return {
+            "status": "completed",
+            "days": days
+        }
+    except Exception as e:
+        logger.error(f"Failed to rebuild transit supply: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/integrate/status")
 async def get_integration_status():
     """
@@ -6,6 +6,10 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from app.core.database import get_db, AsyncSessionLocal
+from app.core.cache import response_cache
+from app.services.mobility_precompute import mobility_payload_store
+from app.services.route_geometry import route_geometry
+from app.services.transit_router import transit_router
 import time
 import psutil
 import os
@@ -53,4 +57,15 @@ async def detailed_health_check(db: Session = Depends(get_db)):
             "cpu_count": psutil.cpu_count(),
             "python_version": f"{os.sys.version_info.major}.{os.sys.version_info.minor}.{os.sys.version_info.micro}"
         }
-    }
\ No newline at end of file
+    }
+
+@router.get("/cache")
+async def cache_stats():
+    """レスポンスキャッシュのヒット/ミス統計"""
+    return {
+        "timestamp": time.time(),
+        **response_cache.get_stats(),
+        "mobility_precompute": mobility_payload_store.get_stats(),
+        "transit_router": transit_router.get_stats(),
+        "route_geometry": route_geometry.get_stats()
+    }
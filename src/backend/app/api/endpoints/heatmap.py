@@ -3,25 +3,50 @@
 地理空間データの取得と配信
 """
 
-from fastapi import APIRouter, Query, HTTPException, Depends
+from fastapi import APIRouter, Query, HTTPException, Depends, Response
 from typing import List, Optional
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import func, and_, or_, text
 from app.core.database import get_db, AsyncSessionLocal
+from app.core.cache import cached
 from app.models.heatmap import HeatmapPoint
+from app.services.density_cube import DENSITY_GRID_LEVELS, find_grid_level, query_density_cube
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
+import base64
 import json
+import uuid
 
 router = APIRouter()
 
+# ベクタータイル設定
+MVT_EXTENT = 4096  # タイル内座標の解像度
+MVT_BUFFER = 64  # タイル境界のバッファ（描画の途切れ防止）
+MVT_LAYER_NAME = "heatmap_points"
+MVT_MAX_BYTES = 500 * 1024  # 1タイルあたりの最大サイズ
+MVT_MAX_FEATURES = 20000  # 間引き前の1タイルあたり最大ポイント数
+
 class HeatmapResponse(BaseModel):
     """ヒートマップレスポンス"""
     type: str = "FeatureCollection"
     features: List[dict]
     metadata: dict
 
+def _encode_cursor(timestamp: datetime, point_id) -> str:
+    """(timestamp, id) をクライアント向けの不透明なカーソル文字列に変換"""
+    payload = json.dumps({"ts": timestamp.isoformat(), "id": str(point_id)})
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def _decode_cursor(cursor: str):
+    """カーソル文字列を (timestamp, id) に復元"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["ts"]), uuid.UUID(payload["id"])
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
 class BoundingBox(BaseModel):
     """境界ボックス"""
     north: float
@@ -48,11 +73,20 @@ async def get_heatmap_points(
     
     # ページング
     limit: int = Query(1000, le=5000, description="最大取得数"),
-    offset: int = Query(0, description="オフセット"),
+    offset: int = Query(0, description="オフセット（後方互換用。深いページはcursorを推奨）"),
+    cursor: Optional[str] = Query(None, description="前ページのmetadata.next_cursor（キーセットページング）"),
     
     db: Session = Depends(get_db)
 ):
-    """ヒートマップポイントデータの取得"""
+    """
+    ヒートマップポイントデータの取得
+    
+    結果は (timestamp, id) の降順。metadata.next_cursor を次回の cursor に渡すと、
+    ページの深さに関係なく一定コストで続きを取得できる（offsetは後方互換のため残す）
+    """
+    
+    if cursor and offset:
+        raise HTTPException(status_code=400, detail="cursor and offset cannot be combined")
     
     # デフォルト時間範囲（過去24時間）
     if not end_time:
@@ -107,8 +141,17 @@ async def get_heatmap_points(
         for i, src in enumerate(source_list):
             params[f"src_{i}"] = src
     
-    # ページング
-    query += f" ORDER BY timestamp DESC LIMIT {limit} OFFSET {offset}"
+    # キーセットページング（前ページ最終行より後ろのみ）
+    if cursor:
+        cursor_timestamp, cursor_id = _decode_cursor(cursor)
+        query += " AND (timestamp, id) < (:cursor_timestamp, :cursor_id)"
+        params["cursor_timestamp"] = cursor_timestamp
+        params["cursor_id"] = cursor_id
+    
+    # ページング（次ページの有無を判定するため1件多く取得）
+    query += f" ORDER BY timestamp DESC, id DESC LIMIT {limit + 1}"
+    if offset:
+        query += f" OFFSET {offset}"
     
     # クエリ実行
     try:
@@ -118,6 +161,10 @@ async def get_heatmap_points(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database query failed: {str(e)}")
     
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = _encode_cursor(rows[-1]["timestamp"], rows[-1]["id"]) if has_more else None
+    
     # GeoJSONフィーチャーに変換
     features = []
     for row in rows:
@@ -147,6 +194,7 @@ async def get_heatmap_points(
         features=features,
         metadata={
             "count": len(features),
+            "next_cursor": next_cursor,
             "bounds": {"north": north, "south": south, "east": east, "west": west},
             "time_range": {"start": start_time.isoformat(), "end": end_time.isoformat()},
             "filters": {
@@ -157,13 +205,171 @@ async def get_heatmap_points(
         }
     )
 
+def _mvt_cluster_cell(z: int) -> int:
+    """ズームレベルごとのクラスタリングセルサイズ（タイル座標系、0は間引きなし）"""
+    if z <= 9:
+        return 128
+    if z <= 12:
+        return 32
+    if z <= 14:
+        return 8
+    return 0
+
+@router.get("/tiles/{z}/{x}/{y}.mvt")
+async def get_heatmap_tile(
+    z: int,
+    x: int,
+    y: int,
+
+    # 時間範囲
+    start_time: Optional[datetime] = Query(None, description="開始時刻"),
+    end_time: Optional[datetime] = Query(None, description="終了時刻"),
+
+    # フィルタ条件
+    categories: Optional[str] = Query(None, description="カテゴリ（カンマ区切り）"),
+    data_sources: Optional[str] = Query(None, description="データソース（カンマ区切り）"),
+    min_intensity: Optional[float] = Query(0.0, description="最小強度")
+):
+    """
+    ヒートマップポイントのベクタータイル（Mapbox Vector Tile）を取得
+    低ズームではタイル座標系のグリッドでクラスタリングし、
+    タイルサイズがMVT_MAX_BYTESを超える場合はセルを粗くして再生成する
+    """
+
+    if z < 0 or z > 22 or not (0 <= x < 2 ** z) or not (0 <= y < 2 ** z):
+        raise HTTPException(status_code=400, detail="Invalid tile coordinates")
+
+    if not end_time:
+        end_time = datetime.now()
+    if not start_time:
+        start_time = end_time - timedelta(hours=24)
+
+    # タイル範囲（バッファ分を含めて検索し、インデックスを使うため4326に変換）
+    base_query = f"""
+    WITH bounds AS (
+        SELECT
+            ST_TileEnvelope(:z, :x, :y) AS geom,
+            ST_Transform(
+                ST_Expand(
+                    ST_TileEnvelope(:z, :x, :y),
+                    (ST_XMax(ST_TileEnvelope(:z, :x, :y)) - ST_XMin(ST_TileEnvelope(:z, :x, :y)))
+                        * {MVT_BUFFER} / {MVT_EXTENT}
+                ),
+                4326
+            ) AS search_geom
+    ),
+    points AS (
+        SELECT
+            ST_AsMVTGeom(
+                ST_Transform(h.location, 3857), bounds.geom,
+                {MVT_EXTENT}, {MVT_BUFFER}, true
+            ) AS geom,
+            h.category,
+            h.data_source,
+            h.intensity,
+            h.sentiment_score
+        FROM heatmap_points h, bounds
+        WHERE
+            h.location && bounds.search_geom
+            AND h.timestamp BETWEEN :start_time AND :end_time
+            AND h.intensity >= :min_intensity
+    """
+
+    params = {
+        "z": z, "x": x, "y": y,
+        "start_time": start_time, "end_time": end_time,
+        "min_intensity": min_intensity
+    }
+
+    # カテゴリフィルタ
+    if categories:
+        category_list = [cat.strip() for cat in categories.split(",")]
+        placeholders = ",".join([f":cat_{i}" for i in range(len(category_list))])
+        base_query += f" AND h.category IN ({placeholders})"
+        for i, cat in enumerate(category_list):
+            params[f"cat_{i}"] = cat
+
+    # データソースフィルタ
+    if data_sources:
+        source_list = [src.strip() for src in data_sources.split(",")]
+        placeholders = ",".join([f":src_{i}" for i in range(len(source_list))])
+        base_query += f" AND h.data_source IN ({placeholders})"
+        for i, src in enumerate(source_list):
+            params[f"src_{i}"] = src
+
+    base_query += "\n    ),"
+
+    # 個別ポイント（高ズーム用、強度の高い順に上限まで）
+    raw_features = f"""
+    features AS (
+        SELECT
+            geom,
+            1 AS point_count,
+            intensity,
+            sentiment_score AS avg_sentiment,
+            category,
+            data_source
+        FROM points
+        WHERE geom IS NOT NULL
+        ORDER BY intensity DESC
+        LIMIT {MVT_MAX_FEATURES}
+    )
+    """
+
+    # グリッドクラスタ（低ズーム用）
+    cluster_features = """
+    features AS (
+        SELECT
+            ST_SnapToGrid(ST_Centroid(ST_Collect(geom)), 1) AS geom,
+            COUNT(*) AS point_count,
+            SUM(intensity) AS intensity,
+            AVG(sentiment_score) AS avg_sentiment,
+            mode() WITHIN GROUP (ORDER BY category) AS category,
+            mode() WITHIN GROUP (ORDER BY data_source) AS data_source
+        FROM points
+        WHERE geom IS NOT NULL
+        GROUP BY ST_SnapToGrid(geom, CAST(:cell AS float8))
+    )
+    """
+
+    encode_query = f"SELECT ST_AsMVT(features, '{MVT_LAYER_NAME}', {MVT_EXTENT}, 'geom') AS tile FROM features"
+
+    cell = _mvt_cluster_cell(z)
+    tile = b""
+    try:
+        async with AsyncSessionLocal() as session:
+            while True:
+                if cell > 0:
+                    query = base_query + cluster_features + encode_query
+                    result = await session.execute(text(query), {**params, "cell": cell})
+                else:
+                    query = base_query + raw_features + encode_query
+                    result = await session.execute(text(query), params)
+                tile = bytes(result.scalar() or b"")
+
+                # バイト予算内に収まるまでセルを粗くする
+                if len(tile) <= MVT_MAX_BYTES or cell >= MVT_EXTENT:
+                    break
+                cell = max(cell * 2, 4)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Tile generation failed: {str(e)}")
+
+    if not tile:
+        return Response(status_code=204)
+
+    return Response(
+        content=tile,
+        media_type="application/vnd.mapbox-vector-tile",
+        headers={"X-Cluster-Cell": str(cell)}
+    )
+
 @router.get("/density")
 async def get_density_grid(
     north: float = Query(34.9),
     south: float = Query(34.0),
     east: float = Query(133.3),
     west: float = Query(132.0),
-    grid_size: float = Query(0.01, description="グリッドサイズ（度）"),
+    grid_size: float = Query(0.01, description=f"グリッドサイズ（度）。{DENSITY_GRID_LEVELS} は事前集計から高速応答"),
     start_time: Optional[datetime] = Query(None),
     end_time: Optional[datetime] = Query(None),
     categories: Optional[str] = Query(None)
@@ -175,38 +381,48 @@ async def get_density_grid(
     if not start_time:
         start_time = end_time - timedelta(hours=24)
     
-    # グリッド密度計算クエリ
-    query = """
-    SELECT 
-        FLOOR(ST_X(location) / :grid_size) * :grid_size as grid_lon,
-        FLOOR(ST_Y(location) / :grid_size) * :grid_size as grid_lat,
-        COUNT(*) as point_count,
-        AVG(intensity) as avg_intensity,
-        AVG(sentiment_score) as avg_sentiment
-    FROM heatmap_points
-    WHERE 
-        ST_Within(location, ST_MakeEnvelope(:west, :south, :east, :north, 4326))
-        AND timestamp BETWEEN :start_time AND :end_time
-    """
+    category_list = [cat.strip() for cat in categories.split(",")] if categories else None
     
-    params = {
-        "grid_size": grid_size,
-        "west": west, "south": south, "east": east, "north": north,
-        "start_time": start_time, "end_time": end_time
-    }
-    
-    if categories:
-        category_list = [cat.strip() for cat in categories.split(",")]
-        placeholders = ",".join([f":cat_{i}" for i in range(len(category_list))])
-        query += f" AND category IN ({placeholders})"
-        for i, cat in enumerate(category_list):
-            params[f"cat_{i}"] = cat
-    
-    query += " GROUP BY grid_lon, grid_lat HAVING COUNT(*) > 0"
-    
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(text(query), params)
-        rows = result.mappings().all()
+    # 定義済みグリッドサイズは事前集計キューブから応答
+    grid_level = find_grid_level(grid_size)
+    if grid_level is not None:
+        async with AsyncSessionLocal() as session:
+            rows = await query_density_cube(
+                session, grid_level, north, south, east, west,
+                start_time, end_time, category_list
+            )
+    else:
+        # 任意のグリッドサイズは生データを集計
+        query = """
+        SELECT 
+            FLOOR(ST_X(location) / :grid_size) * :grid_size as grid_lon,
+            FLOOR(ST_Y(location) / :grid_size) * :grid_size as grid_lat,
+            COUNT(*) as point_count,
+            AVG(intensity) as avg_intensity,
+            AVG(sentiment_score) as avg_sentiment
+        FROM heatmap_points
+        WHERE 
+            ST_Within(location, ST_MakeEnvelope(:west, :south, :east, :north, 4326))
+            AND timestamp BETWEEN :start_time AND :end_time
+        """
+        
+        params = {
+            "grid_size": grid_size,
+            "west": west, "south": south, "east": east, "north": north,
+            "start_time": start_time, "end_time": end_time
+        }
+        
+        if category_list:
+            placeholders = ",".join([f":cat_{i}" for i in range(len(category_list))])
+            query += f" AND category IN ({placeholders})"
+            for i, cat in enumerate(category_list):
+                params[f"cat_{i}"] = cat
+        
+        query += " GROUP BY grid_lon, grid_lat HAVING COUNT(*) > 0"
+        
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(text(query), params)
+            rows = result.mappings().all()
     
     # グリッドデータをGeoJSONに変換
     features = []
@@ -243,12 +459,14 @@ async def get_density_grid(
         "features": features,
         "metadata": {
             "grid_size": grid_size,
+            "source": "cube" if grid_level is not None else "raw",
             "cell_count": len(features),
             "total_points": sum(f["properties"]["point_count"] for f in features)
         }
     }
 
 @router.get("/categories")
+@cached("heatmap", ttl=300)
 async def get_available_categories():
     """利用可能なカテゴリ一覧の取得"""
     
@@ -10,6 +10,7 @@ from datetime import datetime
 from loguru import logger
 
 from app.core.database import get_db
+from app.core.geometry import select_with_coordinates, row_coordinates
 from app.models.heatmap import LandmarkData
 from app.schemas.landmark import (
     LandmarkResponse,
@@ -37,8 +38,8 @@ async def get_landmarks(
 ):
     """指定エリア内のランドマークを取得"""
     try:
-        # クエリ構築
-        query = select(LandmarkData).where(
+        # クエリ構築（座標も同じクエリで取得）
+        query = select_with_coordinates(LandmarkData).where(
             and_(
                 func.ST_Within(
                     LandmarkData.location,
@@ -76,20 +77,13 @@ async def get_landmarks(
         
         # 実行
         result = await db.execute(query)
-        landmarks = result.scalars().all()
+        rows = result.all()
         
         # GeoJSON形式に変換
         features = []
-        for landmark in landmarks:
-            # 座標を取得
-            coords = await db.execute(
-                select(
-                    func.ST_X(LandmarkData.location),
-                    func.ST_Y(LandmarkData.location)
-                ).where(LandmarkData.id == landmark.id)
-            )
-            coord_result = coords.first()
-            lon, lat = coord_result[0], coord_result[1]
+        for row in rows:
+            landmark = row[0]
+            lon, lat = row_coordinates(row)
             
             features.append({
                 "type": "Feature",
@@ -152,8 +146,8 @@ async def get_landmark_by_id(
 ):
     """特定のランドマーク情報を取得"""
     try:
-        # ランドマーク取得
-        query = select(LandmarkData).where(
+        # ランドマーク取得（座標も同じクエリで取得）
+        query = select_with_coordinates(LandmarkData).where(
             and_(
                 LandmarkData.id == landmark_id,
                 LandmarkData.is_active == True
@@ -161,20 +155,13 @@ async def get_landmark_by_id(
         )
         
         result = await db.execute(query)
-        landmark = result.scalar_one_or_none()
+        row = result.one_or_none()
         
-        if not landmark:
+        if not row:
             raise HTTPException(status_code=404, detail="Landmark not found")
         
-        # 座標を取得
-        coords = await db.execute(
-            select(
-                func.ST_X(LandmarkData.location),
-                func.ST_Y(LandmarkData.location)
-            ).where(LandmarkData.id == landmark.id)
-        )
-        coord_result = coords.first()
-        lon, lat = coord_result[0], coord_result[1]
+        landmark = row[0]
+        lon, lat = row_coordinates(row)
         
         return {
             "id": str(landmark.id),
@@ -323,7 +310,7 @@ async def get_nearby_landmarks(
             func.ST_Transform(point, 3857)
         )
         
-        query = select(
+        query = select_with_coordinates(
             LandmarkData,
             distance.label('distance')
         ).where(
@@ -344,16 +331,9 @@ async def get_nearby_landmarks(
         
         # レスポンス形式に変換
         nearby_landmarks = []
-        for landmark, distance_m in landmarks_with_distance:
-            # 座標を取得
-            coords = await db.execute(
-                select(
-                    func.ST_X(LandmarkData.location),
-                    func.ST_Y(LandmarkData.location)
-                ).where(LandmarkData.id == landmark.id)
-            )
-            coord_result = coords.first()
-            landmark_lon, landmark_lat = coord_result[0], coord_result[1]
+        for row in landmarks_with_distance:
+            landmark, distance_m = row[0], row.distance
+            landmark_lon, landmark_lat = row_coordinates(row)
             
             nearby_landmarks.append({
                 "id": str(landmark.id),
@@ -10,6 +10,7 @@ from datetime import datetime, timedelta
 from loguru import logger
 
 from app.core.database import get_db
+from app.core.geometry import select_with_coordinates, coordinate_columns, row_coordinates
 from app.models.mobility import MobilityFlow, AccommodationData, ConsumptionData
 from app.schemas.mobility import (
     MobilityFlowResponse, 
@@ -43,8 +44,8 @@ async def get_mobility_flows(
         if not start_time:
             start_time = end_time - timedelta(hours=24)
         
-        # クエリ構築（主要ルートのみ取得）
-        query = select(MobilityFlow).where(
+        # クエリ構築（主要ルートのみ取得、起点・終点座標も同じクエリで取得）
+        query = select_with_coordinates(MobilityFlow).where(
             and_(
                 MobilityFlow.timestamp >= start_time,
                 MobilityFlow.timestamp <= end_time,
@@ -66,29 +67,14 @@ async def get_mobility_flows(
         
         # 実行
         result = await db.execute(query)
-        flows = result.scalars().all()
+        rows = result.all()
         
         # GeoJSON形式に変換
         features = []
-        for flow in flows:
-            # 起点と終点の座標を取得
-            origin_coords = await db.execute(
-                select(
-                    func.ST_X(MobilityFlow.origin_location),
-                    func.ST_Y(MobilityFlow.origin_location)
-                ).where(MobilityFlow.id == flow.id)
-            )
-            origin_result = origin_coords.first()
-            origin_lon, origin_lat = origin_result[0], origin_result[1]
-            
-            dest_coords = await db.execute(
-                select(
-                    func.ST_X(MobilityFlow.destination_location),
-                    func.ST_Y(MobilityFlow.destination_location)
-                ).where(MobilityFlow.id == flow.id)
-            )
-            dest_result = dest_coords.first()
-            dest_lon, dest_lat = dest_result[0], dest_result[1]
+        for row in rows:
+            flow = row[0]
+            origin_lon, origin_lat = row_coordinates(row, "origin_location")
+            dest_lon, dest_lat = row_coordinates(row, "destination_location")
             
             features.append({
                 "type": "Feature",
@@ -146,9 +132,9 @@ async def get_mobility_heatmap(
         start_time = timestamp - timedelta(minutes=30)
         end_time = timestamp + timedelta(minutes=30)
         
-        # エリア内の人流を集計
+        # エリア内の人流を集計（座標も同じクエリで取得）
         query = select(
-            MobilityFlow.origin_location,
+            *coordinate_columns(MobilityFlow.origin_location),
             func.sum(MobilityFlow.flow_count).label('total_flow')
         ).where(
             and_(
@@ -169,14 +155,7 @@ async def get_mobility_heatmap(
         max_flow = max([p.total_flow for p in points]) if points else 1
         
         for point in points:
-            coords = await db.execute(
-                select(
-                    func.ST_X(point.origin_location),
-                    func.ST_Y(point.origin_location)
-                )
-            )
-            coord_result = coords.first()
-            lon, lat = coord_result[0], coord_result[1]
+            lon, lat = row_coordinates(point, "origin_location")
             
             features.append({
                 "type": "Feature",
@@ -220,8 +199,8 @@ async def get_accommodation_data(
         # datetimeオブジェクトから日付部分のみを取得
         target_date = date.date() if isinstance(date, datetime) else date
         
-        # クエリ構築
-        query = select(AccommodationData).where(
+        # クエリ構築（座標も同じクエリで取得）
+        query = select_with_coordinates(AccommodationData).where(
             func.date(AccommodationData.date) == target_date
         )
         
@@ -231,7 +210,8 @@ async def get_accommodation_data(
             query = query.where(AccommodationData.facility_type == facility_type)
         
         result = await db.execute(query)
-        accommodations = result.scalars().all()
+        rows = result.all()
+        accommodations = [row[0] for row in rows]
         
         # 集計データ
         total_rooms = sum(a.total_rooms or 0 for a in accommodations)
@@ -240,15 +220,9 @@ async def get_accommodation_data(
         
         # 施設ごとのデータ
         facilities = []
-        for acc in accommodations:
-            coords = await db.execute(
-                select(
-                    func.ST_X(acc.location),
-                    func.ST_Y(acc.location)
-                ).where(AccommodationData.id == acc.id)
-            )
-            coord_result = coords.first()
-            lon, lat = coord_result[0], coord_result[1]
+        for row in rows:
+            acc = row[0]
+            lon, lat = row_coordinates(row)
             
             facilities.append({
                 "facility_id": acc.facility_id,
@@ -296,8 +270,8 @@ async def get_consumption_data(
         if not start_time:
             start_time = end_time - timedelta(hours=24)
         
-        # クエリ構築
-        query = select(ConsumptionData).where(
+        # クエリ構築（座標も同じクエリで取得）
+        query = select_with_coordinates(ConsumptionData).where(
             and_(
                 ConsumptionData.timestamp >= start_time,
                 ConsumptionData.timestamp <= end_time
@@ -310,7 +284,8 @@ async def get_consumption_data(
             query = query.where(ConsumptionData.store_category == store_category)
         
         result = await db.execute(query)
-        consumptions = result.scalars().all()
+        rows = result.all()
+        consumptions = [row[0] for row in rows]
         
         # カテゴリ別集計
         category_summary = {}
@@ -348,15 +323,9 @@ async def get_consumption_data(
         
         # 店舗データ
         stores = []
-        for cons in consumptions[:50]:  # 上位50店舗
-            coords = await db.execute(
-                select(
-                    func.ST_X(cons.location),
-                    func.ST_Y(cons.location)
-                ).where(ConsumptionData.id == cons.id)
-            )
-            coord_result = coords.first()
-            lon, lat = coord_result[0], coord_result[1]
+        for row in rows[:50]:  # 上位50店舗
+            cons = row[0]
+            lon, lat = row_coordinates(row)
             
             stores.append({
                 "store_id": cons.store_id,
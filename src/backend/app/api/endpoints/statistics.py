@@ -7,6 +7,7 @@ from fastapi import APIRouter, Query, HTTPException
 from typing import Optional, List, Dict
 from datetime import datetime, timedelta
 from app.core.database import AsyncSessionLocal
+from app.core.cache import cached
 from pydantic import BaseModel
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -46,6 +47,7 @@ class StatsSummary(BaseModel):
     peak_hours: List[int]
 
 @router.get("/summary", response_model=StatsSummary)
+@cached("statistics", ttl=60)
 async def get_statistics_summary(
     start_time: Optional[datetime] = Query(None, description="開始時刻"),
     end_time: Optional[datetime] = Query(None, description="終了時刻"),
@@ -73,79 +75,72 @@ async def get_statistics_summary(
     
     where_clause = " AND ".join(where_conditions)
     
-    # 1. 総ポイント数
-    total_query = text(f"SELECT COUNT(*) as total FROM heatmap_points WHERE {where_clause}")
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(total_query, params)
-        total_result = result.mappings().first()
-        total_points = total_result["total"] if total_result else 0
-    
-    # 2. カテゴリ別統計
-    category_query = f"""
+    # 総数・カテゴリ別・感情分布・時間帯別を1回のスキャンで集計
+    summary_query = f"""
     SELECT 
         category,
-        COUNT(*) as point_count,
-        AVG(intensity) as avg_intensity,
-        AVG(sentiment_score) as avg_sentiment,
-        COUNT(*) * 100.0 / (SELECT COUNT(*) FROM heatmap_points WHERE {where_clause}) as percentage
-    FROM heatmap_points 
-    WHERE {where_clause}
-    GROUP BY category
-    ORDER BY point_count DESC
+        sentiment_category,
+        hour,
+        GROUPING(category) AS by_category,
+        GROUPING(sentiment_category) AS by_sentiment,
+        GROUPING(hour) AS by_hour,
+        COUNT(*) AS point_count,
+        AVG(intensity) AS avg_intensity,
+        AVG(sentiment_score) AS avg_sentiment
+    FROM (
+        SELECT 
+            category,
+            CASE 
+                WHEN sentiment_score IS NULL THEN NULL
+                WHEN sentiment_score >= 0.3 THEN 'positive'
+                WHEN sentiment_score <= -0.3 THEN 'negative'
+                ELSE 'neutral'
+            END AS sentiment_category,
+            EXTRACT(hour FROM timestamp)::int AS hour,
+            intensity,
+            sentiment_score
+        FROM heatmap_points 
+        WHERE {where_clause}
+    ) points
+    GROUP BY GROUPING SETS ((), (category), (sentiment_category), (hour))
     """
     
     async with AsyncSessionLocal() as session:
-        result = await session.execute(text(category_query), params)
-        category_results = result.mappings().all()
+        result = await session.execute(text(summary_query), params)
+        rows = result.mappings().all()
+    
+    # GROUPINGフラグ（0 = その列で集計）でグルーピングセットを振り分け
+    total_points = 0
+    category_rows = []
+    sentiment_distribution = {}
+    hour_counts = []
+    for row in rows:
+        if row["by_category"] and row["by_sentiment"] and row["by_hour"]:
+            total_points = row["point_count"]
+        elif not row["by_category"]:
+            category_rows.append(row)
+        elif not row["by_sentiment"]:
+            # sentiment_scoreがNULLの行は感情分布に含めない
+            if row["sentiment_category"] is not None:
+                sentiment_distribution[row["sentiment_category"]] = row["point_count"]
+        elif not row["by_hour"]:
+            hour_counts.append((row["hour"], row["point_count"]))
+    
+    category_rows.sort(key=lambda row: row["point_count"], reverse=True)
     category_breakdown = [
         CategoryStats(
             category=row["category"],
             point_count=row["point_count"],
             avg_intensity=float(row["avg_intensity"]) if row["avg_intensity"] else 0,
             avg_sentiment=float(row["avg_sentiment"]) if row["avg_sentiment"] else 0,
-            percentage=float(row["percentage"]) if row["percentage"] else 0
+            percentage=row["point_count"] * 100.0 / total_points if total_points else 0
         )
-        for row in category_results
+        for row in category_rows
     ]
     
-    # 3. 感情分布
-    sentiment_query = f"""
-    SELECT 
-        CASE 
-            WHEN sentiment_score >= 0.3 THEN 'positive'
-            WHEN sentiment_score <= -0.3 THEN 'negative'
-            ELSE 'neutral'
-        END as sentiment_category,
-        COUNT(*) as count
-    FROM heatmap_points 
-    WHERE {where_clause} AND sentiment_score IS NOT NULL
-    GROUP BY sentiment_category
-    """
-    
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(text(sentiment_query), params)
-        sentiment_results = result.mappings().all()
-    sentiment_distribution = {
-        row["sentiment_category"]: row["count"] 
-        for row in sentiment_results
-    }
-    
-    # 4. ピーク時間帯
-    peak_hours_query = f"""
-    SELECT 
-        EXTRACT(hour FROM timestamp) as hour,
-        COUNT(*) as count
-    FROM heatmap_points 
-    WHERE {where_clause}
-    GROUP BY hour
-    ORDER BY count DESC
-    LIMIT 5
-    """
-    
-    async with AsyncSessionLocal() as session:
-        result = await session.execute(text(peak_hours_query), params)
-        peak_results = result.mappings().all()
-    peak_hours = [int(row["hour"]) for row in peak_results]
+    # ピーク時間帯（件数上位5）
+    hour_counts.sort(key=lambda item: item[1], reverse=True)
+    peak_hours = [int(hour) for hour, _ in hour_counts[:5]]
     
     return StatsSummary(
         total_points=total_points,
@@ -2,98 +2,172 @@
 実データAPIエンドポイント
 広島GTFS、山口県オープンデータなどの実データを提供
 """
-from fastapi import APIRouter, HTTPException, Depends
-from typing import Dict, Any, List
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import Dict, Any, List, Optional
+from datetime import date
 import json
 import os
 from pathlib import Path
+from sqlalchemy import text
 from sqlalchemy.orm import Session
-from app.core.database import get_db
+from app.core.cache import cached
+from app.core.database import AsyncSessionLocal, get_db
+from app.services.transit_supply import SERVICE_HOURS, get_route_supply, get_stop_supply
 
 router = APIRouter()
 
 # データディレクトリ
 DATA_DIR = Path("/app/uesugi-engine-data")
-GTFS_DIR = DATA_DIR / "hiroshima" / "transport" / "bus" / "gtfs_extracted"
 YAMAGUCHI_DIR = DATA_DIR / "yamaguchi"
 
 @router.get("/transport/gtfs/hiroshima")
-async def get_hiroshima_gtfs_data(db: Session = Depends(get_db)):
-    """広島電鉄GTFSデータを取得"""
+async def get_hiroshima_gtfs_data(
+    north: Optional[float] = Query(None, ge=-90, le=90, description="北端の緯度"),
+    south: Optional[float] = Query(None, ge=-90, le=90, description="南端の緯度"),
+    east: Optional[float] = Query(None, ge=-180, le=180, description="東端の経度"),
+    west: Optional[float] = Query(None, ge=-180, le=180, description="西端の経度"),
+    zoom: Optional[int] = Query(None, ge=0, le=22, description="地図のズームレベル（低ズームでは停留所を間引く）"),
+    agency: str = Query("hiroden", description="事業者ID（既定は広島電鉄、allで全事業者）"),
+    limit: int = Query(200, ge=1, le=10000, description="最大件数")
+):
+    """
+    広島電鉄GTFSの停留所を取得
+    一度だけ読み込んだ停留所カタログから、表示範囲・ズーム・事業者で絞り込んで返す
+    """
     try:
-        # GTFSデータから停留所情報を読み込み
-        stops_file = GTFS_DIR / "stops.txt"
-        routes_file = GTFS_DIR / "routes.txt"
+        from app.services.gtfs_stop_catalog import gtfs_stop_catalog
+        await gtfs_stop_catalog.ensure_loaded()
+        return gtfs_stop_catalog.query(
+            north, south, east, west, zoom, None if agency == "all" else agency, limit
+        )
         
-        if not stops_file.exists():
-            # DBから取得を試みる
-            from sqlalchemy import text
-            result = db.execute(text("""
-                SELECT stop_id, stop_name, stop_lat, stop_lon, stop_code
-                FROM gtfs_stops
-                WHERE agency_id = 'hiroden'
-                LIMIT 500
-            """))
-            
-            features = []
-            for row in result:
-                features.append({
-                    "type": "Feature",
-                    "geometry": {
-                        "type": "Point",
-                        "coordinates": [float(row.stop_lon), float(row.stop_lat)]
-                    },
-                    "properties": {
-                        "stop_id": row.stop_id,
-                        "stop_name": row.stop_name,
-                        "stop_code": row.stop_code,
-                        "type": "tram_stop",
-                        "color": "#FF6B6B"
-                    }
-                })
-            
-            return {
-                "type": "FeatureCollection",
-                "features": features
-            }
-        
-        # ファイルから読み込み（BOM対応）
-        features = []
-        with open(stops_file, 'r', encoding='utf-8-sig') as f:
-            lines = f.readlines()
-            headers = lines[0].strip().split(',')
-            
-            for line in lines[1:]:
-                data = line.strip().split(',')
-                if len(data) >= 6 and data[4] and data[5]:  # stop_lat, stop_lon が存在
-                    try:
-                        lat = float(data[4])
-                        lon = float(data[5])
-                        features.append({
-                            "type": "Feature",
-                            "geometry": {
-                                "type": "Point",
-                                "coordinates": [lon, lat]
-                            },
-                            "properties": {
-                                "stop_id": data[0],
-                                "stop_name": data[2] if data[2] else "停留所",
-                                "stop_code": data[1] if data[1] else "",
-                                "type": "tram_stop",
-                                "color": "#FF6B6B"
-                            }
-                        })
-                    except ValueError:
-                        # 無効な座標データはスキップ
-                        continue
+    except Exception as e:
+        print(f"GTFS data error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/transport/gtfs/summary")
+@cached("transport", ttl=300)
+async def get_gtfs_summary():
+    """
+    GTFS分析サマリー（路線別停留所数・エリア別停留所密度・時間帯別運行本数）
+    GTFS統合時にリフレッシュされるマテリアライズドビューから取得する
+    """
+    try:
+        async with AsyncSessionLocal() as session:
+            routes = (await session.execute(text("""
+                SELECT route_id, route_long_name, route_short_name, agency_name, stop_count
+                FROM v_route_stop_count
+                ORDER BY stop_count DESC, route_id
+            """))).mappings().all()
+            density = (await session.execute(text("""
+                SELECT grid_x, grid_y, stop_count
+                FROM v_stop_density
+                ORDER BY stop_count DESC
+            """))).mappings().all()
+            frequency = (await session.execute(text("""
+                SELECT hour, trip_count
+                FROM v_service_frequency
+                ORDER BY hour
+            """))).mappings().all()
         
         return {
-            "type": "FeatureCollection",
-            "features": features[:200]  # 最初の200停留所
+            "routes": [dict(row) for row in routes],
+            "stop_density": [
+                {
+                    "grid_lon": round(row["grid_x"] * 0.01, 2),
+                    "grid_lat": round(row["grid_y"] * 0.01, 2),
+                    "stop_count": row["stop_count"]
+                }
+                for row in density
+            ],
+            # 24時以降の便は hour が24以上になる
+            "service_frequency": [
+                {"hour": int(row["hour"]), "trip_count": row["trip_count"]}
+                for row in frequency
+            ],
+            "totals": {
+                "routes": len(routes),
+                "stops": sum(row["stop_count"] for row in density),
+                "peak_hourly_trips": max((row["trip_count"] for row in frequency), default=0)
+            }
         }
         
     except Exception as e:
-        print(f"GTFS data error: {e}")
+        print(f"GTFS summary error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/transport/gtfs/supply/stops")
+@cached("transport", ttl=300)
+async def get_gtfs_stop_supply(
+    service_date: Optional[date] = Query(None, description="運行日（省略時は今日）"),
+    start_hour: int = Query(0, ge=0, le=29, description="集計開始時（24時以降は24, 25...）"),
+    end_hour: int = Query(SERVICE_HOURS, ge=1, le=SERVICE_HOURS, description="集計終了時（この時は含まない）"),
+    north: Optional[float] = Query(None, ge=-90, le=90, description="北端の緯度"),
+    south: Optional[float] = Query(None, ge=-90, le=90, description="南端の緯度"),
+    east: Optional[float] = Query(None, ge=-180, le=180, description="東端の経度"),
+    west: Optional[float] = Query(None, ge=-180, le=180, description="西端の経度"),
+    limit: int = Query(5000, ge=1, le=20000, description="最大件数")
+):
+    """
+    停留所別の公共交通供給量（運行本数・1時間あたり本数・平均運行間隔・始発/終発）
+    運行日ごとに事前計算した結果を返す（未計算の日は初回に計算する）
+    """
+    if end_hour <= start_hour:
+        raise HTTPException(status_code=400, detail="end_hour must be greater than start_hour")
+    try:
+        async with AsyncSessionLocal() as session:
+            return await get_stop_supply(
+                session, service_date or date.today(), start_hour, end_hour, north, south, east, west, limit
+            )
+    except Exception as e:
+        print(f"GTFS supply error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/transport/gtfs/supply/routes")
+@cached("transport", ttl=300)
+async def get_gtfs_route_supply(
+    service_date: Optional[date] = Query(None, description="運行日（省略時は今日）"),
+    start_hour: int = Query(0, ge=0, le=29, description="集計開始時（24時以降は24, 25...）"),
+    end_hour: int = Query(SERVICE_HOURS, ge=1, le=SERVICE_HOURS, description="集計終了時（この時は含まない）"),
+    agency: Optional[str] = Query(None, description="事業者ID")
+):
+    """路線別の公共交通供給量（便数・1時間あたり便数・平均運行間隔・始発/終発）"""
+    if end_hour <= start_hour:
+        raise HTTPException(status_code=400, detail="end_hour must be greater than start_hour")
+    try:
+        async with AsyncSessionLocal() as session:
+            return await get_route_supply(session, service_date or date.today(), start_hour, end_hour, agency)
+    except Exception as e:
+        print(f"GTFS supply error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/transport/gtfs/reachability")
+async def get_gtfs_reachability(
+    lat: float = Query(..., ge=-90, le=90, description="出発地点の緯度"),
+    lon: float = Query(..., ge=-180, le=180, description="出発地点の経度"),
+    departure_time: str = Query("08:00", pattern=r"^([01]?\d|2\d):[0-5]\d$", description="出発時刻 HH:MM（24時以降は25:00のように指定）"),
+    service_date: Optional[date] = Query(None, description="運行日（省略時は今日）"),
+    budget_min: int = Query(60, ge=5, le=180, description="所要時間の上限（分）"),
+    isochrone_interval_min: Optional[int] = Query(None, ge=5, le=60, description="指定すると、この間隔（分）ごとの到達圏ポリゴンも返す")
+):
+    """
+    公共交通による到達圏
+    出発地点から徒歩とGTFSの時刻表で到達できる停留所と到着時刻を返す
+    """
+    hours, minutes = departure_time.split(":")
+    departure_sec = int(hours) * 3600 + int(minutes) * 60
+    try:
+        from app.services.transit_router import transit_router
+        return await transit_router.reachability(
+            lon,
+            lat,
+            service_date or date.today(),
+            departure_sec,
+            budget_min * 60,
+            isochrone_interval_min * 60 if isochrone_interval_min else None
+        )
+    except Exception as e:
+        print(f"GTFS reachability error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/tourism/facilities/yamaguchi")
@@ -199,289 +273,69 @@ async def get_real_accommodation_data(prefecture: str, db: Session = Depends(get
         return {"type": "FeatureCollection", "features": []}
 
 @router.get("/mobility/real/{prefecture}")
-async def get_real_mobility_data(prefecture: str, city_only: bool = False):
-    """実際の人流データ（統計的推定モデルベース）"""
+async def get_real_mobility_data(
+    prefecture: str,
+    city_only: bool = False,
+    format: str = Query("geojson", pattern="^(geojson|binary)$", description="geojson または binary（列指向の型付き配列）")
+):
+    """
+    実際の人流データ（統計的推定モデルベース）
+    時間帯ごとに事前計算したシリアライズ済みデータをそのまま返す
+    format=binary の場合は application/octet-stream の列指向バイナリを返す
+    """
     try:
-        from app.services.mobility_estimator import MobilityEstimator
-        estimator = MobilityEstimator()
-        # 人流データの仕様について相談が必要
-        # 現在のAPIは線データのみ返していますが、
-        # ダミーデータのようなパーティクル表現を実現するには
-        # 以下のようなデータ形式が必要です：
-        
-        # 1. パーティクルデータ（混雑地点）
-        #    - 各地点の位置と混雑度
-        #    - リアルタイムで動くパーティクルの表現
-        
-        # 2. フローデータ（移動経路）
-        #    - 起点終点の位置と移動量
-        #    - アニメーション付きの光の流れ
+        from app.services.mobility_precompute import PAYLOAD_MEDIA_TYPES, mobility_payload_store
+        payload, precomputed = await mobility_payload_store.get(prefecture, city_only, format)
+        return Response(
+            content=payload,
+            media_type=PAYLOAD_MEDIA_TYPES[format],
+            headers={"X-Cache": "HIT" if precomputed else "MISS"}
+        )
         
-        # パーティクルアニメーション用のデータ形式に変換
-        # 広島県の主要地点（県全域をカバー）
-        hiroshima_points = [
-            # 広島市中心部（人口: 約120万人）
-            {"name": "広島駅", "lat": 34.3974, "lon": 132.4753, "population": 140000},
-            {"name": "紙屋町", "lat": 34.3954, "lon": 132.4572, "population": 85000},
-            {"name": "八丁堀", "lat": 34.3936, "lon": 132.4636, "population": 75000},
-            {"name": "平和記念公園", "lat": 34.3954, "lon": 132.4534, "population": 30000},
-            {"name": "本通り", "lat": 34.3934, "lon": 132.4615, "population": 50000},
-            {"name": "広島城", "lat": 34.4027, "lon": 132.4590, "population": 5000},
-            {"name": "マツダスタジアム", "lat": 34.3933, "lon": 132.4845, "population": 32000},
-            {"name": "宇品港", "lat": 34.3488, "lon": 132.4533, "population": 15000},
-            {"name": "横川駅", "lat": 34.4107, "lon": 132.4525, "population": 35000},
-            {"name": "西広島駅", "lat": 34.3747, "lon": 132.4385, "population": 25000},
-            {"name": "広島大学", "lat": 34.4047, "lon": 132.7139, "population": 15000},
-            {"name": "広島空港", "lat": 34.4361, "lon": 132.9194, "population": 20000},
-            {"name": "広島市役所", "lat": 34.3853, "lon": 132.4553, "population": 10000},
-            
-            # 広島市各区
-            {"name": "安佐南区中心", "lat": 34.4520, "lon": 132.4710, "population": 24000},
-            {"name": "安佐北区中心", "lat": 34.5180, "lon": 132.5080, "population": 14000},
-            {"name": "佐伯区中心", "lat": 34.3670, "lon": 132.3610, "population": 14000},
-            {"name": "安芸区中心", "lat": 34.3580, "lon": 132.5560, "population": 8000},
-            {"name": "南区中心", "lat": 34.3800, "lon": 132.4680, "population": 14000},
-            {"name": "東区中心", "lat": 34.3960, "lon": 132.4820, "population": 12000},
-            {"name": "西区中心", "lat": 34.3940, "lon": 132.4340, "population": 19000},
-            
-            # 東広島市（人口: 約19万人）
-            {"name": "西条駅", "lat": 34.4308, "lon": 132.7425, "population": 30000},
-            {"name": "東広島市役所", "lat": 34.4283, "lon": 132.7467, "population": 10000},
-            {"name": "広島大学東広島キャンパス", "lat": 34.4018, "lon": 132.7126, "population": 20000},
-            {"name": "八本松駅", "lat": 34.4241, "lon": 132.6913, "population": 8000},
-            {"name": "高屋駅", "lat": 34.4483, "lon": 132.8061, "population": 5000},
-            {"name": "黒瀬", "lat": 34.3686, "lon": 132.6626, "population": 6000},
-            {"name": "フジグラン東広島", "lat": 34.4320, "lon": 132.7380, "population": 12000},
-            {"name": "ゆめタウン東広島", "lat": 34.4250, "lon": 132.7450, "population": 10000},
-            
-            # 呉市（人口: 約21万人）
-            {"name": "呉駅", "lat": 34.2490, "lon": 132.5556, "population": 30000},
-            {"name": "呉市役所", "lat": 34.2381, "lon": 132.5659, "population": 8000},
-            {"name": "大和ミュージアム", "lat": 34.2415, "lon": 132.5552, "population": 10000},
-            {"name": "広駅", "lat": 34.2430, "lon": 132.5300, "population": 15000},
-            {"name": "安浦駅", "lat": 34.2770, "lon": 132.7550, "population": 5000},
-            {"name": "音戸", "lat": 34.1830, "lon": 132.5350, "population": 6000},
-            {"name": "呉中央商店街", "lat": 34.2480, "lon": 132.5570, "population": 8000},
-            {"name": "呉ポートピアパーク", "lat": 34.2520, "lon": 132.5480, "population": 5000},
-            
-            # 福山市（人口: 約46万人）
-            {"name": "福山駅", "lat": 34.4858, "lon": 133.3627, "population": 60000},
-            {"name": "福山城", "lat": 34.4900, "lon": 133.3627, "population": 8000},
-            {"name": "鞆の浦", "lat": 34.3833, "lon": 133.3883, "population": 5000},
-            {"name": "松永駅", "lat": 34.4500, "lon": 133.2550, "population": 15000},
-            {"name": "新市駅", "lat": 34.5350, "lon": 133.2880, "population": 8000},
-            {"name": "神辺駅", "lat": 34.5430, "lon": 133.3900, "population": 10000},
-            {"name": "福山市役所", "lat": 34.4870, "lon": 133.3600, "population": 10000},
-            {"name": "福山東IC", "lat": 34.5030, "lon": 133.3950, "population": 5000},
-            {"name": "福山駅前商店街", "lat": 34.4880, "lon": 133.3600, "population": 12000},
-            
-            # 尾道市（人口: 約13万人）
-            {"name": "尾道駅", "lat": 34.4090, "lon": 133.1950, "population": 20000},
-            {"name": "千光寺", "lat": 34.4097, "lon": 133.1989, "population": 8000},
-            {"name": "しまなみ海道（尾道IC）", "lat": 34.4041, "lon": 133.1875, "population": 10000},
-            {"name": "向島", "lat": 34.3890, "lon": 133.2150, "population": 6000},
-            {"name": "因島", "lat": 34.3100, "lon": 133.1650, "population": 5000},
-            {"name": "瀬戸田", "lat": 34.3050, "lon": 133.0870, "population": 3000},
-            
-            # 三原市（人口: 約9万人）
-            {"name": "三原駅", "lat": 34.3988, "lon": 133.0792, "population": 15000},
-            {"name": "三原市役所", "lat": 34.3992, "lon": 133.0783, "population": 5000},
-            {"name": "本郷駅", "lat": 34.4370, "lon": 132.9890, "population": 8000},
-            {"name": "三原港", "lat": 34.3950, "lon": 133.0820, "population": 5000},
-            {"name": "須波", "lat": 34.3430, "lon": 133.0250, "population": 3000},
-            
-            # 廿日市市（人口: 約12万人）
-            {"name": "廿日市駅", "lat": 34.3483, "lon": 132.3317, "population": 15000},
-            {"name": "宮島口駅", "lat": 34.3139, "lon": 132.3028, "population": 10000},
-            {"name": "厳島神社", "lat": 34.2968, "lon": 132.3198, "population": 20000},
-            {"name": "大野浦駅", "lat": 34.2870, "lon": 132.2750, "population": 5000},
-            {"name": "吉和", "lat": 34.5230, "lon": 132.0790, "population": 1000},
-            
-            # 三次市（人口: 約5万人、県北部）
-            {"name": "三次駅", "lat": 34.8056, "lon": 132.8528, "population": 8000},
-            {"name": "三次市役所", "lat": 34.8053, "lon": 132.8522, "population": 3000},
-            {"name": "十日市", "lat": 34.7950, "lon": 132.8600, "population": 5000},
-            {"name": "君田", "lat": 34.8522, "lon": 132.8556, "population": 1500},
-            {"name": "作木", "lat": 34.8430, "lon": 132.7450, "population": 1200},
-            
-            # 庄原市（人口: 約3.5万人、県北東部）
-            {"name": "備後庄原駅", "lat": 34.8572, "lon": 133.0167, "population": 5000},
-            {"name": "庄原市役所", "lat": 34.8569, "lon": 133.0169, "population": 2000},
-            {"name": "東城", "lat": 34.8890, "lon": 133.2780, "population": 3000},
-            {"name": "西城", "lat": 34.9260, "lon": 132.9940, "population": 2000},
-            {"name": "高野", "lat": 35.0350, "lon": 132.8560, "population": 1000},
-            
-            # 大竹市（人口: 約2.7万人）
-            {"name": "大竹駅", "lat": 34.2380, "lon": 132.2220, "population": 8000},
-            {"name": "玖波駅", "lat": 34.2080, "lon": 132.2000, "population": 5000},
-            
-            # 竹原市（人口: 約2.5万人）
-            {"name": "竹原駅", "lat": 34.3420, "lon": 132.9070, "population": 8000},
-            {"name": "忠海駅", "lat": 34.3750, "lon": 132.9680, "population": 3000},
-            
-            # 江田島市（人口: 約2.3万人）
-            {"name": "小用港", "lat": 34.2230, "lon": 132.4710, "population": 3000},
-            {"name": "切串港", "lat": 34.1890, "lon": 132.4440, "population": 2000},
-            
-            # 府中市（人口: 約4万人）
-            {"name": "府中駅", "lat": 34.5680, "lon": 133.2370, "population": 5000},
-            {"name": "上下駅", "lat": 34.6780, "lon": 133.1820, "population": 2000},
-            
-            # 安芸高田市（人口: 約2.8万人）
-            {"name": "向原駅", "lat": 34.5590, "lon": 132.6850, "population": 3000},
-            {"name": "吉田", "lat": 34.6730, "lon": 132.7050, "population": 4000},
-            
-            # 安芸太田町（人口: 約6千人）
-            {"name": "加計", "lat": 34.5890, "lon": 132.3180, "population": 2000},
-            {"name": "戸河内IC", "lat": 34.6350, "lon": 132.1780, "population": 1000},
-            
-            # 北広島町（人口: 約1.8万人）
-            {"name": "千代田", "lat": 34.6730, "lon": 132.5510, "population": 3000},
-            {"name": "豊平", "lat": 34.6890, "lon": 132.4230, "population": 1500},
-            
-            # 主要IC・JCT
-            {"name": "広島IC", "lat": 34.3847, "lon": 132.4147, "population": 10000},
-            {"name": "広島JCT", "lat": 34.3944, "lon": 132.3850, "population": 8000},
-            {"name": "福山西IC", "lat": 34.5156, "lon": 133.2775, "population": 5000},
-            {"name": "尾道IC", "lat": 34.4550, "lon": 133.1633, "population": 5000},
-            {"name": "東広島IC", "lat": 34.3910, "lon": 132.6740, "population": 3000},
-            {"name": "高田IC", "lat": 34.6210, "lon": 132.6930, "population": 2000}
-        ]
-        
-        # 山口県の主要地点
-        yamaguchi_points = [
-            {"name": "下関駅", "lat": 33.9507, "lon": 130.9239},
-            {"name": "唐戸市場", "lat": 33.9567, "lon": 130.9444},
-            {"name": "山口駅", "lat": 34.1858, "lon": 131.4714},
-            {"name": "県庁", "lat": 34.1786, "lon": 131.4738},
-            {"name": "新山口駅", "lat": 34.0328, "lon": 131.0828},
-            {"name": "防府駅", "lat": 34.0511, "lon": 131.5639},
-            {"name": "徳山駅", "lat": 34.0520, "lon": 131.8058},
-            {"name": "岩国駅", "lat": 34.1658, "lon": 132.2200},
-            {"name": "萩市", "lat": 34.4083, "lon": 131.3989},
-            {"name": "宇部空港", "lat": 33.9301, "lon": 131.2788}
-        ]
-        
-        # 統計的推定モデルを使用してリアルなフローを生成
-        points = hiroshima_points if prefecture == "広島県" else yamaguchi_points
-        
-        # OD行列の推定
-        estimated_flows = estimator.estimate_od_matrix(points, prefecture)
-        
-        # 段階的読み込み対応
-        if city_only and prefecture == "広島県":
-            # 広島市内のフローのみをフィルタリング
-            hiroshima_city_keywords = ['広島駅', '紙屋町', '八丁堀', '平和記念', '本通り', '広島城', 
-                                     'マツダスタジアム', '宇品', '横川', '西広島', '広島市役所',
-                                     '安佐南区', '安佐北区', '佐伯区', '安芸区', '南区', '東区', '西区', '中区',
-                                     '広島IC', '広島JCT']
-            
-            city_flows = []
-            for flow in estimated_flows:
-                origin_is_city = any(keyword in flow["origin"]["name"] for keyword in hiroshima_city_keywords)
-                dest_is_city = any(keyword in flow["destination"]["name"] for keyword in hiroshima_city_keywords)
-                if origin_is_city and dest_is_city:
-                    city_flows.append(flow)
-            
-            # 上位の主要フローのみを抽出
-            city_flows.sort(key=lambda x: x["volume"], reverse=True)
-            major_flows = city_flows[:500]  # 市内は500フローまで
-        else:
-            # 上位の主要フローのみを抽出（視覚化のため）
-            estimated_flows.sort(key=lambda x: x["volume"], reverse=True)
-            # 広島県は全フロー表示（最大2000まで）、山口県は100
-            major_flows = estimated_flows[:2000] if prefecture == "広島県" else estimated_flows[:100]
-        
-        mobility_data = {
-            prefecture: {
-                "flows": major_flows
-            }
-        }
-        
-        prefecture_data = mobility_data.get(prefecture, {"flows": []})
-        flows = prefecture_data["flows"]
+    except Exception as e:
+        print(f"Mobility data error: {e}")
+        return {"flows": []}
+
+@router.get("/mobility/real/{prefecture}/routes")
+async def get_real_mobility_routes(
+    prefecture: str,
+    city_only: bool = False,
+    zoom: int = Query(11, ge=0, le=22, description="地図のズームレベル（経路の簡略化の度合い）")
+):
+    """
+    人流フローの経路（GTFSの運行形状に沿った経路、見つからないフローは直線）
+    flow_indexは /mobility/real/{prefecture} のフローの並びと一致する
+    """
+    try:
+        import asyncio
+        from app.services.mobility_precompute import estimate_flows, flow_route_coordinates, hour_bucket
+        from app.services.route_geometry import route_geometry
         
-        # フローデータをGeoJSON LineString形式に変換
-        flow_features = []
-        particle_features = []
+        await route_geometry.ensure_loaded()
+        loop = asyncio.get_running_loop()
+        flows = await loop.run_in_executor(None, estimate_flows, prefecture, city_only, hour_bucket().hour)
+        routes = await loop.run_in_executor(None, flow_route_coordinates, flows, zoom)
         
-        for flow in flows:
-            # フローライン
-            flow_features.append({
-                "type": "Feature",
-                "geometry": {
-                    "type": "LineString",
-                    "coordinates": [
-                        [flow["origin"]["lon"], flow["origin"]["lat"]],
-                        [flow["destination"]["lon"], flow["destination"]["lat"]]
-                    ]
-                },
-                "properties": {
-                    "intensity": min(100, flow["volume"] / 500),  # 0-100にスケール
-                    "volume": flow["volume"],
-                    "origin_name": flow["origin"]["name"],
-                    "destination_name": flow["destination"]["name"],
-                    "flow_type": flow.get("flow_type", flow.get("type", "general"))  # フロータイプ
-                }
-            })
-            
-            # リアルなパーティクル生成（統計モデルベース）
-            # パーティクル数を適切に設定（パフォーマンスと表示品質のバランス）
-            # 距離とフロー量に基づいて調整
-            # フロー数が多いので、パーティクル数を調整
-            flow_index = flows.index(flow)
-            if flow_index < 100:  # 上位100フローは多めに
-                base_particles = flow["volume"] // 5000  # 基本パーティクル数を減らす
-                num_particles = min(30, max(10, base_particles))  # 10～30個の範囲
-            elif flow_index < 500:  # 次の400フローは中程度
-                base_particles = flow["volume"] // 10000
-                num_particles = min(15, max(5, base_particles))  # 5～15個の範囲
-            else:  # それ以降は少なめ
-                base_particles = flow["volume"] // 20000
-                num_particles = min(10, max(3, base_particles))  # 3～10個の範囲
-            realistic_particles = estimator.generate_realistic_particles(flow, num_particles)
-            
-            for i, particle_data in enumerate(realistic_particles):
-                particle_features.append({
+        return {
+            "type": "FeatureCollection",
+            "features": [
+                {
                     "type": "Feature",
-                    "geometry": {
-                        "type": "Point",
-                        "coordinates": [particle_data["lon"], particle_data["lat"]]
-                    },
+                    "geometry": {"type": "LineString", "coordinates": coordinates},
                     "properties": {
-                        "size": particle_data["size"],
-                        "color": particle_data["color"],
-                        "speed": particle_data["speed"],
-                        "origin_lon": particle_data["origin_lon"],
-                        "origin_lat": particle_data["origin_lat"],
-                        "destination_lon": particle_data["dest_lon"],
-                        "destination_lat": particle_data["dest_lat"],
-                        "control_lon": particle_data["control_lon"],
-                        "control_lat": particle_data["control_lat"],
-                        "flow_index": flows.index(flow),
-                        "particle_index": i,
-                        "flow_type": particle_data["flow_type"]
+                        "flow_index": index,
+                        "origin_name": flow["origin"]["name"],
+                        "destination_name": flow["destination"]["name"],
+                        "volume": flow["volume"]
                     }
-                })
-        
-        result = {
-            "flows": {
-                "type": "FeatureCollection",
-                "features": flow_features
-            },
-            "particles": {
-                "type": "FeatureCollection",
-                "features": particle_features
-            }
+                }
+                for index, (flow, coordinates) in enumerate(zip(flows, routes))
+            ]
         }
         
-        print(f"Returning mobility data - flows: {len(flow_features)}, particles: {len(particle_features)}")
-        
-        return result
-        
     except Exception as e:
-        print(f"Mobility data error: {e}")
-        return {"flows": []}
+        print(f"Mobility route error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/events/real/{prefecture}")
 async def get_real_event_data(prefecture: str, db: Session = Depends(get_db)):
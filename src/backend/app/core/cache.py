@@ -0,0 +1,324 @@
+"""
+レスポンスキャッシュ
+Redisを使った読み取り系APIのキャッシュ。Redisに接続できない場合はプロセス内LRUで代替する
+"""
+
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import time
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from fastapi import Response
+from fastapi.encoders import jsonable_encoder
+from loguru import logger
+
+from app.core.config import settings
+
+try:
+    import redis
+    import redis.asyncio as aioredis
+except ImportError:  # redis未導入環境ではプロセス内LRUのみ
+    redis = None
+    aioredis = None
+
+CACHE_PREFIX = "uesugi:cache"
+
+# Redis接続失敗後、再接続を試みるまでの秒数
+REDIS_RETRY_INTERVAL = 30
+
+
+def _namespace_prefix(namespace: str) -> str:
+    return f"{CACHE_PREFIX}:{namespace}:"
+
+
+class LRUCache:
+    """TTL付きのプロセス内LRUキャッシュ（Redis不可時のフォールバック）"""
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: bytes, ttl: int):
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete_prefix(self, prefix: str) -> int:
+        keys = [key for key in self._entries if key.startswith(prefix)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class ResponseCache:
+    """
+    レスポンスキャッシュ本体
+    - Redis優先、接続できなければプロセス内LRU
+    - 同一キーの同時ミスは1回だけ計算（シングルフライト）
+    - 名前空間ごとのヒット/ミス数を記録
+    """
+
+    def __init__(self, redis_url: str, max_local_entries: int = 1024):
+        self.redis_url = redis_url
+        self._redis = None
+        self._redis_retry_at = 0.0
+        self._local = LRUCache(max_local_entries)
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _record(self, namespace: str, counter: str):
+        stats = self._stats.setdefault(
+            namespace, {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        )
+        stats[counter] += 1
+
+    async def _get_redis(self):
+        """Redisクライアントを取得（接続不可の間はNone）"""
+        if aioredis is None or not settings.CACHE_ENABLED:
+            return None
+        if self._redis is not None:
+            return self._redis
+        if time.monotonic() < self._redis_retry_at:
+            return None
+        try:
+            client = aioredis.from_url(self.redis_url, socket_timeout=1, socket_connect_timeout=1)
+            await client.ping()
+            self._redis = client
+            logger.info("Response cache connected to Redis")
+        except Exception as e:
+            self._redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+            logger.warning(f"Redis unavailable, using in-process cache: {e}")
+        return self._redis
+
+    def _drop_redis(self, error: Exception):
+        """Redisエラー時は一定時間ローカルキャッシュに切り替える"""
+        logger.warning(f"Redis cache error, falling back to in-process cache: {error}")
+        self._redis = None
+        self._redis_retry_at = time.monotonic() + REDIS_RETRY_INTERVAL
+
+    @property
+    def backend(self) -> str:
+        return "redis" if self._redis is not None else "memory"
+
+    async def get(self, key: str) -> Optional[bytes]:
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                return await client.get(key)
+            except Exception as e:
+                self._drop_redis(e)
+        return self._local.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                await client.set(key, value, ex=ttl)
+                return
+            except Exception as e:
+                self._drop_redis(e)
+        self._local.set(key, value, ttl)
+
+    async def invalidate(self, *namespaces: str) -> int:
+        """名前空間のキャッシュを削除（指定なしは全件）"""
+        prefixes = [_namespace_prefix(ns) for ns in namespaces] or [f"{CACHE_PREFIX}:"]
+        deleted = 0
+        for prefix in prefixes:
+            deleted += self._local.delete_prefix(prefix)
+
+        client = await self._get_redis()
+        if client is not None:
+            try:
+                for prefix in prefixes:
+                    batch = []
+                    async for key in client.scan_iter(match=f"{prefix}*", count=500):
+                        batch.append(key)
+                        if len(batch) >= 500:
+                            deleted += await client.unlink(*batch)
+                            batch = []
+                    if batch:
+                        deleted += await client.unlink(*batch)
+            except Exception as e:
+                self._drop_redis(e)
+
+        logger.info(f"Cache invalidated: {list(namespaces) or 'all'} ({deleted} keys)")
+        return deleted
+
+    async def get_or_compute(
+        self,
+        namespace: str,
+        key: str,
+        ttl: int,
+        compute: Callable[[], Awaitable[bytes]]
+    ) -> Tuple[bytes, bool]:
+        """キャッシュを参照し、なければ計算して保存する。戻り値は (値, ヒットしたか)"""
+        try:
+            cached_value = await self.get(key)
+        except Exception as e:
+            self._record(namespace, "errors")
+            logger.warning(f"Cache lookup failed: {e}")
+            cached_value = None
+
+        if cached_value is not None:
+            self._record(namespace, "hits")
+            return cached_value, True
+
+        # 同じキーを計算中なら結果を待つ
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self._record(namespace, "coalesced")
+            return await asyncio.shield(inflight), False
+
+        self._record(namespace, "misses")
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            value = await compute()
+            future.set_result(value)
+        except BaseException as e:
+            if isinstance(e, Exception):
+                future.set_exception(e)
+            else:
+                future.cancel()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+        try:
+            await self.set(key, value, ttl)
+        except Exception as e:
+            self._record(namespace, "errors")
+            logger.warning(f"Cache store failed: {e}")
+        return value, False
+
+    def get_stats(self) -> Dict:
+        """名前空間ごとのヒット/ミス数"""
+        namespaces = {}
+        for namespace, stats in self._stats.items():
+            lookups = stats["hits"] + stats["misses"] + stats["coalesced"]
+            namespaces[namespace] = {
+                **stats,
+                "hit_rate": stats["hits"] / lookups if lookups else 0.0
+            }
+        return {
+            "backend": self.backend,
+            "local_entries": len(self._local),
+            "inflight": len(self._inflight),
+            "namespaces": namespaces
+        }
+
+
+def _normalize_value(value, sort_list: bool = False):
+    """キャッシュキー用に値を正規化"""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, str):
+        value = value.strip()
+        if sort_list:
+            return ",".join(sorted({item.strip() for item in value.split(",") if item.strip()}))
+        return value
+    return value
+
+
+def make_cache_key(namespace: str, arguments: Dict, list_params: Iterable[str] = ()) -> str:
+    """名前空間とリクエスト引数からキャッシュキーを生成"""
+    list_params = set(list_params)
+    normalized = {
+        name: _normalize_value(value, name in list_params)
+        for name, value in arguments.items()
+        # DBセッションなどのリクエスト依存オブジェクトはキーに含めない
+        if value is None or isinstance(value, (str, int, float, bool, datetime, date))
+    }
+    digest = hashlib.sha1(
+        json.dumps(normalized, sort_keys=True, ensure_ascii=False).encode("utf-8")
+    ).hexdigest()
+    return f"{_namespace_prefix(namespace)}{digest}"
+
+
+def cached(namespace: str, ttl: int = 60, list_params: Iterable[str] = ("categories", "data_sources")):
+    """
+    エンドポイント用キャッシュデコレーター
+    正規化したクエリ引数をキーにJSONをシリアライズ済みバイト列で保存し、そのまま返す
+    list_paramsに指定した引数はカンマ区切りの順序を無視する
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            if not settings.CACHE_ENABLED:
+                return await func(*args, **kwargs)
+
+            bound = signature.bind_partial(*args, **kwargs)
+            key = make_cache_key(namespace, bound.arguments, list_params)
+
+            async def compute() -> bytes:
+                result = await func(*args, **kwargs)
+                return json.dumps(
+                    jsonable_encoder(result), ensure_ascii=False, separators=(",", ":")
+                ).encode("utf-8")
+
+            payload, hit = await response_cache.get_or_compute(namespace, key, ttl, compute)
+            return Response(
+                content=payload,
+                media_type="application/json",
+                headers={"X-Cache": "HIT" if hit else "MISS"}
+            )
+
+        return wrapper
+    return decorator
+
+
+async def invalidate_cache(*namespaces: str) -> int:
+    """インジェスト処理から呼び出すキャッシュ無効化フック"""
+    try:
+        return await response_cache.invalidate(*namespaces)
+    except Exception as e:
+        logger.warning(f"Cache invalidation failed: {e}")
+        return 0
+
+
+def invalidate_cache_sync(*namespaces: str) -> int:
+    """
+    同期処理（収集スクリプト・GTFS統合など別プロセス）用のキャッシュ無効化
+    Redis上のキーのみ削除する（APIプロセス内のLRUには届かない）
+    """
+    if redis is None or not settings.CACHE_ENABLED:
+        return 0
+    prefixes = [_namespace_prefix(ns) for ns in namespaces] or [f"{CACHE_PREFIX}:"]
+    deleted = 0
+    try:
+        client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=1, socket_connect_timeout=1)
+        for prefix in prefixes:
+            keys = list(client.scan_iter(match=f"{prefix}*", count=500))
+            for i in range(0, len(keys), 500):
+                deleted += client.unlink(*keys[i:i + 500])
+        client.close()
+    except Exception as e:
+        logger.warning(f"Cache invalidation failed: {e}")
+    return deleted
+
+
+# グローバルインスタンス
+response_cache = ResponseCache(settings.REDIS_URL, settings.CACHE_LOCAL_MAX_ENTRIES)
@@ -22,6 +22,13 @@ class Settings(BaseSettings):
     # Redis設定
     REDIS_URL: str = "redis://localhost:6379"
     
+    # レスポンスキャッシュ設定
+    CACHE_ENABLED: bool = True
+    CACHE_LOCAL_MAX_ENTRIES: int = 1024  # Redis不可時のプロセス内LRU上限
+    MOBILITY_PRECOMPUTE_ENABLED: bool = True  # 人流データを時間帯ごとにバックグラウンドで事前計算
+    TRANSIT_SUPPLY_PRECOMPUTE_DAYS: int = 7  # GTFS統合後に公共交通供給量を事前計算する日数（今日から）
+    TRANSIT_ROUTER_PRELOAD: bool = True  # 起動時に到達圏計算用の今日の時刻表を読み込む
+    
     # CORS設定
     CORS_ORIGINS: List[str] = ["http://localhost:3000", "http://localhost:3001"]
     
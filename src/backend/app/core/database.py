@@ -3,7 +3,7 @@
 SQLAlchemy + PostGIS設定
 """
 
-from sqlalchemy import create_engine, MetaData
+from sqlalchemy import create_engine, MetaData, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
@@ -44,6 +44,12 @@ async def get_database():
     async with AsyncSessionLocal() as session:
         yield session
 
+# 後から追加したインデックス（モデルの__table_args__と同じ定義）
+EXISTING_TABLE_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_heatmap_points_timestamp_id "
+    "ON heatmap_points (timestamp DESC, id DESC)",
+]
+
 async def create_tables():
     """テーブルの作成"""
     # PostGISエクステンションを有効化（PostgreSQLの場合）
@@ -57,6 +63,15 @@ async def create_tables():
     
     # テーブル作成
     Base.metadata.create_all(bind=engine)
+    
+    # 既存テーブルへのインデックス追加（create_allは既存テーブルにインデックスを追加しないため）
+    if "postgresql" in DATABASE_URL:
+        for statement in EXISTING_TABLE_INDEXES:
+            try:
+                with engine.begin() as conn:
+                    conn.execute(text(statement))
+            except Exception as e:
+                print(f"Index setup: {e}")
 
 async def get_db():
     """データベースセッションの取得（非同期）"""
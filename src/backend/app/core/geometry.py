@@ -0,0 +1,43 @@
+"""
+ジオメトリ座標の射影ヘルパー
+Geometry列の経度・緯度をメインクエリで同時に取得し、行ごとの追加クエリ（N+1）を避ける
+"""
+
+from typing import List, Optional, Tuple
+from geoalchemy2 import Geometry
+from sqlalchemy import func, select
+from sqlalchemy.sql import Select
+
+
+def geometry_columns(model) -> List:
+    """モデルのGeometry列を列挙"""
+    return [
+        column for column in model.__table__.columns
+        if isinstance(column.type, Geometry)
+    ]
+
+
+def coordinate_columns(column, name: Optional[str] = None) -> List:
+    """Geometry列（または式）から {name}_lon, {name}_lat のラベル付き列を生成"""
+    name = name or column.name
+    return [
+        func.ST_X(column).label(f"{name}_lon"),
+        func.ST_Y(column).label(f"{name}_lat")
+    ]
+
+
+def select_with_coordinates(model, *extra_columns) -> Select:
+    """
+    モデル本体と、全Geometry列の座標を1つのSELECTで取得するクエリを生成
+    結果行は row[0] がモデル、row.<列名>_lon / row.<列名>_lat が座標
+    """
+    columns = []
+    for column in geometry_columns(model):
+        columns.extend(coordinate_columns(column))
+    return select(model, *columns, *extra_columns)
+
+
+def row_coordinates(row, name: str = "location") -> Tuple[float, float]:
+    """select_with_coordinates / coordinate_columns の結果行から (lon, lat) を取り出す"""
+    mapping = row._mapping
+    return mapping[f"{name}_lon"], mapping[f"{name}_lat"]
@@ -0,0 +1,237 @@
+"""
+共有HTTPクライアント
+外部APIへのリクエストを1つの接続プール（keep-alive）で行い、ホストごとのトークンバケットによるレート制限、
+ホストごと・全体の同時接続数の上限、一時的なエラーの再試行（指数バックオフ）をまとめて扱う
+"""
+
+import asyncio
+import random
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, NamedTuple, Optional
+from urllib.parse import urlparse
+
+import httpx
+from loguru import logger
+
+USER_AGENT = "Uesugi-Engine/1.0 (Open Data Collector)"
+
+# 接続プール全体の同時接続数と、再利用のため保持する接続数
+MAX_CONNECTIONS = 32
+MAX_KEEPALIVE_CONNECTIONS = 16
+
+
+class HostLimit(NamedTuple):
+    """ホストごとの制限（1秒あたりのリクエスト数、同時リクエスト数）"""
+    rate: float
+    concurrency: int
+
+
+# 既定のホスト別制限（未登録のホストはDEFAULT_HOST_LIMIT）
+HOST_LIMITS: Dict[str, HostLimit] = {
+    "api.e-stat.go.jp": HostLimit(rate=1.0, concurrency=2),
+    "api.open-meteo.com": HostLimit(rate=5.0, concurrency=4),
+    "archive-api.open-meteo.com": HostLimit(rate=2.0, concurrency=2),
+    "api.openweathermap.org": HostLimit(rate=1.0, concurrency=4),
+    "www.jma.go.jp": HostLimit(rate=2.0, concurrency=2),
+    "api.odpt.org": HostLimit(rate=2.0, concurrency=2),
+}
+DEFAULT_HOST_LIMIT = HostLimit(rate=2.0, concurrency=4)
+
+# 再試行するステータスコードとメソッド（冪等なメソッドのみ再試行する）
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+RETRY_METHODS = {"GET", "HEAD", "OPTIONS"}
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5  # 秒
+BACKOFF_MAX = 30.0
+
+
+class TokenBucket:
+    """トークンバケット（rate個/秒で補充、最大でrate個まで連続して取得できる）"""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self) -> float:
+        """トークンを1つ取得（足りなければ補充まで待つ）。待った秒数を返す"""
+        async with self._lock:
+            self._refill()
+            wait = 0.0
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+                await asyncio.sleep(wait)
+                self._refill()
+            self.tokens -= 1
+            return wait
+
+    def pause(self, seconds: float):
+        """Retry-After等でホストから待機を求められた場合、その間トークンを補充しない"""
+        self._refill()
+        self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class _HostState:
+    """ホストごとのレート制限・同時実行数と統計"""
+
+    def __init__(self, limit: HostLimit):
+        self.limit = limit
+        self.bucket = TokenBucket(limit.rate)
+        self.semaphore = asyncio.Semaphore(limit.concurrency)
+        self.requests = 0
+        self.retries = 0
+        self.failures = 0
+        self.throttled_seconds = 0.0
+
+    def get_stats(self) -> Dict:
+        return {
+            "rate": self.limit.rate,
+            "concurrency": self.limit.concurrency,
+            "requests": self.requests,
+            "retries": self.retries,
+            "failures": self.failures,
+            "throttled_seconds": round(self.throttled_seconds, 2)
+        }
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    """Retry-Afterヘッダーの秒数（日付形式や不正な値は無視）"""
+    value = response.headers.get("retry-after")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+class RateLimitedClient:
+    """
+    レート制限付きの非同期HTTPクライアント
+    - httpx.AsyncClientを1つ共有し、接続を再利用する
+    - リクエストごとにホストのトークンを取得し、ホストごとの同時リクエスト数を制限する
+    - 接続エラー・タイムアウト・429/5xxは指数バックオフ（ジッター付き）で再試行する
+    - イベントループが変わった場合（スケジューラーからのasyncio.run等）はクライアントを作り直す
+    """
+
+    def __init__(
+        self,
+        host_limits: Optional[Dict[str, HostLimit]] = None,
+        timeout: float = 30.0,
+        max_retries: int = MAX_RETRIES
+    ):
+        self.host_limits = {**HOST_LIMITS, **(host_limits or {})}
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._hosts: Dict[str, _HostState] = {}
+
+    def _ensure_client(self) -> httpx.AsyncClient:
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # 別のイベントループで作った接続・セマフォは使えないため作り直す（統計は引き継ぐ）
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                headers={"User-Agent": USER_AGENT},
+                limits=httpx.Limits(
+                    max_connections=MAX_CONNECTIONS,
+                    max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS
+                )
+            )
+            self._loop = loop
+            for state in self._hosts.values():
+                state.bucket = TokenBucket(state.limit.rate)
+                state.semaphore = asyncio.Semaphore(state.limit.concurrency)
+        return self._client
+
+    def _host(self, url: str) -> _HostState:
+        self._ensure_client()
+        host = urlparse(url).hostname or ""
+        if host not in self._hosts:
+            self._hosts[host] = _HostState(self.host_limits.get(host, DEFAULT_HOST_LIMIT))
+        return self._hosts[host]
+
+    async def _send(self, state: _HostState, method: str, url: str, **kwargs) -> httpx.Response:
+        """ヘッダー受信までを再試行付きで行う（本文は未読のストリームとして返す）"""
+        client = self._client
+        retries = self.max_retries if method.upper() in RETRY_METHODS else 0
+        attempt = 0
+        while True:
+            state.throttled_seconds += await state.bucket.acquire()
+            state.requests += 1
+            retry_after = None
+            try:
+                response = await client.send(client.build_request(method, url, **kwargs), stream=True)
+            except httpx.TransportError as e:
+                if attempt >= retries:
+                    state.failures += 1
+                    raise
+                logger.warning(f"HTTP {method} {url} failed ({type(e).__name__}), retrying")
+            else:
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    if response.is_error:
+                        state.failures += 1
+                    return response
+                retry_after = _retry_after(response)
+                await response.aclose()
+                logger.warning(f"HTTP {method} {url} returned {response.status_code}, retrying")
+
+            attempt += 1
+            state.retries += 1
+            if retry_after is not None:
+                # 指定された秒数はホスト全体のトークン補充を止めて待つ
+                state.bucket.pause(retry_after)
+            else:
+                await asyncio.sleep(min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)) * (0.5 + random.random() / 2))
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        """
+        リクエストを送り、本文まで読み込んだレスポンスを返す
+        kwargsはhttpxのリクエスト引数（params, headers, json, timeout 等）
+        """
+        state = self._host(url)
+        async with state.semaphore:
+            response = await self._send(state, method, url, **kwargs)
+            try:
+                await response.aread()
+            finally:
+                await response.aclose()
+            return response
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator[httpx.Response]:
+        """
+        本文を読み込まずにレスポンスを返す（大きなファイルのダウンロード用）
+        本文を読み終えるまでホストの同時リクエスト枠を占有する
+        """
+        state = self._host(url)
+        async with state.semaphore:
+            response = await self._send(state, method, url, **kwargs)
+            try:
+                yield response
+            finally:
+                await response.aclose()
+
+    async def aclose(self):
+        """接続プールを閉じる"""
+        if self._client is not None:
+            client, self._client, self._loop = self._client, None, None
+            await client.aclose()
+
+    def get_stats(self) -> Dict:
+        return {host: state.get_stats() for host, state in self._hosts.items()}
+
+
+# グローバルインスタンス（収集モジュールと気象サービスで共有）
+http_client = RateLimitedClient()
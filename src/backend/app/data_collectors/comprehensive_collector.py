@@ -4,7 +4,7 @@
 """
 import os
 import json
-import requests
+import asyncio
 import zipfile
 import csv
 from datetime import datetime, timedelta
@@ -12,7 +12,8 @@ from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import logging
 from urllib.parse import urljoin
-import time
+
+from app.core.http_client import http_client
 
 logger = logging.getLogger(__name__)
 
@@ -140,29 +141,26 @@ class ComprehensiveDataCollector:
     
     def __init__(self):
         self.data_dir = Path("uesugi-engine-data")
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Uesugi-Engine/1.0 (Open Data Collector)'
-        })
+        # User-Agent・接続プール・ホストごとのレート制限は共有HTTPクライアントで設定
+        self.http = http_client
         
-    def collect_all_prefectures(self) -> Dict:
-        """全都府県のデータを収集"""
+    async def collect_all_prefectures(self) -> Dict:
+        """全都府県のデータを収集（都府県ごとの収集は同時に行う）"""
         results = {
             "timestamp": datetime.now().isoformat(),
             "prefectures": {}
         }
         
-        for prefecture in self.TARGET_PREFECTURES:
-            logger.info(f"Collecting data for {prefecture}...")
-            prefecture_data = self._collect_prefecture_data(prefecture)
+        logger.info(f"Collecting data for {', '.join(self.TARGET_PREFECTURES)}...")
+        collected = await asyncio.gather(
+            *(self._collect_prefecture_data(prefecture) for prefecture in self.TARGET_PREFECTURES)
+        )
+        for prefecture, prefecture_data in zip(self.TARGET_PREFECTURES, collected):
             results["prefectures"][prefecture] = prefecture_data
             
-            # レート制限対策
-            time.sleep(1)
-            
         return results
     
-    def _collect_prefecture_data(self, prefecture: str) -> Dict:
+    async def _collect_prefecture_data(self, prefecture: str) -> Dict:
         """都府県別データ収集"""
         data = {
             "catalog": {},
@@ -172,9 +170,13 @@ class ComprehensiveDataCollector:
             "social": {}
         }
         
-        # 1. オープンデータカタログ
+        # 1. オープンデータカタログ、3. 交通データ、4. 環境データは同時に取得
+        catalog_data, transport_data, env_data = await asyncio.gather(
+            self._collect_catalog_data(prefecture),
+            self._collect_transport_data(prefecture),
+            self._collect_environmental_data(prefecture)
+        )
         if prefecture in self.OPEN_DATA_CATALOGS:
-            catalog_data = self._collect_catalog_data(prefecture)
             data["catalog"] = catalog_data
             
         # 2. 国土数値情報
@@ -182,11 +184,9 @@ class ComprehensiveDataCollector:
         data["mlit"] = mlit_data
         
         # 3. 交通データ
-        transport_data = self._collect_transport_data(prefecture)
         data["transport"] = transport_data
         
         # 4. 環境データ
-        env_data = self._collect_environmental_data(prefecture)
         data["environment"] = env_data
         
         # 5. SNS・観光データ
@@ -195,40 +195,43 @@ class ComprehensiveDataCollector:
         
         return data
     
-    def _collect_catalog_data(self, prefecture: str) -> Dict:
+    async def _collect_catalog_data(self, prefecture: str) -> Dict:
         """オープンデータカタログから収集"""
-        catalog = self.OPEN_DATA_CATALOGS[prefecture]
-        collected = {}
-        
-        for dataset_name, url in catalog.get("datasets", {}).items():
-            try:
-                # CSVファイルをダウンロード
-                response = self.session.get(url, timeout=30)
-                response.raise_for_status()
-                
-                # 保存
-                filename = f"{prefecture}_{dataset_name}_{datetime.now().strftime('%Y%m%d')}.csv"
-                output_path = self.data_dir / "raw" / "catalog" / filename
-                output_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                with open(output_path, 'wb') as f:
-                    f.write(response.content)
-                    
-                collected[dataset_name] = {
-                    "status": "success",
-                    "file": str(output_path),
-                    "size": len(response.content)
-                }
-                logger.info(f"Downloaded {dataset_name} for {prefecture}")
-                
-            except Exception as e:
-                logger.error(f"Failed to download {dataset_name}: {e}")
-                collected[dataset_name] = {
-                    "status": "failed",
-                    "error": str(e)
-                }
+        catalog = self.OPEN_DATA_CATALOGS.get(prefecture, {})
+        datasets = list(catalog.get("datasets", {}).items())
+        results = await asyncio.gather(
+            *(self._download_catalog_dataset(prefecture, dataset_name, url) for dataset_name, url in datasets)
+        )
+        return {dataset_name: result for (dataset_name, _), result in zip(datasets, results)}
+    
+    async def _download_catalog_dataset(self, prefecture: str, dataset_name: str, url: str) -> Dict:
+        """カタログのデータセットを1件ダウンロード"""
+        try:
+            # CSVファイルをダウンロード
+            response = await self.http.get(url, timeout=30)
+            response.raise_for_status()
+            
+            # 保存
+            filename = f"{prefecture}_{dataset_name}_{datetime.now().strftime('%Y%m%d')}.csv"
+            output_path = self.data_dir / "raw" / "catalog" / filename
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            with open(output_path, 'wb') as f:
+                f.write(response.content)
                 
-        return collected
+            logger.info(f"Downloaded {dataset_name} for {prefecture}")
+            return {
+                "status": "success",
+                "file": str(output_path),
+                "size": len(response.content)
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to download {dataset_name}: {e}")
+            return {
+                "status": "failed",
+                "error": str(e)
+            }
     
     def _collect_mlit_data(self, prefecture: str) -> Dict:
         """国土数値情報を収集"""
@@ -265,42 +268,43 @@ class ComprehensiveDataCollector:
                 
         return collected
     
-    def _collect_transport_data(self, prefecture: str) -> Dict:
+    async def _collect_transport_data(self, prefecture: str) -> Dict:
         """交通データを収集"""
-        collected = {}
-        
-        # GTFS データ
-        for operator, url in self.TRANSPORT_DATA["GTFS"].items():
-            # 都府県に関連する事業者のみ
-            if self._is_operator_in_prefecture(operator, prefecture):
-                try:
-                    response = self.session.get(url, timeout=60, stream=True)
-                    response.raise_for_status()
-                    
-                    # ZIPファイルを保存
-                    filename = f"{operator}_gtfs_{datetime.now().strftime('%Y%m%d')}.zip"
-                    output_path = self.data_dir / "raw" / "gtfs" / filename
-                    output_path.parent.mkdir(parents=True, exist_ok=True)
-                    
-                    with open(output_path, 'wb') as f:
-                        for chunk in response.iter_content(chunk_size=8192):
-                            f.write(chunk)
-                            
-                    collected[operator] = {
-                        "status": "success",
-                        "file": str(output_path)
-                    }
-                    
-                except Exception as e:
-                    logger.error(f"Failed to download GTFS for {operator}: {e}")
-                    collected[operator] = {
-                        "status": "failed",
-                        "error": str(e)
-                    }
+        # GTFS データ（都府県に関連する事業者のみ）
+        operators = [
+            (operator, url) for operator, url in self.TRANSPORT_DATA["GTFS"].items()
+            if self._is_operator_in_prefecture(operator, prefecture)
+        ]
+        results = await asyncio.gather(*(self._download_gtfs_feed(operator, url) for operator, url in operators))
+        return {operator: result for (operator, _), result in zip(operators, results)}
+    
+    async def _download_gtfs_feed(self, operator: str, url: str) -> Dict:
+        """事業者のGTFSフィードをダウンロード"""
+        try:
+            # ZIPファイルを保存
+            filename = f"{operator}_gtfs_{datetime.now().strftime('%Y%m%d')}.zip"
+            output_path = self.data_dir / "raw" / "gtfs" / filename
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            async with self.http.stream("GET", url, timeout=60) as response:
+                response.raise_for_status()
+                with open(output_path, 'wb') as f:
+                    async for chunk in response.aiter_bytes(chunk_size=65536):
+                        f.write(chunk)
                     
-        return collected
+            return {
+                "status": "success",
+                "file": str(output_path)
+            }
+            
+        except Exception as e:
+            logger.error(f"Failed to download GTFS for {operator}: {e}")
+            return {
+                "status": "failed",
+                "error": str(e)
+            }
     
-    def _collect_environmental_data(self, prefecture: str) -> Dict:
+    async def _collect_environmental_data(self, prefecture: str) -> Dict:
         """環境データを収集"""
         collected = {}
         
@@ -319,7 +323,7 @@ class ComprehensiveDataCollector:
             # 予報データ
             forecast_url = f"{self.ENVIRONMENTAL_DATA['気象庁']['forecast']}{area_code}.json"
             try:
-                response = self.session.get(forecast_url, timeout=10)
+                response = await self.http.get(forecast_url, timeout=10)
                 response.raise_for_status()
                 
                 collected["weather_forecast"] = {
@@ -387,7 +391,6 @@ class ComprehensiveDataCollector:
         for stat in stat_list:
             for prefecture in self.TARGET_PREFECTURES:
                 self._download_estat_file(stat["id"], stat["name"], prefecture)
-                time.sleep(0.5)  # レート制限
                 
     def _download_estat_file(self, stat_id: str, stat_name: str, prefecture: str):
         """e-Statファイルをダウンロード"""
@@ -450,7 +453,7 @@ if __name__ == "__main__":
     collector = ComprehensiveDataCollector()
     
     # 全都府県のデータ収集
-    # results = collector.collect_all_prefectures()
+    # results = asyncio.run(collector.collect_all_prefectures())
     
     # 利用可能な全データのダウンロード
     collector.download_all_available_data()
\ No newline at end of file
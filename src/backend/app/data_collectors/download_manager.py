@@ -3,6 +3,7 @@
 大規模データの効率的なダウンロード管理
 """
 import os
+import time
 import asyncio
 import aiohttp
 import aiofiles
@@ -18,76 +19,482 @@ import tarfile
 import gzip
 import shutil
 from urllib.parse import urlparse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
 logger = logging.getLogger(__name__)
 
 
+class ResourceChanged(Exception):
+    """途中まで取得したファイルがサーバー側で更新されていた（If-Rangeの不一致）"""
+
+
+def _parse_content_range(value: Optional[str]) -> Tuple[Optional[int], Optional[int], Optional[int]]:
+    """Content-Range（bytes 0-1023/4096）を (開始, 終了, 全体サイズ) に分解（不明な値はNone）"""
+    try:
+        unit, _, spec = (value or "").partition(" ")
+        byte_range, _, total = spec.partition("/")
+        start, _, end = byte_range.partition("-")
+        return int(start), int(end), (None if total == "*" else int(total))
+    except ValueError:
+        return None, None, None
+
+
+def extract_archive(filepath: str) -> Tuple[str, int]:
+    """
+    アーカイブを解凍し、(解凍先, 解凍後のバイト数) を返す
+    プロセスプールで実行するためモジュール関数とする
+    """
+    path = Path(filepath)
+    name = path.name
+    for suffix in ('.tar.gz', '.tgz', '.tar', '.zip', '.gz'):
+        if name.lower().endswith(suffix):
+            name = name[:-len(suffix)]
+            break
+    extract_dir = path.parent / name
+    extract_dir.mkdir(exist_ok=True)
+    
+    lower = path.name.lower()
+    if lower.endswith('.zip'):
+        with zipfile.ZipFile(path, 'r') as zip_ref:
+            zip_ref.extractall(extract_dir)
+    elif lower.endswith(('.tar', '.tar.gz', '.tgz')):
+        with tarfile.open(path, 'r:*') as tar_ref:
+            tar_ref.extractall(extract_dir)
+    elif lower.endswith('.gz'):
+        # 単一ファイルのgzip
+        with gzip.open(path, 'rb') as gz_file:
+            with open(extract_dir / name, 'wb') as out_file:
+                shutil.copyfileobj(gz_file, out_file)
+    
+    extracted = sum(f.stat().st_size for f in extract_dir.rglob('*') if f.is_file())
+    return str(extract_dir), extracted
+
+
+class StageStats:
+    """パイプライン段階ごとの処理量（ファイル数・バイト数・処理時間）"""
+    
+    def __init__(self):
+        self.files = 0
+        self.bytes = 0
+        self.seconds = 0.0
+        self.errors = 0
+        
+    def add(self, size: int, seconds: float, files: int = 0):
+        self.files += files
+        self.bytes += size
+        self.seconds += seconds
+        
+    def get_stats(self) -> Dict:
+        return {
+            "files": self.files,
+            "bytes": self.bytes,
+            "seconds": round(self.seconds, 2),
+            "errors": self.errors,
+            "mb_per_second": round(self.bytes / self.seconds / 1024 / 1024, 2) if self.seconds else None
+        }
+
+
+class BandwidthLimiter:
+    """全体の受信帯域の上限（バイト/秒、1秒分までのバーストを許す）"""
+    
+    def __init__(self, rate: int):
+        self.rate = rate
+        self.allowance = float(rate)
+        self.updated = time.monotonic()
+        self.waited = 0.0
+        self._lock = asyncio.Lock()
+        
+    async def consume(self, size: int):
+        """受信したバイト数を差し引き、上限を超えた分だけ待つ"""
+        async with self._lock:
+            now = time.monotonic()
+            self.allowance = min(self.rate, self.allowance + (now - self.updated) * self.rate)
+            self.updated = now
+            self.allowance -= size
+            if self.allowance < 0:
+                wait = -self.allowance / self.rate
+                self.waited += wait
+                await asyncio.sleep(wait)
+
+
+class HostQueue:
+    """
+    ホストごとの待ち行列と同時ダウンロード数（AIMD）
+    - 成功してスループットが落ちていなければ同時数を 1/同時数 ずつ増やす（同時数分の完了でおよそ+1）
+    - 失敗・再試行が起きた場合や、スループットが平均の半分を下回った場合は同時数を半分にする
+    """
+    
+    INITIAL_LIMIT = 2.0
+    MAX_LIMIT = 8.0
+    
+    def __init__(self, host: str):
+        self.host = host
+        self.queue = deque()
+        self.active = 0
+        self.limit = self.INITIAL_LIMIT
+        self.rate: Optional[float] = None  # 平均スループット（バイト/秒、指数移動平均）
+        self.window_bytes = 0
+        self.window_start = time.monotonic()
+        self.completed = 0
+        self.failed = 0
+        self.bytes = 0
+        
+    def ready(self) -> bool:
+        return bool(self.queue) and self.active < int(self.limit)
+    
+    def on_bytes(self, size: int):
+        self.window_bytes += size
+        self.bytes += size
+        
+    def on_success(self):
+        self.completed += 1
+        if not self.window_bytes:
+            # 更新なし（304）等で転送がなかった場合は判断しない
+            return
+        now = time.monotonic()
+        rate = self.window_bytes / max(now - self.window_start, 1e-3)
+        self.window_bytes = 0
+        self.window_start = now
+        if self.rate is not None and rate < self.rate * 0.5:
+            self.limit = max(1.0, self.limit / 2)
+        else:
+            self.limit = min(self.MAX_LIMIT, self.limit + 1 / self.limit)
+        self.rate = rate if self.rate is None else 0.7 * self.rate + 0.3 * rate
+        
+    def on_error(self):
+        self.limit = max(1.0, self.limit / 2)
+        
+    def get_stats(self) -> Dict:
+        return {
+            "limit": round(self.limit, 2),
+            "active": self.active,
+            "queued": len(self.queue),
+            "completed": self.completed,
+            "failed": self.failed,
+            "bytes": self.bytes,
+            "mb_per_second": round(self.rate / 1024 / 1024, 2) if self.rate is not None else None
+        }
+
+
+class IncrementalChecksum:
+    """
+    ダウンロード中にMD5を計算する
+    先頭から連続して届いたチャンクはその場で計算し、並行取得で先に届いた区間は
+    手前の区間が揃った時点でファイルから読んで（スレッドで）計算する
+    """
+    
+    def __init__(self, path: Path, stats: StageStats, chunk_size: int = 1024 * 1024):
+        self.path = path
+        self.stats = stats
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self._md5 = hashlib.md5()
+        self._lock = asyncio.Lock()
+        
+    def feed(self, offset: int, chunk: bytes):
+        """書き込んだチャンク（計算済みの位置に続く場合のみ計算）"""
+        if offset == self.offset:
+            start = time.perf_counter()
+            self._md5.update(chunk)
+            self.offset += len(chunk)
+            self.stats.add(len(chunk), time.perf_counter() - start)
+            
+    async def catch_up(self, end: int):
+        """ファイルの先頭からendまでが書き込み済みの場合に、未計算の部分を読んで計算"""
+        async with self._lock:
+            if end > self.offset:
+                start = time.perf_counter()
+                size = end - self.offset
+                await asyncio.to_thread(self._read, self.offset, end)
+                self.stats.add(size, time.perf_counter() - start)
+                
+    def _read(self, start: int, end: int):
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            remaining = end - start
+            while remaining > 0:
+                chunk = f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                self._md5.update(chunk)
+                remaining -= len(chunk)
+        self.offset = end - remaining
+        
+    async def hexdigest(self, size: int) -> str:
+        await self.catch_up(size)
+        self.stats.files += 1
+        return self._md5.hexdigest()
+
+
+class DownloadHistory:
+    """
+    ダウンロード履歴（追記専用のJSONLジャーナル）
+    - 1ファイル完了ごとに1行を追記してfsyncする（全体の書き直しをしないため、途中で止まっても既存の履歴は壊れない）
+    - 同じURLの行は後の行を優先し、読み込み時にURL・カテゴリの索引を作る
+    - 古い行が増えたら一時ファイルに書き直して置き換える（コンパクション）
+    """
+    
+    # コンパクションを行う行数の下限
+    COMPACT_MIN_RECORDS = 1000
+    
+    def __init__(self, journal_file: Path, legacy_file: Optional[Path] = None):
+        self.journal_file = journal_file
+        self._entries: Dict[str, Dict] = {}
+        self._categories: Dict[str, set] = {}
+        self._records = 0
+        self._journal = None
+        
+        needs_compaction = self._load()
+        if legacy_file and legacy_file.exists() and not journal_file.exists():
+            # 旧形式（download_history.json）から移行
+            with open(legacy_file, 'r') as f:
+                for url, entry in json.load(f).items():
+                    self._index(url, entry)
+            needs_compaction = True
+        if needs_compaction:
+            self.compact()
+            if legacy_file and legacy_file.exists():
+                legacy_file.unlink()
+        
+    def _load(self) -> bool:
+        """ジャーナルを読み込む。壊れた行（書き込み途中で止まった末尾）があればTrue"""
+        if not self.journal_file.exists():
+            return False
+        corrupted = False
+        with open(self.journal_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    url = record.pop("url")
+                except (ValueError, KeyError):
+                    corrupted = True
+                    continue
+                self._index(url, record)
+                self._records += 1
+        return corrupted
+    
+    def _index(self, url: str, entry: Dict):
+        previous = self._entries.get(url)
+        if previous is not None:
+            self._categories.get(previous.get("category"), set()).discard(url)
+        self._entries[url] = entry
+        self._categories.setdefault(entry.get("category"), set()).add(url)
+        
+    def _append(self, url: str, entry: Dict):
+        if self._journal is None:
+            self._journal = open(self.journal_file, 'a', encoding='utf-8')
+        self._journal.write(json.dumps({"url": url, **entry}, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+        self._records += 1
+        if self._records > max(self.COMPACT_MIN_RECORDS, 2 * len(self._entries)):
+            self.compact()
+    
+    def record(self, url: str, entry: Dict):
+        """URLの履歴を置き換えて追記"""
+        self._index(url, entry)
+        self._append(url, entry)
+        
+    def update(self, url: str, **fields):
+        """既存の履歴の一部の値を更新して追記"""
+        self.record(url, {**self._entries[url], **fields})
+        
+    def compact(self):
+        """最新の行だけを一時ファイルに書き出し、ジャーナルと置き換える"""
+        self.close()
+        tmp_path = self.journal_file.with_name(self.journal_file.name + ".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for url, entry in self._entries.items():
+                f.write(json.dumps({"url": url, **entry}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.journal_file)
+        self._records = len(self._entries)
+        
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+            
+    def get(self, url: str, default: Optional[Dict] = None) -> Optional[Dict]:
+        return self._entries.get(url, default)
+    
+    def by_category(self, category: str) -> Dict[str, Dict]:
+        """カテゴリの履歴（URL→履歴）"""
+        return {url: self._entries[url] for url in self._categories.get(category, ())}
+    
+    def __contains__(self, url: str) -> bool:
+        return url in self._entries
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+    
+    def items(self):
+        return self._entries.items()
+    
+    def values(self):
+        return self._entries.values()
+
+
 class DownloadManager:
-    """大規模オープンデータのダウンロード管理"""
+    """
+    大規模オープンデータのダウンロード管理
+    - 取得中のファイルは <name>.part に書き込み、進捗（区間ごとの取得済みバイト数とETag/Last-Modified）を
+      <name>.part.json に保存する。失敗しても削除せず、次回はRange/If-Rangeで続きから取得する
+    - 最初のGETをRange付きで送り、206応答のContent-Rangeで全体サイズとRange対応を知る（HEADは送らない）
+    - 大きなファイルは区間に分けて並行に取得する
+    - 取得済みのファイルはIf-None-Match/If-Modified-Sinceの条件付きGETで更新の有無を確認する
+    - チェックサムは受信中に計算し、解凍は別の段階としてプロセスプールで行う（イベントループを止めない）
+    - ホストごとの待ち行列から、ホストごとに調整する同時数（HostQueue）と全体の上限の範囲で取り出して実行する
+      遅いホストが他のホストのダウンロードを妨げないようにし、全体の受信帯域はmax_bandwidthで制限できる
+    """
+    
+    # 区間の大きさと、1ファイルあたりの並行取得数
+    SEGMENT_SIZE = 16 * 1024 * 1024  # 16MB
+    SEGMENT_CONCURRENCY = 4
     
-    def __init__(self, base_dir: str = "uesugi-engine-data"):
+    # 区間ごとの再試行回数（再試行は取得済みの位置から続ける）
+    SEGMENT_RETRIES = 3
+    
+    # 進捗ファイルを書き出す間隔
+    PROGRESS_SAVE_BYTES = 8 * 1024 * 1024
+    
+    def __init__(self, base_dir: str = "uesugi-engine-data", max_bandwidth: Optional[int] = None):
         self.base_dir = Path(base_dir)
         self.download_dir = self.base_dir / "downloads"
         self.download_dir.mkdir(parents=True, exist_ok=True)
         
         self.session = None
-        self.download_queue = asyncio.Queue()
-        self.concurrent_downloads = 3
+        self.concurrent_downloads = 8  # 全ホスト合計の同時ダウンロード数の上限
         self.chunk_size = 1024 * 1024  # 1MB
         
-        # ダウンロード履歴
-        self.history_file = self.base_dir / "download_history.json"
-        self.history = self._load_history()
+        # ホストごとの待ち行列と全体の受信帯域（バイト/秒、Noneは無制限）
+        self.hosts: Dict[str, HostQueue] = {}
+        self.bandwidth = BandwidthLimiter(max_bandwidth) if max_bandwidth else None
         
-    def _load_history(self) -> Dict:
-        """ダウンロード履歴を読み込み"""
-        if self.history_file.exists():
-            with open(self.history_file, 'r') as f:
-                return json.load(f)
-        return {}
+        # 解凍段階（ダウンロードとは別の同時実行数で処理する）
+        self.extract_queue = asyncio.Queue()
+        self.concurrent_extractions = 2
         
-    def _save_history(self):
-        """ダウンロード履歴を保存"""
-        with open(self.history_file, 'w') as f:
-            json.dump(self.history, f, indent=2)
+        # 段階ごとの処理量
+        self.stats = {stage: StageStats() for stage in ("download", "checksum", "extract")}
+        
+        # ダウンロード履歴
+        self.history_file = self.base_dir / "download_history.jsonl"
+        self.history = DownloadHistory(self.history_file, legacy_file=self.base_dir / "download_history.json")
             
-    async def download_all(self, urls: List[Dict]) -> List[Dict]:
-        """複数URLを並行ダウンロード"""
-        async with aiohttp.ClientSession() as self.session:
-            # ダウンロードキューに追加
-            for url_info in urls:
-                await self.download_queue.put(url_info)
+    async def download_all(self, urls: List[Dict]) -> Dict[str, Dict]:
+        """複数URLを並行ダウンロードし、今回対象としたURLの履歴（URL→履歴の辞書）を返す"""
+        # ホストごとの待ち行列に追加（順位は _prioritize の順）
+        for rank, url_info in enumerate(self._prioritize(urls)):
+            self._host_queue(url_info["url"]).queue.append((rank, url_info))
+        
+        # 大きなファイルは数十分かかるため全体のタイムアウトは設けず、接続と読み込みの停止のみ検出する
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=120)
+        async with aiohttp.ClientSession(timeout=timeout) as self.session:
+            with ProcessPoolExecutor(max_workers=self.concurrent_extractions) as pool:
+                # 解凍ワーカーを起動
+                extractors = [
+                    asyncio.create_task(self._extract_worker(f"extractor-{i}", pool))
+                    for i in range(self.concurrent_extractions)
+                ]
                 
-            # ワーカーを起動
-            workers = [
-                asyncio.create_task(self._download_worker(f"worker-{i}"))
-                for i in range(self.concurrent_downloads)
-            ]
-            
-            # キューが空になるまで待機
-            await self.download_queue.join()
-            
-            # ワーカーを停止
-            for worker in workers:
-                worker.cancel()
+                # 空きのあるホストから順位の高いものを取り出して実行し、1つ終わるたびに補充する
+                running = set()
+                while True:
+                    while len(running) < self.concurrent_downloads:
+                        host = self._next_host()
+                        if host is None:
+                            break
+                        _, url_info = host.queue.popleft()
+                        host.active += 1
+                        running.add(asyncio.create_task(self._download_from_host(host, url_info)))
+                    if not running:
+                        break
+                    _, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                
+                # 解凍のキューが空になるまで待機
+                await self.extract_queue.join()
+                for extractor in extractors:
+                    extractor.cancel()
+            self.history.close()
                 
-            return self.history
+            return {
+                url_info["url"]: dict(self.history.get(url_info["url"]))
+                for url_info in urls
+                if url_info["url"] in self.history
+            }
+    
+    def _host_queue(self, url: str) -> HostQueue:
+        host = urlparse(url).hostname or ""
+        if host not in self.hosts:
+            self.hosts[host] = HostQueue(host)
+        return self.hosts[host]
+    
+    def _next_host(self) -> Optional[HostQueue]:
+        """同時数に空きがあるホストのうち、先頭の順位が最も高いもの"""
+        ready = [host for host in self.hosts.values() if host.ready()]
+        return min(ready, key=lambda host: host.queue[0][0]) if ready else None
+    
+    def _prioritize(self, urls: List[Dict]) -> List[Dict]:
+        """未取得・更新間隔を過ぎたものを先に（同じ区分の中では渡された順。DatasetRegistryは鮮度・サイズ順）"""
+        return sorted(urls, key=lambda url_info: not self._is_stale(url_info))
+    
+    def _is_stale(self, url_info: Dict) -> bool:
+        """未取得、または更新間隔（refresh秒）を過ぎているか"""
+        entry = self.history.get(url_info["url"])
+        if not entry:
+            return True
+        refresh = url_info.get("refresh")
+        if not refresh:
+            return False
+        checked = entry.get("checked_at") or entry.get("timestamp")
+        return not checked or (datetime.now() - datetime.fromisoformat(checked)).total_seconds() >= refresh
             
-    async def _download_worker(self, name: str):
-        """ダウンロードワーカー"""
+    async def _download_from_host(self, host: HostQueue, url_info: Dict):
+        """ダウンロードを実行し、結果をホストの同時数の調整に反映"""
+        try:
+            result = await self._download_file(url_info)
+        except Exception as e:
+            logger.error(f"Download error ({host.host}): {e}")
+            result = None
+        finally:
+            host.active -= 1
+        if result is None:
+            host.failed += 1
+            host.on_error()
+        else:
+            host.on_success()
+                
+    async def _extract_worker(self, name: str, pool: ProcessPoolExecutor):
+        """解凍ワーカー（解凍処理はプロセスプールで実行）"""
+        loop = asyncio.get_running_loop()
         while True:
+            filepath = await self.extract_queue.get()
+            start = time.perf_counter()
             try:
-                url_info = await self.download_queue.get()
-                await self._download_file(url_info)
-                self.download_queue.task_done()
+                extract_dir, extracted = await loop.run_in_executor(pool, extract_archive, str(filepath))
+                self.stats["extract"].add(filepath.stat().st_size, time.perf_counter() - start, files=1)
+                logger.info(f"Extracted: {filepath.name} to {extract_dir} ({extracted:,} bytes)")
             except asyncio.CancelledError:
                 break
             except Exception as e:
-                logger.error(f"{name} error: {e}")
-                self.download_queue.task_done()
+                self.stats["extract"].errors += 1
+                logger.error(f"{name} failed to extract {filepath}: {e}")
+            finally:
+                self.extract_queue.task_done()
+                
+    def get_stats(self) -> Dict:
+        """段階ごとの処理量とスループット、ホストごとの同時数"""
+        stats = {stage: stats.get_stats() for stage, stats in self.stats.items()}
+        stats["hosts"] = {host: queue.get_stats() for host, queue in self.hosts.items()}
+        if self.bandwidth:
+            stats["bandwidth"] = {"rate": self.bandwidth.rate, "waited_seconds": round(self.bandwidth.waited, 2)}
+        return stats
                 
     async def _download_file(self, url_info: Dict) -> Optional[str]:
-        """ファイルをダウンロード"""
+        """ファイルをダウンロード（中断したファイルは続きから取得）"""
         url = url_info["url"]
         name = url_info.get("name", self._get_filename_from_url(url))
         category = url_info.get("category", "misc")
@@ -96,60 +503,286 @@ class DownloadManager:
         save_dir = self.download_dir / category
         save_dir.mkdir(parents=True, exist_ok=True)
         filepath = save_dir / name
+        part_path = filepath.with_name(filepath.name + ".part")
+        state_path = filepath.with_name(filepath.name + ".part.json")
         
         # 履歴確認（既にダウンロード済みか）
-        if self._is_already_downloaded(url, filepath):
+        if self._is_already_downloaded(url, filepath) and not self._is_stale(url_info):
             logger.info(f"Already downloaded: {name}")
             return str(filepath)
+        
+        # 検証用のETag/Last-Modifiedがある取得済みファイルは条件付きGETで更新を確認
+        conditional = {}
+        entry = self.history.get(url, {})
+        if filepath.exists() and entry.get("size") == filepath.stat().st_size:
+            if entry.get("etag"):
+                conditional["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                conditional["If-Modified-Since"] = entry["last_modified"]
             
+        start = time.perf_counter()
         try:
-            # ヘッダー情報取得
-            async with self.session.head(url) as response:
-                total_size = int(response.headers.get('content-length', 0))
-                
-            # プログレスバー付きダウンロード
-            async with self.session.get(url) as response:
-                response.raise_for_status()
-                
-                with tqdm(total=total_size, unit='B', unit_scale=True, desc=name) as pbar:
-                    async with aiofiles.open(filepath, 'wb') as file:
-                        async for chunk in response.content.iter_chunked(self.chunk_size):
-                            await file.write(chunk)
-                            pbar.update(len(chunk))
-                            
-            # チェックサム計算
-            checksum = await self._calculate_checksum(filepath)
+            state = self._load_partial(url, part_path, state_path)
+            for attempt in range(2):
+                hasher = IncrementalChecksum(part_path, self.stats["checksum"], self.chunk_size)
+                try:
+                    if state is None:
+                        state = await self._start_download(url, part_path, state_path, conditional, name, hasher)
+                        if state is None:
+                            logger.info(f"Not modified: {name}")
+                            self.history.update(url, checked_at=datetime.now().isoformat())
+                            return str(filepath)
+                    await self._fetch_segments(url, part_path, state_path, state, name, hasher)
+                    break
+                except ResourceChanged:
+                    # 途中でファイルが更新された場合は最初から取り直す（1回のみ）
+                    logger.warning(f"Remote file changed during download, restarting: {name}")
+                    self._discard_partial(part_path, state_path)
+                    state = None
+                    if attempt:
+                        raise
+            
+            total_size = part_path.stat().st_size
+            if state["total"] is not None and total_size != state["total"]:
+                raise IOError(f"Size mismatch: {total_size} != {state['total']}")
+            
+            # チェックサム（受信中に計算できなかった部分のみファイルから読む）
+            checksum = await hasher.hexdigest(total_size)
+            os.replace(part_path, filepath)
+            state_path.unlink(missing_ok=True)
+            self.stats["download"].add(0, time.perf_counter() - start, files=1)
             
             # 履歴更新
-            self.history[url] = {
+            self.history.record(url, {
                 "filepath": str(filepath),
                 "timestamp": datetime.now().isoformat(),
                 "size": total_size,
                 "checksum": checksum,
-                "category": category
-            }
-            self._save_history()
+                "category": category,
+                "etag": state["etag"],
+                "last_modified": state["last_modified"]
+            })
             
-            # 圧縮ファイルの場合は解凍
+            # 圧縮ファイルの場合は解凍段階へ
             if self._is_archive(filepath):
-                await self._extract_archive(filepath)
+                await self.extract_queue.put(filepath)
                 
             logger.info(f"Downloaded: {name} ({total_size:,} bytes)")
             return str(filepath)
             
         except Exception as e:
-            logger.error(f"Failed to download {url}: {e}")
-            if filepath.exists():
-                filepath.unlink()
+            # 取得済みの部分は残し、次回は続きから取得する
+            partial = part_path.stat().st_size if part_path.exists() else 0
+            self.stats["download"].add(0, time.perf_counter() - start)
+            self.stats["download"].errors += 1
+            logger.error(f"Failed to download {url}: {e} (partial file kept: {partial:,} bytes)")
             return None
             
     def _is_already_downloaded(self, url: str, filepath: Path) -> bool:
-        """既にダウンロード済みか確認"""
-        if url in self.history and filepath.exists():
+        """
+        既にダウンロード済みか確認
+        ETag/Last-Modifiedのない履歴はファイルサイズで判定し、ある場合は条件付きGETで確認する
+        """
+        entry = self.history.get(url)
+        if entry and filepath.exists() and not (entry.get("etag") or entry.get("last_modified")):
             # ファイルサイズで簡易チェック
-            if filepath.stat().st_size == self.history[url].get("size", 0):
+            if filepath.stat().st_size == entry.get("size", 0):
                 return True
         return False
+    
+    def _load_partial(self, url: str, part_path: Path, state_path: Path) -> Optional[Dict]:
+        """中断したダウンロードの進捗を読み込み（別URLの進捗や検証用ヘッダーのない進捗は破棄）"""
+        if not (part_path.exists() and state_path.exists()):
+            self._discard_partial(part_path, state_path)
+            return None
+        try:
+            with open(state_path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            state = None
+        if not state or state.get("url") != url or not (state.get("etag") or state.get("last_modified")):
+            self._discard_partial(part_path, state_path)
+            return None
+        done = sum(segment["written"] for segment in state["segments"])
+        logger.info(f"Resuming {part_path.name[:-5]} from {done:,} bytes")
+        return state
+    
+    def _discard_partial(self, part_path: Path, state_path: Path):
+        part_path.unlink(missing_ok=True)
+        state_path.unlink(missing_ok=True)
+    
+    def _save_partial(self, state_path: Path, state: Dict):
+        """進捗を一時ファイル経由で書き出す（書き込み途中で止まっても壊れない）"""
+        tmp_path = state_path.with_name(state_path.name + ".tmp")
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, state_path)
+    
+    def _split_segments(self, total: int) -> List[Dict]:
+        return [
+            {"start": start, "end": min(start + self.SEGMENT_SIZE, total) - 1, "written": 0}
+            for start in range(0, total, self.SEGMENT_SIZE)
+        ]
+            
+    async def _start_download(self, url: str, part_path: Path, state_path: Path,
+                              conditional: Dict[str, str], name: str,
+                              hasher: IncrementalChecksum) -> Optional[Dict]:
+        """
+        先頭からのRange付きGETで応答から全体サイズ・Range対応・検証用ヘッダーを得て、最初の区間を書き込む
+        検証用ヘッダーがない場合は続きを別の要求で取得できないため、分割せず同じ応答から最後まで取得する
+        304（更新なし）の場合はNone
+        """
+        headers = {**conditional, "Range": "bytes=0-"}
+        async with self.session.get(url, headers=headers) as response:
+            if response.status == 304:
+                return None
+            response.raise_for_status()
+            
+            state = {
+                "url": url,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "total": None,
+                "segments": []
+            }
+            if response.status == 206:
+                _, _, total = _parse_content_range(response.headers.get("Content-Range"))
+                if total is not None:
+                    state["total"] = total
+                    if state["etag"] or state["last_modified"]:
+                        state["segments"] = self._split_segments(total)
+                    else:
+                        state["segments"] = [{"start": 0, "end": total - 1, "written": 0}]
+            if not state["segments"]:
+                # Range非対応（200）または全体サイズ不明の場合は1区間として順に取得する
+                length = response.headers.get("Content-Length") if response.status == 200 else None
+                state["total"] = int(length) if length else None
+                state["segments"] = [{
+                    "start": 0,
+                    "end": state["total"] - 1 if state["total"] else None,
+                    "written": 0
+                }]
+            
+            async with aiofiles.open(part_path, 'wb') as file:
+                if state["total"]:
+                    await file.truncate(state["total"])
+            self._save_partial(state_path, state)
+            
+            with tqdm(total=state["total"], unit='B', unit_scale=True, desc=name) as pbar:
+                try:
+                    await self._write_segment(response, part_path, state_path, state, state["segments"][0], pbar, hasher)
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    # 続きは残りの区間と一緒に再試行する
+                    self._save_partial(state_path, state)
+                    logger.warning(f"First segment of {name} interrupted ({e}), resuming")
+        return state
+    
+    async def _fetch_segments(self, url: str, part_path: Path, state_path: Path, state: Dict, name: str,
+                              hasher: IncrementalChecksum):
+        """残りの区間を並行に取得（検証用ヘッダーがない場合は1区間ずつ）"""
+        remaining = [segment for segment in state["segments"] if not self._segment_done(segment)]
+        if not remaining:
+            return
+        validator = state["etag"] or state["last_modified"]
+        semaphore = asyncio.Semaphore(self.SEGMENT_CONCURRENCY if validator else 1)
+        done = sum(segment["written"] for segment in state["segments"])
+        
+        with tqdm(total=state["total"], initial=done, unit='B', unit_scale=True, desc=name) as pbar:
+            async def fetch(segment: Dict):
+                async with semaphore:
+                    for attempt in range(self.SEGMENT_RETRIES + 1):
+                        try:
+                            await self._fetch_segment(url, part_path, state_path, state, segment, validator, pbar, hasher)
+                            break
+                        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                            if attempt == self.SEGMENT_RETRIES:
+                                raise
+                            logger.warning(f"Segment {segment['start']}- of {name} failed ({e}), resuming")
+                            self._host_queue(url).on_error()
+                            await asyncio.sleep(2 ** attempt)
+                # 先頭から揃った部分のチェックサムを進める
+                await hasher.catch_up(self._contiguous_bytes(state))
+            
+            try:
+                await asyncio.gather(*(fetch(segment) for segment in remaining))
+            finally:
+                self._save_partial(state_path, state)
+    
+    @staticmethod
+    def _segment_done(segment: Dict) -> bool:
+        return segment["end"] is not None and segment["start"] + segment["written"] > segment["end"]
+    
+    @classmethod
+    def _contiguous_bytes(cls, state: Dict) -> int:
+        """
+        ファイルの先頭から途切れずに完了した区間の終わりの位置
+        書き込み中の区間はaiofilesのバッファに未書き込みの部分があるため含めない
+        """
+        size = 0
+        for segment in state["segments"]:
+            if not cls._segment_done(segment):
+                break
+            size = segment["end"] + 1
+        return size
+    
+    async def _fetch_segment(self, url: str, part_path: Path, state_path: Path, state: Dict,
+                             segment: Dict, validator: Optional[str], pbar, hasher: IncrementalChecksum):
+        """区間の未取得部分をRange/If-Rangeで取得"""
+        offset = segment["start"] + segment["written"]
+        end = "" if segment["end"] is None else segment["end"]
+        headers = {"Range": f"bytes={offset}-{end}"}
+        if validator:
+            headers["If-Range"] = validator
+        elif offset:
+            # 検証できないため、続きからの取得はせず最初から取り直す
+            raise ResourceChanged()
+        
+        async with self.session.get(url, headers=headers) as response:
+            response.raise_for_status()
+            if response.status != 206:
+                if offset == 0 and len(state["segments"]) == 1:
+                    # 1区間の先頭からなら200の全体応答をそのまま使える
+                    await self._write_segment(response, part_path, state_path, state, segment, pbar, hasher)
+                    return
+                raise ResourceChanged()
+            start, _, total = _parse_content_range(response.headers.get("Content-Range"))
+            if start != offset or (state["total"] is not None and total not in (None, state["total"])):
+                raise ResourceChanged()
+            await self._write_segment(response, part_path, state_path, state, segment, pbar, hasher)
+    
+    async def _write_segment(self, response, part_path: Path, state_path: Path, state: Dict, segment: Dict, pbar,
+                             hasher: IncrementalChecksum):
+        """応答本文を区間の取得済み位置から書き込み、一定量ごとに進捗を保存"""
+        unsaved = 0
+        host = self._host_queue(state["url"])
+        async with aiofiles.open(part_path, 'r+b') as file:
+            await file.seek(segment["start"] + segment["written"])
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                if segment["end"] is not None:
+                    chunk = chunk[:segment["end"] + 1 - segment["start"] - segment["written"]]
+                await file.write(chunk)
+                if segment["end"] is not None and segment["start"] + segment["written"] + len(chunk) > segment["end"]:
+                    # 完了した区間は他の区間のcatch_upから読まれるため、完了とする前にディスクへ書き出す
+                    await file.flush()
+                hasher.feed(segment["start"] + segment["written"], chunk)
+                segment["written"] += len(chunk)
+                self.stats["download"].bytes += len(chunk)
+                host.on_bytes(len(chunk))
+                if self.bandwidth:
+                    await self.bandwidth.consume(len(chunk))
+                pbar.update(len(chunk))
+                unsaved += len(chunk)
+                if unsaved >= self.PROGRESS_SAVE_BYTES:
+                    await file.flush()
+                    self._save_partial(state_path, state)
+                    unsaved = 0
+                if self._segment_done(segment):
+                    break
+        if segment["end"] is None:
+            # 全体サイズ不明の区間は応答の終わりで完了
+            segment["end"] = segment["start"] + segment["written"] - 1
+            state["total"] = segment["end"] + 1
+        self._save_partial(state_path, state)
         
     def _get_filename_from_url(self, url: str) -> str:
         """URLからファイル名を生成"""
@@ -160,42 +793,27 @@ class DownloadManager:
             filename = hashlib.md5(url.encode()).hexdigest()[:8]
         return filename
         
-    async def _calculate_checksum(self, filepath: Path) -> str:
-        """ファイルのチェックサムを計算"""
-        hash_md5 = hashlib.md5()
-        async with aiofiles.open(filepath, 'rb') as f:
-            while chunk := await f.read(self.chunk_size):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
-        
     def _is_archive(self, filepath: Path) -> bool:
         """アーカイブファイルか判定"""
         archive_extensions = {'.zip', '.tar', '.tar.gz', '.tgz', '.gz', '.7z', '.rar'}
         return filepath.suffix.lower() in archive_extensions
-        
-    async def _extract_archive(self, filepath: Path):
-        """アーカイブを解凍"""
-        extract_dir = filepath.parent / filepath.stem
-        extract_dir.mkdir(exist_ok=True)
-        
-        try:
-            if filepath.suffix == '.zip':
-                with zipfile.ZipFile(filepath, 'r') as zip_ref:
-                    zip_ref.extractall(extract_dir)
-            elif filepath.suffix in ['.tar', '.tar.gz', '.tgz']:
-                with tarfile.open(filepath, 'r:*') as tar_ref:
-                    tar_ref.extractall(extract_dir)
-            elif filepath.suffix == '.gz' and not filepath.suffixes[-2:] == ['.tar', '.gz']:
-                # 単一ファイルのgzip
-                output_file = extract_dir / filepath.stem
-                with gzip.open(filepath, 'rb') as gz_file:
-                    with open(output_file, 'wb') as out_file:
-                        shutil.copyfileobj(gz_file, out_file)
-                        
-            logger.info(f"Extracted: {filepath.name} to {extract_dir}")
-            
-        except Exception as e:
-            logger.error(f"Failed to extract {filepath}: {e}")
+
+
+SIZE_UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3, "TB": 1024 ** 4}
+
+
+def _parse_size(value: Optional[str]) -> Optional[int]:
+    """サイズ表記（50MB 等）をバイト数に変換（不明な場合はNone）"""
+    if not value:
+        return None
+    text = str(value).strip().upper()
+    for unit, factor in SIZE_UNITS.items():
+        if text.endswith(unit):
+            try:
+                return int(float(text[:-len(unit)]) * factor)
+            except ValueError:
+                return None
+    return None
 
 
 class DatasetRegistry:
@@ -304,7 +922,11 @@ class DatasetRegistry:
     
     @classmethod
     def get_download_list(cls, categories: List[str] = None) -> List[Dict]:
-        """ダウンロードリストを生成"""
+        """
+        ダウンロードリストを生成
+        更新間隔のあるリアルタイムデータ（間隔の短い順）を先に、その後はサイズの小さい順に並べる
+        サイズ未記載のものは小さなCSVが多いため先頭側に置く
+        """
         download_list = []
         
         def extract_urls(data: Dict, category: str = ""):
@@ -318,19 +940,25 @@ class DatasetRegistry:
                                 "name": value["name"],
                                 "category": category or key,
                                 "description": value.get("description", ""),
-                                "refresh": value.get("refresh", 0)
+                                "refresh": value.get("refresh", 0),
+                                "size_bytes": _parse_size(value.get("size"))
                             })
                     else:
                         # ネストされた辞書
                         extract_urls(value, category or key)
                         
         extract_urls(cls.DATASETS)
+        download_list.sort(key=lambda item: (
+            not item["refresh"],
+            item["refresh"],
+            item["size_bytes"] or 0
+        ))
         return download_list
 
 
-async def download_all_datasets(categories: List[str] = None):
-    """全データセットをダウンロード"""
-    manager = DownloadManager()
+async def download_all_datasets(categories: List[str] = None, max_bandwidth: Optional[int] = None):
+    """全データセットをダウンロード（max_bandwidthは全体の受信帯域の上限、バイト/秒）"""
+    manager = DownloadManager(max_bandwidth=max_bandwidth)
     registry = DatasetRegistry()
     
     # ダウンロードリスト生成
@@ -344,6 +972,7 @@ async def download_all_datasets(categories: List[str] = None):
     # サマリー出力
     success_count = sum(1 for r in results.values() if r.get("filepath"))
     logger.info(f"Download complete: {success_count}/{len(download_list)} successful")
+    logger.info(f"Pipeline stats: {manager.get_stats()}")
     
     return results
 
@@ -353,4 +982,5 @@ if __name__ == "__main__":
     # asyncio.run(download_all_datasets())
     
     # 特定カテゴリのみ
-    # asyncio.run(download_all_datasets(["government", "hiroshima"]))
\ No newline at end of file
+    # asyncio.run(download_all_datasets(["government", "hiroshima"]))
+    pass
\ No newline at end of file
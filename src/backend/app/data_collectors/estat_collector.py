@@ -4,13 +4,14 @@ e-Stat API データ収集モジュール
 """
 import os
 import json
-import requests
+import asyncio
 from datetime import datetime
 from typing import Dict, List, Optional
-import time
 from pathlib import Path
 import logging
 
+from app.core.http_client import http_client
+
 # ロギング設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -49,7 +50,7 @@ class EStatCollector:
         
         self.data_dir = Path("uesugi-engine-data")
         
-    def fetch_stat_list(self, search_word: str = "観光") -> List[Dict]:
+    async def fetch_stat_list(self, search_word: str = "観光") -> List[Dict]:
         """
         統計表情報を検索
         """
@@ -60,7 +61,7 @@ class EStatCollector:
         }
         
         try:
-            response = requests.get(f"{self.BASE_URL}/getStatsList", params=params)
+            response = await http_client.get(f"{self.BASE_URL}/getStatsList", params=params)
             response.raise_for_status()
             data = response.json()
             
@@ -74,7 +75,7 @@ class EStatCollector:
             logger.error(f"Failed to fetch stat list: {e}")
             return []
     
-    def fetch_stat_data(self, stats_data_id: str, area_code: str = None) -> Dict:
+    async def fetch_stat_data(self, stats_data_id: str, area_code: str = None) -> Dict:
         """
         統計データを取得
         """
@@ -88,7 +89,7 @@ class EStatCollector:
             params["cdArea"] = area_code
             
         try:
-            response = requests.get(f"{self.BASE_URL}/getStatsData", params=params)
+            response = await http_client.get(f"{self.BASE_URL}/getStatsData", params=params)
             response.raise_for_status()
             data = response.json()
             
@@ -134,11 +135,13 @@ class EStatCollector:
             
         return formatted_data
     
-    def collect_basic_stats(self, prefectures: List[str] = ["広島県", "山口県"]) -> Dict:
+    async def collect_basic_stats(self, prefectures: List[str] = ["広島県", "山口県"]) -> Dict:
         """
         基本統計データを収集
+        全リクエストを同時に発行し、e-Stat APIのレート制限は共有HTTPクライアントで守る
         """
         results = {}
+        pending = []
         
         for prefecture in prefectures:
             area_code = self.AREA_CODES.get(prefecture)
@@ -150,13 +153,12 @@ class EStatCollector:
             # 各統計データを取得
             for stat_name, stat_id in self.STAT_IDS.items():
                 logger.info(f"Fetching {stat_name} for {prefecture}...")
-                data = self.fetch_stat_data(stat_id, area_code)
-                
-                if data:
-                    results[prefecture][stat_name] = data
-                    
-                # レート制限対策
-                time.sleep(1)
+                pending.append((prefecture, stat_name, self.fetch_stat_data(stat_id, area_code)))
+        
+        responses = await asyncio.gather(*(request for _, _, request in pending))
+        for (prefecture, stat_name, _), data in zip(pending, responses):
+            if data:
+                results[prefecture][stat_name] = data
         
         # 結果を保存
         self._save_results(results)
@@ -181,8 +183,8 @@ if __name__ == "__main__":
     collector = EStatCollector()
     
     # 観光関連の統計を検索
-    stat_list = collector.fetch_stat_list("観光 広島")
+    stat_list = asyncio.run(collector.fetch_stat_list("観光 広島"))
     logger.info(f"Found {len(stat_list)} statistics")
     
     # 基本統計データを収集
-    # results = collector.collect_basic_stats()
\ No newline at end of file
+    # results = asyncio.run(collector.collect_basic_stats())
\ No newline at end of file
@@ -3,7 +3,7 @@
 JNTO統計、自治体イベントカレンダー等から情報を収集
 """
 import json
-import requests
+import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import logging
@@ -11,6 +11,8 @@ from pathlib import Path
 from bs4 import BeautifulSoup
 import re
 
+from app.core.http_client import http_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -123,7 +125,7 @@ class EventCollector:
             }
         }
     
-    def scrape_event_calendar(self, prefecture: str) -> List[Dict]:
+    async def scrape_event_calendar(self, prefecture: str) -> List[Dict]:
         """
         自治体のイベントカレンダーをスクレイピング
         """
@@ -133,11 +135,11 @@ class EventCollector:
             return []
             
         try:
-            response = requests.get(source["url"], timeout=10)
+            response = await http_client.get(source["url"], timeout=10)
             response.raise_for_status()
-            response.encoding = response.apparent_encoding
             
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # 文字コードはBeautifulSoupに判定させる（自治体サイトはShift_JISの場合がある）
+            soup = BeautifulSoup(response.content, 'html.parser')
             
             # イベント情報を抽出（実際のセレクターは要調整）
             events = []
@@ -233,9 +235,9 @@ class EventCollector:
         
         return spots_data.get(prefecture, [])
     
-    def collect_all_event_data(self, prefectures: List[str] = ["広島県", "山口県"]) -> Dict:
+    async def collect_all_event_data(self, prefectures: List[str] = ["広島県", "山口県"]) -> Dict:
         """
-        全イベント・観光データを収集
+        全イベント・観光データを収集（各自治体サイトへのリクエストは同時に発行）
         """
         results = {
             "jnto_statistics": self.fetch_jnto_statistics(),
@@ -243,11 +245,11 @@ class EventCollector:
             "tourist_spots": {}
         }
         
-        for prefecture in prefectures:
-            logger.info(f"Collecting event data for {prefecture}...")
-            
+        logger.info(f"Collecting event data for {', '.join(prefectures)}...")
+        calendars = await asyncio.gather(*(self.scrape_event_calendar(prefecture) for prefecture in prefectures))
+        
+        for prefecture, events in zip(prefectures, calendars):
             # イベントカレンダー
-            events = self.scrape_event_calendar(prefecture)
             results["events"][prefecture] = events
             
             # 観光地情報
@@ -296,4 +298,4 @@ class FacilityVisitorCollector:
 if __name__ == "__main__":
     # イベントデータ収集テスト
     collector = EventCollector()
-    # results = collector.collect_all_event_data()
\ No newline at end of file
+    # results = asyncio.run(collector.collect_all_event_data())
\ No newline at end of file
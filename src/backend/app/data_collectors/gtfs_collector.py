@@ -4,14 +4,16 @@ GTFS-JPおよびODPTからデータを取得
 """
 import os
 import json
+import asyncio
 import zipfile
-import requests
 from datetime import datetime
 from typing import Dict, List, Optional
 import pandas as pd
 from pathlib import Path
 import logging
 
+from app.core.http_client import http_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -49,9 +51,10 @@ class GTFSCollector:
         self.data_dir = Path("uesugi-engine-data")
         self.odpt_token = odpt_token or os.getenv('ODPT_ACCESS_TOKEN')
         
-    def download_gtfs(self, operator_name: str) -> bool:
+    async def download_gtfs(self, operator_name: str) -> bool:
         """
         GTFS形式のデータをダウンロード
+        解凍と解析はイベントループを止めないよう別スレッドで行う
         """
         source = self.GTFS_SOURCES.get(operator_name)
         if not source or not source["url"]:
@@ -59,10 +62,6 @@ class GTFSCollector:
             return False
             
         try:
-            # ダウンロード
-            response = requests.get(source["url"], stream=True)
-            response.raise_for_status()
-            
             # 保存先
             timestamp = datetime.now().strftime("%Y%m%d")
             output_dir = self.data_dir / "raw" / "gtfs" / f"{operator_name}_{timestamp}"
@@ -70,19 +69,20 @@ class GTFSCollector:
             
             zip_path = output_dir / "gtfs.zip"
             
-            # ZIPファイルを保存
-            with open(zip_path, "wb") as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
+            # ダウンロードしてZIPファイルを保存
+            async with http_client.stream("GET", source["url"]) as response:
+                response.raise_for_status()
+                with open(zip_path, "wb") as f:
+                    async for chunk in response.aiter_bytes(chunk_size=65536):
+                        f.write(chunk)
                     
             # 解凍
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(output_dir)
+            await asyncio.to_thread(self._extract_zip, zip_path, output_dir)
                 
             logger.info(f"Downloaded GTFS data for {operator_name} to {output_dir}")
             
             # GTFSデータを解析
-            self._parse_gtfs(output_dir, operator_name)
+            await asyncio.to_thread(self._parse_gtfs, output_dir, operator_name)
             
             return True
             
@@ -90,6 +90,11 @@ class GTFSCollector:
             logger.error(f"Failed to download GTFS for {operator_name}: {e}")
             return False
     
+    @staticmethod
+    def _extract_zip(zip_path: Path, output_dir: Path):
+        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+            zip_ref.extractall(output_dir)
+    
     def _parse_gtfs(self, gtfs_dir: Path, operator_name: str):
         """
         GTFSデータを解析して統一フォーマットに変換
@@ -128,7 +133,7 @@ class GTFSCollector:
         with open(output_path, "w", encoding="utf-8") as f:
             json.dump(result, f, ensure_ascii=False, indent=2)
             
-    def fetch_odpt_data(self, data_type: str = "Station") -> List[Dict]:
+    async def fetch_odpt_data(self, data_type: str = "Station") -> List[Dict]:
         """
         ODPTからデータを取得
         """
@@ -144,7 +149,7 @@ class GTFSCollector:
         params = {}
         
         try:
-            response = requests.get(
+            response = await http_client.get(
                 f"{self.ODPT_BASE_URL}/odpt:{data_type}",
                 headers=headers,
                 params=params
@@ -165,25 +170,30 @@ class GTFSCollector:
             logger.error(f"Failed to fetch ODPT data: {e}")
             return []
     
-    def collect_all_transport_data(self):
+    async def collect_all_transport_data(self):
         """
-        全交通データを収集
+        全交通データを収集（GTFSとODPTのリクエストは同時に発行）
         """
         results = {
             "gtfs": {},
             "odpt": {}
         }
         
+        operators = list(self.GTFS_SOURCES.keys())
+        data_types = ["Station", "Railway", "Bus"]
+        logger.info(f"Collecting GTFS data for {len(operators)} operators and ODPT {', '.join(data_types)} data...")
+        
+        gtfs_results, odpt_results = await asyncio.gather(
+            asyncio.gather(*(self.download_gtfs(operator) for operator in operators)),
+            asyncio.gather(*(self.fetch_odpt_data(data_type) for data_type in data_types))
+        )
+        
         # GTFSデータ収集
-        for operator in self.GTFS_SOURCES.keys():
-            logger.info(f"Collecting GTFS data for {operator}...")
-            success = self.download_gtfs(operator)
+        for operator, success in zip(operators, gtfs_results):
             results["gtfs"][operator] = success
             
         # ODPTデータ収集
-        for data_type in ["Station", "Railway", "Bus"]:
-            logger.info(f"Collecting ODPT {data_type} data...")
-            data = self.fetch_odpt_data(data_type)
+        for data_type, data in zip(data_types, odpt_results):
             results["odpt"][data_type] = len(data)
             
         return results
@@ -216,7 +226,7 @@ if __name__ == "__main__":
     collector = GTFSCollector()
     
     # 広島電鉄のGTFSをダウンロード
-    # collector.download_gtfs("広島電鉄")
+    # asyncio.run(collector.download_gtfs("広島電鉄"))
     
     # ODPTデータ取得テスト
-    # stations = collector.fetch_odpt_data("Station")
\ No newline at end of file
+    # stations = asyncio.run(collector.fetch_odpt_data("Station"))
\ No newline at end of file
@@ -1,20 +1,31 @@
 """
 メインデータ収集スクリプト
-すべてのデータコレクターを統合して実行
+すべてのデータコレクターを依存関係のグラフとして並行実行
+実行: src/backend で python -m app.data_collectors.main_collector [--rerun-failed] [--schedule]
 """
 import os
+import sys
 import json
-import schedule
+import asyncio
+import argparse
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 import logging
-from typing import Dict
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple
 
-from estat_collector import EStatCollector
-from weather_collector import WeatherCollector, EarthquakeCollector
-from gtfs_collector import GTFSCollector
-from event_collector import EventCollector
+from app.core.http_client import http_client
+
+from .estat_collector import EStatCollector
+from .weather_collector import WeatherCollector, EarthquakeCollector
+from .gtfs_collector import GTFSCollector
+from .event_collector import EventCollector
+
+try:
+    from app.core.cache import invalidate_cache_sync
+except ImportError:
+    # APIパッケージ外から単体実行された場合はキャッシュ無効化なし
+    invalidate_cache_sync = None
 
 # ロギング設定
 logging.basicConfig(
@@ -24,8 +35,65 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class CollectionTask(NamedTuple):
+    """収集タスク（depends_onのタスクがすべて成功してから実行する）"""
+    name: str
+    label: str
+    run: Callable[[], Awaitable[Any]]
+    summarize: Callable[[Any], Dict]
+    depends_on: Tuple[str, ...] = ()
+
+
+def topological_order(tasks: Dict[str, CollectionTask], names: Sequence[str]) -> List[str]:
+    """
+    指定タスクの実行順（依存先が先）
+    指定外の依存先は実行済みとみなす。未登録の依存先や循環があればValueError
+    """
+    selected = set(names)
+    for name in names:
+        for dependency in tasks[name].depends_on:
+            if dependency not in tasks:
+                raise ValueError(f"Unknown dependency '{dependency}' for task '{name}'")
+
+    order: List[str] = []
+    visiting: set = set()
+
+    def visit(name: str):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"Circular dependency at task '{name}'")
+        visiting.add(name)
+        for dependency in tasks[name].depends_on:
+            if dependency in selected:
+                visit(dependency)
+        visiting.discard(name)
+        order.append(name)
+
+    for name in names:
+        visit(name)
+    return order
+
+
+def _output_bytes(output: Any) -> int:
+    """タスク出力をJSONにした場合のサイズ（バイト）"""
+    try:
+        return len(json.dumps(output, ensure_ascii=False, default=str).encode("utf-8"))
+    except (TypeError, ValueError):
+        return 0
+
+
 class DataCollectionOrchestrator:
-    """データ収集を統括するオーケストレーター"""
+    """
+    データ収集を統括するオーケストレーター
+    - 収集タスクを依存関係のグラフ（DAG）として宣言し、依存のないタスクは同時に実行する
+    - 依存先が失敗したタスクは実行せずskippedとする
+    - タスクごとの所要時間と出力サイズを収集ログに記録し、失敗したタスクだけを再実行できる
+    """
+    
+    # 定期実行のスケジュール（タスク名, 間隔）と全データ収集の時刻
+    PERIODIC_TASKS = [("weather", timedelta(hours=1)), ("earthquake", timedelta(minutes=30))]
+    DAILY_COLLECTION_AT = "06:00"
     
     def __init__(self):
         self.data_dir = Path("uesugi-engine-data")
@@ -36,109 +104,153 @@ class DataCollectionOrchestrator:
             "gtfs": GTFSCollector(),
             "event": EventCollector()
         }
+        self.tasks = self._build_tasks()
         
         # ログディレクトリ作成
         self.log_dir = self.data_dir / "logs"
         self.log_dir.mkdir(parents=True, exist_ok=True)
         
-    def collect_all_data(self) -> Dict:
+    def _build_tasks(self) -> Dict[str, CollectionTask]:
+        """収集タスクの定義（現在の収集モジュールは互いに独立）"""
+        collectors = self.collectors
+        tasks = [
+            CollectionTask(
+                "estat", "e-Stat data",
+                collectors["estat"].collect_basic_stats,
+                lambda data: {"records": len(data)}
+            ),
+            CollectionTask(
+                "weather", "weather data",
+                collectors["weather"].collect_all_weather,
+                lambda data: {"cities": len(data)}
+            ),
+            CollectionTask(
+                "earthquake", "earthquake data",
+                collectors["earthquake"].fetch_recent_earthquakes,
+                lambda data: {"events": len(data)}
+            ),
+            CollectionTask(
+                "gtfs", "GTFS data",
+                collectors["gtfs"].collect_all_transport_data,
+                lambda data: {"operators": data}
+            ),
+            CollectionTask(
+                "event", "event data",
+                collectors["event"].collect_all_event_data,
+                lambda data: {"prefectures": len(data.get("events", {}))}
+            ),
+        ]
+        return {task.name: task for task in tasks}
+        
+    async def _run_task(self, task: CollectionTask, dependencies: Dict[str, "asyncio.Task"]) -> Dict:
+        """依存先の完了を待ってタスクを実行し、結果と計測値を返す"""
+        if dependencies:
+            outcomes = await asyncio.gather(*dependencies.values())
+            failed = [name for name, outcome in zip(dependencies, outcomes) if outcome["status"] != "success"]
+            if failed:
+                logger.warning(f"Skipping {task.label}: dependency failed ({', '.join(failed)})")
+                return {"status": "skipped", "error": f"dependency failed: {', '.join(failed)}"}
+        
+        started_at = datetime.now()
+        start = time.perf_counter()
+        logger.info(f"Collecting {task.label}...")
+        try:
+            output = await task.run()
+            result = {"status": "success", **task.summarize(output), "output_bytes": _output_bytes(output)}
+        except Exception as e:
+            logger.error(f"{task.label} collection failed: {e}")
+            result = {"status": "failed", "error": str(e)}
+        result["started_at"] = started_at.isoformat()
+        result["duration_seconds"] = round(time.perf_counter() - start, 3)
+        return result
+        
+    async def run_tasks(self, names: Optional[Sequence[str]] = None) -> Dict[str, Dict]:
+        """
+        指定タスク（省略時は全タスク）を依存関係の順に並行実行
+        指定外の依存先は成功済みとみなす（失敗タスクのみの再実行用）
+        """
+        order = topological_order(self.tasks, list(names or self.tasks))
+        selected = set(order)
+        running: Dict[str, asyncio.Task] = {}
+        for name in order:
+            task = self.tasks[name]
+            dependencies = {d: running[d] for d in task.depends_on if d in selected}
+            running[name] = asyncio.create_task(self._run_task(task, dependencies))
+        
+        await asyncio.gather(*running.values())
+        results = {}
+        for name in order:
+            results[name] = {**running[name].result(), "depends_on": list(self.tasks[name].depends_on)}
+        return results
+        
+    async def collect_all_data(self, names: Optional[Sequence[str]] = None, rerun_of: Optional[str] = None,
+                               previous: Optional[Dict[str, Dict]] = None) -> Dict:
         """
         すべてのデータを収集
+        各収集モジュール内のリクエストは共有HTTPクライアントで同時に発行される
         """
         start_time = datetime.now()
         logger.info("=== Starting data collection ===")
         
         results = {
             "start_time": start_time.isoformat(),
-            "collectors": {}
+            "collectors": dict(previous or {})
         }
+        if rerun_of:
+            results["rerun_of"] = rerun_of
         
-        # 1. マクロ統計データ（e-Stat）
-        try:
-            logger.info("Collecting e-Stat data...")
-            estat_data = self.collectors["estat"].collect_basic_stats()
-            results["collectors"]["estat"] = {
-                "status": "success",
-                "records": len(estat_data)
-            }
-        except Exception as e:
-            logger.error(f"e-Stat collection failed: {e}")
-            results["collectors"]["estat"] = {
-                "status": "failed",
-                "error": str(e)
-            }
-            
-        # 2. 気象データ
-        try:
-            logger.info("Collecting weather data...")
-            weather_data = self.collectors["weather"].collect_all_weather()
-            results["collectors"]["weather"] = {
-                "status": "success",
-                "cities": len(weather_data)
-            }
-        except Exception as e:
-            logger.error(f"Weather collection failed: {e}")
-            results["collectors"]["weather"] = {
-                "status": "failed",
-                "error": str(e)
-            }
-            
-        # 3. 地震データ
-        try:
-            logger.info("Collecting earthquake data...")
-            earthquake_data = self.collectors["earthquake"].fetch_recent_earthquakes()
-            results["collectors"]["earthquake"] = {
-                "status": "success",
-                "events": len(earthquake_data)
-            }
-        except Exception as e:
-            logger.error(f"Earthquake collection failed: {e}")
-            results["collectors"]["earthquake"] = {
-                "status": "failed",
-                "error": str(e)
-            }
+        task_results = await self.run_tasks(names)
+        results["collectors"].update(task_results)
+        results["tasks_run"] = list(task_results)
             
-        # 4. 公共交通データ（GTFS）
-        try:
-            logger.info("Collecting GTFS data...")
-            gtfs_data = self.collectors["gtfs"].collect_all_transport_data()
-            results["collectors"]["gtfs"] = {
-                "status": "success",
-                "operators": gtfs_data
-            }
-        except Exception as e:
-            logger.error(f"GTFS collection failed: {e}")
-            results["collectors"]["gtfs"] = {
-                "status": "failed",
-                "error": str(e)
-            }
-            
-        # 5. イベント・観光データ
-        try:
-            logger.info("Collecting event data...")
-            event_data = self.collectors["event"].collect_all_event_data()
-            results["collectors"]["event"] = {
-                "status": "success",
-                "prefectures": len(event_data.get("events", {}))
-            }
-        except Exception as e:
-            logger.error(f"Event collection failed: {e}")
-            results["collectors"]["event"] = {
-                "status": "failed",
-                "error": str(e)
-            }
-            
-        # 完了時刻と処理時間
+        # 完了時刻と処理時間（タスク所要時間の合計との差が並行実行の効果）
         end_time = datetime.now()
         results["end_time"] = end_time.isoformat()
         results["duration_seconds"] = (end_time - start_time).total_seconds()
+        results["task_seconds_total"] = round(
+            sum(r.get("duration_seconds", 0) for r in task_results.values()), 3
+        )
+        results["output_bytes_total"] = sum(r.get("output_bytes", 0) for r in task_results.values())
+        results["http"] = http_client.get_stats()
         
         # 結果をログに保存
         self._save_collection_log(results)
         
+        # 収集データを参照するAPIキャッシュを無効化
+        if invalidate_cache_sync and any(r["status"] == "success" for r in task_results.values()):
+            invalidate_cache_sync()
+        
         logger.info(f"=== Data collection completed in {results['duration_seconds']:.2f} seconds ===")
         return results
     
+    def _latest_collection_log(self) -> Optional[Path]:
+        logs = sorted(self.log_dir.glob("collection_log_*.json"))
+        return logs[-1] if logs else None
+        
+    async def rerun_failed(self, log_path: Optional[Path] = None) -> Optional[Dict]:
+        """
+        収集ログ（省略時は最新）で失敗・スキップしたタスクだけを再実行
+        成功済みタスクの結果は引き継いで新しいログに保存する
+        """
+        log_path = log_path or self._latest_collection_log()
+        if not log_path or not log_path.exists():
+            logger.warning("No collection log to rerun")
+            return None
+        
+        with open(log_path, "r", encoding="utf-8") as f:
+            previous = json.load(f).get("collectors", {})
+        
+        failed = [
+            name for name in self.tasks
+            if previous.get(name, {}).get("status") != "success"
+        ]
+        if not failed:
+            logger.info(f"No failed tasks in {log_path.name}")
+            return None
+        
+        logger.info(f"Re-running failed tasks from {log_path.name}: {', '.join(failed)}")
+        return await self.collect_all_data(failed, rerun_of=log_path.name, previous=previous)
+    
     def _save_collection_log(self, results: Dict):
         """
         収集結果のログを保存
@@ -149,66 +261,73 @@ class DataCollectionOrchestrator:
         with open(log_path, "w", encoding="utf-8") as f:
             json.dump(results, f, ensure_ascii=False, indent=2)
             
-    def setup_schedule(self):
-        """
-        定期実行のスケジュールを設定
-        """
-        # 毎日朝6時に実行
-        schedule.every().day.at("06:00").do(self.collect_all_data)
-        
-        # 気象データは1時間ごと
-        schedule.every().hour.do(self._collect_weather_only)
-        
-        # 地震データは30分ごと
-        schedule.every(30).minutes.do(self._collect_earthquake_only)
-        
-        logger.info("Schedule setup completed")
-        
-    def _collect_weather_only(self):
-        """気象データのみ収集"""
-        try:
-            self.collectors["weather"].collect_all_weather()
-            logger.info("Weather data collection completed")
-        except Exception as e:
-            logger.error(f"Weather collection failed: {e}")
-            
-    def _collect_earthquake_only(self):
-        """地震データのみ収集"""
-        try:
-            self.collectors["earthquake"].fetch_recent_earthquakes()
-            logger.info("Earthquake data collection completed")
-        except Exception as e:
-            logger.error(f"Earthquake collection failed: {e}")
+    async def _run_daily(self, at: str):
+        """毎日指定時刻に全データを収集"""
+        hour, minute = map(int, at.split(":"))
+        while True:
+            now = datetime.now()
+            next_run = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+            if next_run <= now:
+                next_run += timedelta(days=1)
+            await asyncio.sleep((next_run - now).total_seconds())
+            try:
+                await self.collect_all_data()
+            except Exception as e:
+                logger.error(f"Scheduled collection failed: {e}")
+    
+    async def _run_periodic(self, name: str, interval: timedelta):
+        """指定間隔でタスクを実行（ログは保存しない）"""
+        while True:
+            await asyncio.sleep(interval.total_seconds())
+            result = (await self.run_tasks([name]))[name]
+            if result["status"] == "success":
+                logger.info(f"{self.tasks[name].label} collection completed in {result['duration_seconds']:.2f}s")
             
-    def run_scheduler(self):
+    async def run_scheduler(self):
         """
         スケジューラーを実行
+        毎日6時に全データ、気象データは1時間ごと、地震データは30分ごとに収集する
+        各ジョブは同じイベントループ上の独立したタスクとして待機し、次の実行時刻まで眠る
         """
         logger.info("Starting scheduler...")
-        while True:
-            schedule.run_pending()
-            time.sleep(60)  # 1分ごとにチェック
+        await asyncio.gather(
+            self._run_daily(self.DAILY_COLLECTION_AT),
+            *(self._run_periodic(name, interval) for name, interval in self.PERIODIC_TASKS)
+        )
 
 
-def main():
+async def main(argv: Optional[List[str]] = None):
     """
     メイン実行関数
     """
-    orchestrator = DataCollectionOrchestrator()
+    parser = argparse.ArgumentParser(description="オープンデータ収集")
+    parser.add_argument("--rerun-failed", action="store_true", help="最新の収集ログで失敗したタスクのみ再実行")
+    parser.add_argument("--schedule", action="store_true", help="初回実行後にスケジューラーを起動")
+    args = parser.parse_args(argv)
     
-    # 初回実行
-    results = orchestrator.collect_all_data()
+    orchestrator = DataCollectionOrchestrator()
     
-    # 結果サマリーを表示
-    print("\n=== Collection Summary ===")
-    for collector, result in results["collectors"].items():
-        status = result.get("status", "unknown")
-        print(f"{collector}: {status}")
+    try:
+        # 初回実行（または失敗タスクの再実行）
+        if args.rerun_failed:
+            results = await orchestrator.rerun_failed()
+        else:
+            results = await orchestrator.collect_all_data()
         
-    # スケジューラーを起動する場合
-    # orchestrator.setup_schedule()
-    # orchestrator.run_scheduler()
+        # 結果サマリーを表示
+        if results:
+            print("\n=== Collection Summary ===")
+            for collector, result in results["collectors"].items():
+                status = result.get("status", "unknown")
+                duration = result.get("duration_seconds")
+                print(f"{collector}: {status}" + (f" ({duration:.2f}s, {result.get('output_bytes', 0):,} bytes)" if duration is not None else ""))
+            
+        # スケジューラーを起動する場合
+        if args.schedule:
+            await orchestrator.run_scheduler()
+    finally:
+        await http_client.aclose()
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    asyncio.run(main(sys.argv[1:]))
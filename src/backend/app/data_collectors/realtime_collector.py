@@ -1,7 +1,9 @@
 """
 リアルタイムデータ収集モジュール
 各種リアルタイムAPIからのストリーミングデータ取得
+実行: src/backend で python -m app.data_collectors.realtime_collector
 """
+import os
 import asyncio
 import aiohttp
 import json
@@ -11,11 +13,24 @@ from typing import Dict, List, Optional, Callable
 from pathlib import Path
 import logging
 
+from .stream_log import StreamLog
+
 logger = logging.getLogger(__name__)
 
 
 class RealtimeDataCollector:
-    """リアルタイムデータのストリーミング収集"""
+    """
+    リアルタイムデータのストリーミング収集
+    受信データはソースごとのストリームログ（直近分のリングバッファ＋セグメント化したJSONL）に追記し、
+    FLUSH_INTERVAL秒ごと、または未書き込みがFLUSH_RECORDS件に達した時点でディスクに書く
+    """
+    
+    # ディスクへの書き込み間隔（秒）と件数
+    FLUSH_INTERVAL = 5
+    FLUSH_RECORDS = 100
+    
+    # ソースごとにメモリに保持する直近の件数
+    RING_SIZE = 1000
     
     # リアルタイムデータソース
     REALTIME_SOURCES = {
@@ -88,12 +103,18 @@ class RealtimeDataCollector:
     def __init__(self):
         self.data_dir = Path("uesugi-engine-data/realtime")
         self.data_dir.mkdir(parents=True, exist_ok=True)
-        self.active_streams = {}
+        self.active_streams: Dict[str, StreamLog] = {}
         self.callbacks = {}
         
+    def _stream(self, source: str) -> StreamLog:
+        """ソースのストリームログ（初回に既存のログから続きのoffsetを復元）"""
+        if source not in self.active_streams:
+            self.active_streams[source] = StreamLog(self.data_dir / source, ring_size=self.RING_SIZE)
+        return self.active_streams[source]
+        
     async def start_all_streams(self):
         """全リアルタイムストリームを開始"""
-        tasks = []
+        tasks = [asyncio.create_task(self._flush_periodically())]
         
         for source_name, config in self.REALTIME_SOURCES.items():
             if config["type"] == "http_polling":
@@ -112,7 +133,24 @@ class RealtimeDataCollector:
                 )
                 tasks.append(task)
                 
-        await asyncio.gather(*tasks)
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            self.flush_all()
+            
+    async def _flush_periodically(self):
+        """一定間隔で未書き込みのデータをディスクに書く"""
+        while True:
+            await asyncio.sleep(self.FLUSH_INTERVAL)
+            self.flush_all()
+            
+    def flush_all(self):
+        """全ソースの未書き込みデータを書き込む"""
+        for source in list(self.active_streams):
+            try:
+                self._save_buffer(source)
+            except OSError as e:
+                logger.error(f"Failed to flush {source} stream: {e}")
         
     async def _start_http_polling(self, name: str, config: Dict):
         """HTTPポーリングによるデータ取得"""
@@ -214,39 +252,20 @@ class RealtimeDataCollector:
         await self._buffer_and_save(source, processed_data)
         
     async def _buffer_and_save(self, source: str, data: Dict):
-        """データをバッファリングして保存"""
-        # メモリバッファ（実際はRedis等を使用）
-        if source not in self.active_streams:
-            self.active_streams[source] = []
-            
-        self.active_streams[source].append(data)
+        """データをストリームログに追加（未書き込みがFLUSH_RECORDS件に達したら書き込む）"""
+        stream = self._stream(source)
+        stream.append(data)
         
-        # 100件または5分ごとに保存
-        if len(self.active_streams[source]) >= 100:
-            await self._save_buffer(source)
+        if len(stream.pending) >= self.FLUSH_RECORDS:
+            self._save_buffer(source)
             
-    async def _save_buffer(self, source: str):
-        """バッファをファイルに保存"""
+    def _save_buffer(self, source: str):
+        """未書き込みのデータをセグメントファイルに追記"""
         if source not in self.active_streams:
             return
-            
-        data = self.active_streams[source]
-        if not data:
-            return
-            
-        # ファイル名
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{source}_{timestamp}.json"
-        filepath = self.data_dir / source / filename
-        filepath.parent.mkdir(parents=True, exist_ok=True)
-        
-        # 保存
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
-            
-        # バッファクリア
-        self.active_streams[source] = []
-        logger.info(f"Saved {len(data)} records to {filename}")
+        written = self.active_streams[source].flush()
+        if written:
+            logger.debug(f"Flushed {written} records of {source}")
         
     def register_callback(self, source: str, callback: Callable):
         """データ受信時のコールバックを登録"""
@@ -261,10 +280,15 @@ class RealtimeDataCollector:
         return True
         
     async def get_latest_data(self, source: str, count: int = 10) -> List[Dict]:
-        """最新データを取得"""
-        if source in self.active_streams:
-            return self.active_streams[source][-count:]
-        return []
+        """最新データを取得（書き込み済みのログと未書き込み分の両方から）"""
+        return self._stream(source).latest(count)
+    
+    async def get_data_since(self, source: str, offset: int, limit: int = 1000) -> Dict:
+        """
+        offset以降のデータと次に読むoffset
+        別プロセスからは StreamLog(データディレクトリ / ソース名).since() で書き込み済みの分を読める
+        """
+        return self._stream(source).since(offset, limit)
 
 
 # 個別コレクター
@@ -340,8 +364,6 @@ class EmergencyAlertCollector:
 
 
 if __name__ == "__main__":
-    import os
-    
     # リアルタイムコレクター起動
     collector = RealtimeDataCollector()
     
@@ -0,0 +1,198 @@
+"""
+ストリームログ
+リアルタイムデータをソースごとのセグメント化した追記専用ログ（JSONL）に保存する
+- 各レコードにはソース内で連番のoffsetを付ける
+- セグメントファイル名は先頭レコードのoffset（00000000000000000000.jsonl）で、一定件数ごとに切り替える
+- 書き込みはメモリ上でまとめ、flushで1回の追記としてディスクに書く（時間・件数による定期flushは呼び出し側）
+- 読み込み（latest / since）はセグメントファイルを参照するため、別プロセスからも使える
+  （書き込み中のプロセスからは未flush分も見える）
+"""
+import os
+import json
+import bisect
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+SEGMENT_SUFFIX = ".jsonl"
+
+
+class StreamLog:
+    """ソース1つ分のストリームログ（直近のレコードはリングバッファにも保持）"""
+
+    def __init__(
+        self,
+        directory: Path,
+        ring_size: int = 1000,
+        segment_records: int = 10000,
+        max_segments: int = 100,
+        max_pending: int = 100000
+    ):
+        self.directory = Path(directory)
+        self.ring = deque(maxlen=ring_size)
+        self.segment_records = segment_records
+        self.max_segments = max_segments
+        self.max_pending = max_pending
+        self.pending: List[Dict] = []
+        self.next_offset: Optional[int] = None
+        self._segment: Optional[Path] = None
+        self._segment_count = 0
+
+    def _segments(self) -> List[Path]:
+        if not self.directory.exists():
+            return []
+        return sorted(
+            path for path in self.directory.glob(f"*{SEGMENT_SUFFIX}")
+            if path.stem.isdigit()
+        )
+
+    def _recover(self):
+        """
+        最後のセグメントから次のoffsetを復元（書き込み途中で止まった末尾の行は切り捨て）
+        リングバッファは最後のセグメントで足りない分を前のセグメントから補う
+        （latestはリングバッファが満杯でなければディスク上の全件を保持しているとみなすため）
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        segments = self._segments()
+        self.next_offset = 0
+        if not segments:
+            return
+
+        self._segment = segments[-1]
+        with open(self._segment, 'rb') as f:
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            logger.warning(f"Truncating incomplete record in {self._segment}")
+            with open(self._segment, 'r+b') as f:
+                f.truncate(end)
+        lines = data[:end].splitlines()
+        self._segment_count = len(lines)
+        self.next_offset = int(self._segment.stem) + len(lines)
+
+        records: List[Dict] = []
+        for line in lines[-self.ring.maxlen:]:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                continue
+        for path in reversed(segments[:-1]):
+            if len(records) >= self.ring.maxlen:
+                break
+            records = self._read_segment(path) + records
+        self.ring.extend(records[-self.ring.maxlen:])
+
+    def append(self, record: Dict) -> int:
+        """レコードを追加してoffsetを返す（ディスクへの書き込みはflush時）"""
+        if self.next_offset is None:
+            self._recover()
+        entry = {"offset": self.next_offset, **record}
+        self.next_offset += 1
+        self.ring.append(entry)
+        self.pending.append(entry)
+        if len(self.pending) > self.max_pending:
+            # 書き込みが失敗し続けている場合に古いものから捨てる
+            dropped = len(self.pending) - self.max_pending
+            del self.pending[:dropped]
+            logger.warning(f"Dropped {dropped} unflushed records in {self.directory}")
+        return entry["offset"]
+
+    def flush(self) -> int:
+        """未書き込みのレコードをセグメントに追記してfsyncする。書き込んだ件数を返す"""
+        written = 0
+        while self.pending:
+            if self._segment is None or self._segment_count >= self.segment_records:
+                self._segment = self.directory / f"{self.pending[0]['offset']:020d}{SEGMENT_SUFFIX}"
+                self._segment_count = 0
+                self._apply_retention()
+            batch = self.pending[:self.segment_records - self._segment_count]
+            lines = "".join(
+                json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n" for entry in batch
+            )
+            with open(self._segment, 'a', encoding='utf-8') as f:
+                f.write(lines)
+                f.flush()
+                os.fsync(f.fileno())
+            del self.pending[:len(batch)]
+            self._segment_count += len(batch)
+            written += len(batch)
+        return written
+
+    def _apply_retention(self):
+        """セグメント数の上限を超えた古いセグメントを削除"""
+        segments = self._segments()
+        for path in segments[:max(0, len(segments) + 1 - self.max_segments)]:
+            path.unlink(missing_ok=True)
+
+    def _read_segment(self, path: Path) -> List[Dict]:
+        """セグメントを読む（書き込み中の未完成の行や削除済みのファイルは無視）"""
+        records = []
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    if not line.endswith("\n"):
+                        break
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue
+        except FileNotFoundError:
+            pass
+        return records
+
+    def latest(self, count: int = 10) -> List[Dict]:
+        """
+        最新count件（古い順）
+        このプロセスで書き込み中のログはリングバッファ（未flush分を含む）から返す
+        """
+        if self.next_offset is not None and (count <= len(self.ring) or len(self.ring) < self.ring.maxlen):
+            return list(self.ring)[-count:] if count > 0 else []
+
+        records: List[Dict] = list(self.pending)
+        for path in reversed(self._segments()):
+            if len(records) >= count:
+                break
+            records = self._read_segment(path) + records
+        return records[-count:] if count > 0 else []
+
+    def since(self, offset: int, limit: int = 1000) -> Dict:
+        """
+        offset以降のレコード（最大limit件）と、次に読むoffset
+        別プロセスからはflush済みのレコードのみ見える
+        保持期間を過ぎて削除されたoffsetを指定した場合は残っている最古のレコードから返す
+        """
+        segments = self._segments()
+        bases = [int(path.stem) for path in segments]
+        start = max(0, bisect.bisect_right(bases, offset) - 1)
+
+        records: List[Dict] = []
+        for path in segments[start:]:
+            for record in self._read_segment(path):
+                if record["offset"] >= offset:
+                    records.append(record)
+                    if len(records) >= limit:
+                        break
+            if len(records) >= limit:
+                break
+
+        # このプロセスで書き込み中のログは未flush分も返す
+        last = records[-1]["offset"] if records else offset - 1
+        for record in self.pending:
+            if len(records) >= limit:
+                break
+            if record["offset"] > last and record["offset"] >= offset:
+                records.append(record)
+
+        next_offset = records[-1]["offset"] + 1 if records else offset
+        return {"records": records, "next_offset": next_offset}
+
+    def get_stats(self) -> Dict:
+        return {
+            "next_offset": self.next_offset,
+            "pending": len(self.pending),
+            "ring": len(self.ring),
+            "segments": len(self._segments())
+        }
@@ -3,12 +3,14 @@
 Open-Meteo APIから気象データを取得
 """
 import json
-import requests
+import asyncio
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 import logging
 from pathlib import Path
 
+from app.core.http_client import http_client
+
 logger = logging.getLogger(__name__)
 
 
@@ -33,7 +35,7 @@ class WeatherCollector:
     def __init__(self):
         self.data_dir = Path("uesugi-engine-data")
         
-    def fetch_current_weather(self, city: str) -> Dict:
+    async def fetch_current_weather(self, city: str) -> Dict:
         """
         現在の天気データを取得
         """
@@ -53,7 +55,7 @@ class WeatherCollector:
         }
         
         try:
-            response = requests.get(self.BASE_URL, params=params)
+            response = await http_client.get(self.BASE_URL, params=params)
             response.raise_for_status()
             data = response.json()
             
@@ -63,7 +65,7 @@ class WeatherCollector:
             logger.error(f"Failed to fetch weather for {city}: {e}")
             return {}
     
-    def fetch_historical_weather(self, city: str, start_date: str, end_date: str) -> Dict:
+    async def fetch_historical_weather(self, city: str, start_date: str, end_date: str) -> Dict:
         """
         過去の気象データを取得
         """
@@ -81,7 +83,7 @@ class WeatherCollector:
         }
         
         try:
-            response = requests.get(self.ARCHIVE_URL, params=params)
+            response = await http_client.get(self.ARCHIVE_URL, params=params)
             response.raise_for_status()
             data = response.json()
             
@@ -136,16 +138,17 @@ class WeatherCollector:
         
         return formatted_data
     
-    def collect_all_weather(self) -> Dict:
+    async def collect_all_weather(self) -> Dict:
         """
-        全都市の気象データを収集
+        全都市の気象データを収集（都市ごとのリクエストは同時に発行）
         """
         results = {}
         
-        for city in self.LOCATIONS.keys():
-            logger.info(f"Fetching weather for {city}...")
-            data = self.fetch_current_weather(city)
-            
+        cities = list(self.LOCATIONS.keys())
+        logger.info(f"Fetching weather for {len(cities)} cities...")
+        responses = await asyncio.gather(*(self.fetch_current_weather(city) for city in cities))
+        
+        for city, data in zip(cities, responses):
             if data:
                 results[city] = data
                 
@@ -176,12 +179,12 @@ class EarthquakeCollector:
     def __init__(self):
         self.data_dir = Path("uesugi-engine-data")
         
-    def fetch_recent_earthquakes(self) -> List[Dict]:
+    async def fetch_recent_earthquakes(self) -> List[Dict]:
         """
         最近の地震データを取得
         """
         try:
-            response = requests.get(self.BASE_URL)
+            response = await http_client.get(self.BASE_URL)
             response.raise_for_status()
             data = response.json()
             
@@ -231,8 +234,8 @@ class EarthquakeCollector:
 if __name__ == "__main__":
     # 気象データ収集テスト
     weather = WeatherCollector()
-    results = weather.collect_all_weather()
+    results = asyncio.run(weather.collect_all_weather())
     
     # 地震データ収集テスト
     # earthquake = EarthquakeCollector()
-    # quakes = earthquake.fetch_recent_earthquakes()
\ No newline at end of file
+    # quakes = asyncio.run(earthquake.fetch_recent_earthquakes())
\ No newline at end of file
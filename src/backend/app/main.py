@@ -13,9 +13,13 @@ from loguru import logger
 
 from app.core.config import settings
 from app.core.database import create_tables
+from app.core.http_client import http_client
 from app.api.endpoints import heatmap, weather, statistics, health, mobility, landmark, event, data_management
 from app.api.v1 import opendata, real_data
+from app.services.density_cube import ensure_density_cube
 from app.services.dummy_data_generator import generate_initial_data
+from app.services.mobility_precompute import mobility_payload_store
+from app.services.transit_router import transit_router
 
 # アプリケーションの初期化
 app = FastAPI(
@@ -71,17 +75,38 @@ async def startup_event():
     await create_tables()
     logger.info("✅ Database tables created")
     
+    # 密度キューブ導入前のポイントを集計（キューブが空の場合のみ）
+    try:
+        rows = await ensure_density_cube()
+        if rows:
+            logger.info(f"✅ Density cube backfilled ({rows} rows)")
+    except Exception as e:
+        logger.error(f"Density cube backfill failed: {e}")
+    
     # Phase 1: ダミーデータ生成
     if settings.USE_DUMMY_DATA:
         await generate_initial_data()
         logger.info("✅ Dummy data generated")
     
+    # 人流データの事前計算（バックグラウンド）
+    if settings.MOBILITY_PRECOMPUTE_ENABLED:
+        mobility_payload_store.start()
+        logger.info("✅ Mobility precompute started")
+    
+    # 到達圏計算用に今日の時刻表を読み込む（バックグラウンド）
+    if settings.TRANSIT_ROUTER_PRELOAD:
+        transit_router.start()
+        logger.info("✅ Transit timetable preload started")
+    
     logger.info("🎉 Uesugi Engine API started successfully!")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """アプリケーション終了時の処理"""
     logger.info("👋 Uesugi Engine API shutting down...")
+    await mobility_payload_store.stop()
+    await transit_router.stop()
+    await http_client.aclose()
 
 # エラーハンドラー
 @app.exception_handler(404)
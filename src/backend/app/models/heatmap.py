@@ -3,7 +3,7 @@
 地理空間データとSNS・気象データの統合モデル
 """
 
-from sqlalchemy import Column, Integer, String, Float, DateTime, JSON, Boolean, Text
+from sqlalchemy import Column, Integer, BigInteger, String, Float, DateTime, JSON, Boolean, Text, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 from geoalchemy2 import Geometry
@@ -53,10 +53,40 @@ class HeatmapPoint(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
+    # キーセットページング用（ORDER BY timestamp DESC, id DESC）
+    __table_args__ = (
+        Index('idx_heatmap_points_timestamp_id', timestamp.desc(), id.desc()),
+    )
+    
     def __repr__(self):
         return f"<HeatmapPoint(id={self.id}, category={self.category}, source={self.data_source})>"
 
 
+class HeatmapDensityCube(Base):
+    """ヒートマップ密度の事前集計（グリッドレベル×セル×時間×カテゴリ×データソース）"""
+    __tablename__ = "heatmap_density_cube"
+    
+    # 集計キー
+    grid_level = Column(Integer, primary_key=True)  # app.services.density_cube.DENSITY_GRID_LEVELS のインデックス
+    cell_x = Column(Integer, primary_key=True)  # FLOOR(経度 / グリッドサイズ)
+    cell_y = Column(Integer, primary_key=True)  # FLOOR(緯度 / グリッドサイズ)
+    hour_bucket = Column(DateTime(timezone=True), primary_key=True)
+    category = Column(String(50), primary_key=True)
+    data_source = Column(String(50), primary_key=True)
+    
+    # 集計値（平均は合計/件数で算出）
+    point_count = Column(BigInteger, nullable=False, default=0)
+    intensity_sum = Column(Float, nullable=False, default=0.0)
+    sentiment_sum = Column(Float, nullable=False, default=0.0)
+    sentiment_count = Column(BigInteger, nullable=False, default=0)  # sentiment_scoreがNULLでない件数
+    
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __table_args__ = (
+        Index('idx_density_cube_level_hour', 'grid_level', 'hour_bucket'),
+    )
+
+
 class WeatherData(Base):
     """気象データ"""
     __tablename__ = "weather_data"
@@ -0,0 +1,59 @@
+"""
+公共交通供給量モデル
+GTFSから運行日ごとに事前計算した停留所・路線別の運行本数・運行間隔・運行時間帯
+"""
+
+from sqlalchemy import Column, Integer, Float, String, Date, DateTime, Index
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.sql import func
+
+from app.core.database import Base
+
+
+class TransitSupplyDate(Base):
+    """事前計算済みの運行日（運行のない日も記録し、再計算を避ける）"""
+    __tablename__ = "transit_supply_dates"
+
+    service_date = Column(Date, primary_key=True)
+    stop_count = Column(Integer, nullable=False, default=0)
+    route_count = Column(Integer, nullable=False, default=0)
+    computed_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class TransitStopSupply(Base):
+    """停留所別の供給量（運行日×停留所）"""
+    __tablename__ = "transit_stop_supply"
+
+    service_date = Column(Date, primary_key=True)
+    stop_id = Column(String(255), primary_key=True)
+    stop_lon = Column(Float)
+    stop_lat = Column(Float)
+
+    departures = Column(Integer, nullable=False)
+    route_count = Column(Integer, nullable=False)
+    first_departure_sec = Column(Integer)  # 0時からの秒数（24時以降は86400以上）
+    last_departure_sec = Column(Integer)
+    avg_headway_sec = Column(Float)  # 始発〜終発の平均運行間隔（1本のみはNULL）
+    hourly_departures = Column(ARRAY(Integer), nullable=False)  # 添字が時（0〜29時）
+
+    __table_args__ = (
+        Index('idx_transit_stop_supply_location', 'service_date', 'stop_lon', 'stop_lat'),
+    )
+
+
+class TransitRouteSupply(Base):
+    """路線別の供給量（運行日×路線、便数は始発停留所の発車時刻で集計）"""
+    __tablename__ = "transit_route_supply"
+
+    service_date = Column(Date, primary_key=True)
+    route_id = Column(String(255), primary_key=True)
+    agency_id = Column(String(255))
+    route_short_name = Column(String(50))
+    route_long_name = Column(String(255))
+
+    trips = Column(Integer, nullable=False)
+    stop_count = Column(Integer, nullable=False)
+    first_departure_sec = Column(Integer)
+    last_departure_sec = Column(Integer)
+    avg_headway_sec = Column(Float)
+    hourly_trips = Column(ARRAY(Integer), nullable=False)
@@ -0,0 +1,249 @@
+"""
+ヒートマップ密度キューブサービス
+heatmap_pointsを（グリッドレベル, セル, 時間, カテゴリ, データソース）単位で事前集計し、
+/heatmap/density を生データの再スキャンなしで応答できるようにする
+"""
+
+import math
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+
+# グリッドレベル（度）。レベル0が最も細かく、上位レベルはレベル0の整数倍
+DENSITY_GRID_LEVELS = [0.001, 0.005, 0.01, 0.05, 0.1]
+
+# レベル0のセルを何個まとめると各レベルのセルになるか
+DENSITY_GRID_RATIOS = [round(size / DENSITY_GRID_LEVELS[0]) for size in DENSITY_GRID_LEVELS]
+
+UPSERT_QUERY = text("""
+INSERT INTO heatmap_density_cube (
+    grid_level, cell_x, cell_y, hour_bucket, category, data_source,
+    point_count, intensity_sum, sentiment_sum, sentiment_count
+) VALUES (
+    :grid_level, :cell_x, :cell_y, :hour_bucket, :category, :data_source,
+    :point_count, :intensity_sum, :sentiment_sum, :sentiment_count
+)
+ON CONFLICT (grid_level, cell_x, cell_y, hour_bucket, category, data_source) DO UPDATE SET
+    point_count = heatmap_density_cube.point_count + EXCLUDED.point_count,
+    intensity_sum = heatmap_density_cube.intensity_sum + EXCLUDED.intensity_sum,
+    sentiment_sum = heatmap_density_cube.sentiment_sum + EXCLUDED.sentiment_sum,
+    sentiment_count = heatmap_density_cube.sentiment_count + EXCLUDED.sentiment_count,
+    updated_at = now()
+""")
+
+
+def find_grid_level(grid_size: float) -> Optional[int]:
+    """グリッドサイズに対応するキューブのレベルを返す（該当なしはNone）"""
+    for level, size in enumerate(DENSITY_GRID_LEVELS):
+        if math.isclose(grid_size, size, rel_tol=1e-9, abs_tol=1e-12):
+            return level
+    return None
+
+
+def point_cells(longitude: float, latitude: float) -> List[Tuple[int, int, int]]:
+    """座標が属する全レベルのセル (grid_level, cell_x, cell_y) を返す"""
+    base_x = math.floor(longitude / DENSITY_GRID_LEVELS[0])
+    base_y = math.floor(latitude / DENSITY_GRID_LEVELS[0])
+    return [
+        (level, base_x // ratio, base_y // ratio)
+        for level, ratio in enumerate(DENSITY_GRID_RATIOS)
+    ]
+
+
+async def update_density_cube(session: AsyncSession, points: List[Dict]) -> int:
+    """
+    新規ポイントをキューブに加算（インジェスト時の増分更新）
+    pointsはheatmap_pointsへのINSERTパラメータと同じ形式
+    （timestamp, longitude, latitude, category, data_source, intensity, sentiment_score）
+    コミットは呼び出し側で行う
+    """
+    aggregates: Dict[tuple, List[float]] = {}
+
+    for point in points:
+        hour_bucket = point["timestamp"].replace(minute=0, second=0, microsecond=0)
+        intensity = point.get("intensity")
+        sentiment = point.get("sentiment_score")
+
+        for level, cell_x, cell_y in point_cells(point["longitude"], point["latitude"]):
+            key = (level, cell_x, cell_y, hour_bucket, point["category"], point["data_source"])
+            agg = aggregates.setdefault(key, [0, 0.0, 0.0, 0])
+            agg[0] += 1
+            agg[1] += intensity if intensity is not None else 1.0
+            if sentiment is not None:
+                agg[2] += sentiment
+                agg[3] += 1
+
+    if not aggregates:
+        return 0
+
+    rows = [
+        {
+            "grid_level": key[0],
+            "cell_x": key[1],
+            "cell_y": key[2],
+            "hour_bucket": key[3],
+            "category": key[4],
+            "data_source": key[5],
+            "point_count": agg[0],
+            "intensity_sum": agg[1],
+            "sentiment_sum": agg[2],
+            "sentiment_count": agg[3]
+        }
+        for key, agg in aggregates.items()
+    ]
+    await session.execute(UPSERT_QUERY, rows)
+    return len(rows)
+
+
+async def rebuild_density_cube() -> int:
+    """
+    キューブを生データから再構築
+    レベル0をheatmap_pointsから集計し、上位レベルはレベル0からロールアップする
+    """
+    base_size = DENSITY_GRID_LEVELS[0]
+
+    base_query = text(f"""
+    INSERT INTO heatmap_density_cube (
+        grid_level, cell_x, cell_y, hour_bucket, category, data_source,
+        point_count, intensity_sum, sentiment_sum, sentiment_count
+    )
+    SELECT
+        0,
+        FLOOR(ST_X(location) / {base_size})::int AS cell_x,
+        FLOOR(ST_Y(location) / {base_size})::int AS cell_y,
+        date_trunc('hour', timestamp) AS hour_bucket,
+        category,
+        data_source,
+        COUNT(*),
+        COALESCE(SUM(COALESCE(intensity, 1.0)), 0),
+        COALESCE(SUM(sentiment_score), 0),
+        COUNT(sentiment_score)
+    FROM heatmap_points
+    GROUP BY cell_x, cell_y, hour_bucket, category, data_source
+    """)
+
+    async with AsyncSessionLocal() as session:
+        await session.execute(text("DELETE FROM heatmap_density_cube"))
+        await session.execute(base_query)
+
+        for level, ratio in enumerate(DENSITY_GRID_RATIOS):
+            if level == 0:
+                continue
+            rollup_query = text(f"""
+            INSERT INTO heatmap_density_cube (
+                grid_level, cell_x, cell_y, hour_bucket, category, data_source,
+                point_count, intensity_sum, sentiment_sum, sentiment_count
+            )
+            SELECT
+                {level},
+                FLOOR(cell_x::float8 / {ratio})::int AS coarse_x,
+                FLOOR(cell_y::float8 / {ratio})::int AS coarse_y,
+                hour_bucket,
+                category,
+                data_source,
+                SUM(point_count),
+                SUM(intensity_sum),
+                SUM(sentiment_sum),
+                SUM(sentiment_count)
+            FROM heatmap_density_cube
+            WHERE grid_level = 0
+            GROUP BY coarse_x, coarse_y, hour_bucket, category, data_source
+            """)
+            await session.execute(rollup_query)
+
+        result = await session.execute(text("SELECT COUNT(*) FROM heatmap_density_cube"))
+        row_count = result.scalar() or 0
+        await session.commit()
+
+    logger.info(f"Density cube rebuilt: {row_count} rows")
+    return row_count
+
+
+async def ensure_density_cube() -> int:
+    """
+    キューブが空でheatmap_pointsにデータがある場合に再構築（起動時）
+    キューブ導入前から蓄積されていたポイントを集計に含めるため
+    """
+    async with AsyncSessionLocal() as session:
+        cube = await session.execute(text("SELECT EXISTS (SELECT 1 FROM heatmap_density_cube)"))
+        if cube.scalar():
+            return 0
+        points = await session.execute(text("SELECT EXISTS (SELECT 1 FROM heatmap_points)"))
+        if not points.scalar():
+            return 0
+
+    logger.info("Density cube is empty, backfilling from heatmap_points")
+    return await rebuild_density_cube()
+
+
+async def query_density_cube(
+    session: AsyncSession,
+    grid_level: int,
+    north: float,
+    south: float,
+    east: float,
+    west: float,
+    start_time: datetime,
+    end_time: datetime,
+    category_list: Optional[List[str]] = None
+) -> List[Dict]:
+    """
+    キューブからセル単位の密度を取得
+    範囲はセル単位、時間は1時間単位で丸めて集計する
+    """
+    grid_size = DENSITY_GRID_LEVELS[grid_level]
+
+    query = """
+    SELECT
+        cell_x,
+        cell_y,
+        SUM(point_count) AS point_count,
+        SUM(intensity_sum) AS intensity_sum,
+        SUM(sentiment_sum) AS sentiment_sum,
+        SUM(sentiment_count) AS sentiment_count
+    FROM heatmap_density_cube
+    WHERE
+        grid_level = :grid_level
+        AND cell_x BETWEEN :min_x AND :max_x
+        AND cell_y BETWEEN :min_y AND :max_y
+        AND hour_bucket BETWEEN :start_hour AND :end_time
+    """
+
+    params = {
+        "grid_level": grid_level,
+        "min_x": math.floor(west / grid_size),
+        "max_x": math.floor(east / grid_size),
+        "min_y": math.floor(south / grid_size),
+        "max_y": math.floor(north / grid_size),
+        "start_hour": start_time.replace(minute=0, second=0, microsecond=0),
+        "end_time": end_time
+    }
+
+    if category_list:
+        placeholders = ",".join([f":cat_{i}" for i in range(len(category_list))])
+        query += f" AND category IN ({placeholders})"
+        for i, cat in enumerate(category_list):
+            params[f"cat_{i}"] = cat
+
+    query += " GROUP BY cell_x, cell_y HAVING SUM(point_count) > 0"
+
+    result = await session.execute(text(query), params)
+    rows = result.mappings().all()
+
+    return [
+        {
+            "grid_lon": row["cell_x"] * grid_size,
+            "grid_lat": row["cell_y"] * grid_size,
+            "point_count": int(row["point_count"]),
+            "avg_intensity": row["intensity_sum"] / row["point_count"],
+            "avg_sentiment": (
+                row["sentiment_sum"] / row["sentiment_count"]
+                if row["sentiment_count"] else None
+            )
+        }
+        for row in rows
+    ]
@@ -11,6 +11,8 @@ from typing import List, Dict
 from loguru import logger
 from app.core.config import settings
 from app.core.database import AsyncSessionLocal
+from app.services.density_cube import update_density_cube
+from app.core.cache import invalidate_cache
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
 
@@ -292,7 +294,12 @@ class DummyDataGenerator:
                 # execute_manyはSQLAlchemy 2.0では使用できないため、個別に実行
                 for point in points:
                     await session.execute(query, point)
+                # 密度キューブを同一トランザクションで増分更新
+                await update_density_cube(session, points)
                 await session.commit()
+            
+            # 集計系APIのキャッシュを無効化
+            await invalidate_cache("heatmap", "statistics")
             return len(points)
             
         except Exception as e:
@@ -0,0 +1,272 @@
+"""
+GTFS停留所カタログ
+停留所を一度だけ読み込み（stops.txt、なければgtfs_stopsテーブル）、列ごとの配列とSTRtreeで保持して
+表示範囲・ズーム・事業者で絞り込んだ停留所だけを返す
+"""
+
+import asyncio
+import csv
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+import numpy as np
+import shapely
+from loguru import logger
+from shapely import STRtree
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal
+
+GTFS_EXTRACTED_DIR = Path("/app/uesugi-engine-data") / "hiroshima" / "transport" / "bus" / "gtfs_extracted"
+
+# このズーム以上では間引かずに全停留所を返す
+FULL_DETAIL_ZOOM = 15
+
+# 間引き時、256pxタイル1辺あたりに残す停留所の数（約16pxに1停留所）
+THINNING_CELLS_PER_TILE = 16
+
+# (stop_id, stop_code, stop_name, lon, lat)
+StopRecord = Tuple[str, str, str, float, float]
+
+
+def _read_stop_agencies(gtfs_dir: Path, agency_ids: List[str]) -> Dict[str, Set[str]]:
+    """routes → trips → stop_times をたどって事業者ごとの停留所IDを求める"""
+    routes_file = gtfs_dir / "routes.txt"
+    trips_file = gtfs_dir / "trips.txt"
+    stop_times_file = gtfs_dir / "stop_times.txt"
+    if not (routes_file.exists() and trips_file.exists() and stop_times_file.exists()):
+        return {}
+
+    # agency_idが省略できるのは事業者が1つのフィードのみ
+    default_agency = agency_ids[0] if len(agency_ids) == 1 else ""
+    with open(routes_file, "r", encoding="utf-8-sig", newline="") as f:
+        route_agency = {
+            row["route_id"]: row.get("agency_id") or default_agency
+            for row in csv.DictReader(f)
+        }
+    with open(trips_file, "r", encoding="utf-8-sig", newline="") as f:
+        trip_agency = {
+            row["trip_id"]: route_agency.get(row["route_id"], default_agency)
+            for row in csv.DictReader(f)
+        }
+
+    stop_agencies: Dict[str, Set[str]] = {}
+    with open(stop_times_file, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            agency_id = trip_agency.get(row["trip_id"])
+            if agency_id:
+                stop_agencies.setdefault(agency_id, set()).add(row["stop_id"])
+    return stop_agencies
+
+
+def read_stop_files(gtfs_dir: Path) -> Tuple[List[StopRecord], Dict[str, Set[str]]]:
+    """GTFSファイルから停留所と事業者ごとの停留所IDを読み込み（引用符付きの値にも対応）"""
+    stops = []
+    with open(gtfs_dir / "stops.txt", "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                lat = float(row["stop_lat"])
+                lon = float(row["stop_lon"])
+            except (KeyError, TypeError, ValueError):
+                # 無効な座標データはスキップ
+                continue
+            stops.append((row["stop_id"], row.get("stop_code") or "", row.get("stop_name") or "停留所", lon, lat))
+
+    agency_ids = []
+    agency_file = gtfs_dir / "agency.txt"
+    if agency_file.exists():
+        with open(agency_file, "r", encoding="utf-8-sig", newline="") as f:
+            agency_ids = [row.get("agency_id") or "" for row in csv.DictReader(f)]
+
+    stop_agencies = _read_stop_agencies(gtfs_dir, agency_ids)
+    if not stop_agencies and len(agency_ids) == 1 and agency_ids[0]:
+        # 時刻表がなく事業者が1つなら全停留所をその事業者に割り当てる
+        stop_agencies = {agency_ids[0]: {stop[0] for stop in stops}}
+    return stops, stop_agencies
+
+
+async def read_stop_table() -> Tuple[List[StopRecord], Dict[str, Set[str]]]:
+    """gtfs_stopsテーブルから停留所と事業者ごとの停留所IDを読み込み"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(text("""
+            SELECT stop_id, stop_code, stop_name, stop_lon, stop_lat
+            FROM gtfs_stops
+            WHERE stop_lat IS NOT NULL AND stop_lon IS NOT NULL
+        """))
+        stops = [
+            (row.stop_id, row.stop_code or "", row.stop_name or "停留所", float(row.stop_lon), float(row.stop_lat))
+            for row in result
+        ]
+        result = await session.execute(text("""
+            SELECT DISTINCT r.agency_id, st.stop_id
+            FROM gtfs_stop_times st
+            JOIN gtfs_trips t ON st.trip_id = t.trip_id
+            JOIN gtfs_routes r ON t.route_id = r.route_id
+            WHERE r.agency_id IS NOT NULL
+        """))
+        stop_agencies: Dict[str, Set[str]] = {}
+        for row in result:
+            stop_agencies.setdefault(row.agency_id, set()).add(row.stop_id)
+    return stops, stop_agencies
+
+
+# 事業者IDの別名（GTFS-JPのagency_idは法人番号のため、よく使う事業者は名前でも指定できるようにする）
+AGENCY_ALIASES = {
+    "hiroden": "9240001009470",  # 広島電鉄
+}
+
+
+class GTFSStopCatalog:
+    """
+    停留所カタログ
+    - 停留所ID・名称・コードと経度・緯度を列ごとの配列で保持
+    - 範囲検索はSTRtree、事業者の絞り込みは事業者ごとの停留所インデックス配列で行う
+    - 初回アクセス時に一度だけ読み込み、GTFS統合後にclear()で破棄する
+    """
+
+    def __init__(self, gtfs_dir: Path):
+        self.gtfs_dir = gtfs_dir
+        self._lock = asyncio.Lock()
+        self._clear()
+
+    def _clear(self):
+        self.stop_ids = np.empty(0, dtype=object)
+        self.stop_codes = np.empty(0, dtype=object)
+        self.stop_names = np.empty(0, dtype=object)
+        self.lon = np.empty(0, dtype=np.float64)
+        self.lat = np.empty(0, dtype=np.float64)
+        self._agency_stops: Dict[str, np.ndarray] = {}
+        self._tree: Optional[STRtree] = None
+        self.source: Optional[str] = None
+        self.loaded_at: Optional[datetime] = None
+
+    def clear(self):
+        """読み込み済みの停留所を破棄（次回アクセス時に再読み込み）"""
+        self._clear()
+
+    @property
+    def loaded(self) -> bool:
+        return self.source is not None
+
+    def _build(self, stops: List[StopRecord], stop_agencies: Dict[str, Set[str]], source: str):
+        if stops:
+            stop_ids, stop_codes, stop_names, lon, lat = zip(*stops)
+        else:
+            stop_ids = stop_codes = stop_names = lon = lat = ()
+        self.stop_ids = np.array(stop_ids, dtype=object)
+        self.stop_codes = np.array(stop_codes, dtype=object)
+        self.stop_names = np.array(stop_names, dtype=object)
+        self.lon = np.array(lon, dtype=np.float64)
+        self.lat = np.array(lat, dtype=np.float64)
+
+        position = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+        self._agency_stops = {
+            agency_id: np.array(sorted(position[s] for s in ids if s in position), dtype=np.int64)
+            for agency_id, ids in stop_agencies.items()
+        }
+        self._tree = STRtree(shapely.points(self.lon, self.lat))
+        self.source = source
+        self.loaded_at = datetime.now()
+        logger.info(f"GTFS stop catalog loaded from {source}: {len(stops)} stops, {len(self._agency_stops)} agencies")
+
+    async def ensure_loaded(self):
+        """未読み込みならファイル（なければDB）から読み込む。同時要求は1回に集約"""
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            if (self.gtfs_dir / "stops.txt").exists():
+                loop = asyncio.get_running_loop()
+                stops, stop_agencies = await loop.run_in_executor(None, read_stop_files, self.gtfs_dir)
+                self._build(stops, stop_agencies, "file")
+            else:
+                stops, stop_agencies = await read_stop_table()
+                self._build(stops, stop_agencies, "database")
+
+    def _thin(self, indices: np.ndarray, zoom: int) -> np.ndarray:
+        """ズームに応じたセルごとに1停留所だけ残す"""
+        cell_size = 360.0 / (2 ** zoom) / THINNING_CELLS_PER_TILE
+        cells = np.stack([
+            np.floor(self.lon[indices] / cell_size),
+            np.floor(self.lat[indices] / cell_size)
+        ], axis=1)
+        _, first = np.unique(cells, axis=0, return_index=True)
+        return indices[np.sort(first)]
+
+    def query(
+        self,
+        north: Optional[float] = None,
+        south: Optional[float] = None,
+        east: Optional[float] = None,
+        west: Optional[float] = None,
+        zoom: Optional[int] = None,
+        agency: Optional[str] = None,
+        limit: int = 2000
+    ) -> Dict:
+        """表示範囲内の停留所をGeoJSONで返す（範囲の指定がない辺は制限なし）"""
+        if not self.loaded or len(self.stop_ids) == 0:
+            indices = np.empty(0, dtype=np.int64)
+        elif any(value is not None for value in (north, south, east, west)):
+            bbox = shapely.box(
+                -180.0 if west is None else west,
+                -90.0 if south is None else south,
+                180.0 if east is None else east,
+                90.0 if north is None else north
+            )
+            indices = np.sort(self._tree.query(bbox))
+        else:
+            indices = np.arange(len(self.stop_ids))
+
+        if agency and self._agency_stops:
+            agency = AGENCY_ALIASES.get(agency, agency)
+            indices = indices[np.isin(indices, self._agency_stops.get(agency, np.empty(0, dtype=np.int64)))]
+        else:
+            # 時刻表がなく事業者ごとの停留所が分からない場合は絞り込まない
+            agency = None
+
+        matched = len(indices)
+        if zoom is not None and zoom < FULL_DETAIL_ZOOM and matched:
+            indices = self._thin(indices, zoom)
+        indices = indices[:limit]
+
+        features = [
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [float(self.lon[i]), float(self.lat[i])]
+                },
+                "properties": {
+                    "stop_id": self.stop_ids[i],
+                    "stop_name": self.stop_names[i],
+                    "stop_code": self.stop_codes[i],
+                    "type": "tram_stop",
+                    "color": "#FF6B6B"
+                }
+            }
+            for i in indices.tolist()
+        ]
+
+        return {
+            "type": "FeatureCollection",
+            "features": features,
+            "metadata": {
+                "source": self.source,
+                "agency": agency,
+                "matched": matched,
+                "returned": len(features)
+            }
+        }
+
+    def get_stats(self) -> Dict:
+        return {
+            "source": self.source,
+            "stops": len(self.stop_ids),
+            "agencies": sorted(self._agency_stops),
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None
+        }
+
+
+# グローバルインスタンス
+gtfs_stop_catalog = GTFSStopCatalog(GTFS_EXTRACTED_DIR)
@@ -0,0 +1,596 @@
+"""
+人流データ事前計算サービス
+/real/mobility/real/{prefecture} のフロー・パーティクルを（都道府県, city_only, 時間帯）単位で
+事前に計算し、シリアライズ済みのバイト列（GeoJSON / 列指向バイナリ）として保持・配信する
+推定の入力が変わるのは時間帯補正（1時間単位）のみのため、1時間ごとにバックグラウンドで再計算する
+"""
+
+import asyncio
+import json
+import struct
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from loguru import logger
+
+from app.core.cache import make_cache_key, response_cache
+from app.services.mobility_estimator import (
+    FLOW_TYPE_CODES,
+    FLOW_TYPE_COLORS,
+    FLOW_TYPE_NAMES,
+    MobilityEstimator,
+)
+from app.services.route_geometry import ROUTE_PAYLOAD_ZOOM, route_geometry
+
+# 広島県の主要地点（県全域をカバー）
+HIROSHIMA_POINTS = [
+    # 広島市中心部（人口: 約120万人）
+    {"name": "広島駅", "lat": 34.3974, "lon": 132.4753, "population": 140000},
+    {"name": "紙屋町", "lat": 34.3954, "lon": 132.4572, "population": 85000},
+    {"name": "八丁堀", "lat": 34.3936, "lon": 132.4636, "population": 75000},
+    {"name": "平和記念公園", "lat": 34.3954, "lon": 132.4534, "population": 30000},
+    {"name": "本通り", "lat": 34.3934, "lon": 132.4615, "population": 50000},
+    {"name": "広島城", "lat": 34.4027, "lon": 132.4590, "population": 5000},
+    {"name": "マツダスタジアム", "lat": 34.3933, "lon": 132.4845, "population": 32000},
+    {"name": "宇品港", "lat": 34.3488, "lon": 132.4533, "population": 15000},
+    {"name": "横川駅", "lat": 34.4107, "lon": 132.4525, "population": 35000},
+    {"name": "西広島駅", "lat": 34.3747, "lon": 132.4385, "population": 25000},
+    {"name": "広島大学", "lat": 34.4047, "lon": 132.7139, "population": 15000},
+    {"name": "広島空港", "lat": 34.4361, "lon": 132.9194, "population": 20000},
+    {"name": "広島市役所", "lat": 34.3853, "lon": 132.4553, "population": 10000},
+    
+    # 広島市各区
+    {"name": "安佐南区中心", "lat": 34.4520, "lon": 132.4710, "population": 24000},
+    {"name": "安佐北区中心", "lat": 34.5180, "lon": 132.5080, "population": 14000},
+    {"name": "佐伯区中心", "lat": 34.3670, "lon": 132.3610, "population": 14000},
+    {"name": "安芸区中心", "lat": 34.3580, "lon": 132.5560, "population": 8000},
+    {"name": "南区中心", "lat": 34.3800, "lon": 132.4680, "population": 14000},
+    {"name": "東区中心", "lat": 34.3960, "lon": 132.4820, "population": 12000},
+    {"name": "西区中心", "lat": 34.3940, "lon": 132.4340, "population": 19000},
+    
+    # 東広島市（人口: 約19万人）
+    {"name": "西条駅", "lat": 34.4308, "lon": 132.7425, "population": 30000},
+    {"name": "東広島市役所", "lat": 34.4283, "lon": 132.7467, "population": 10000},
+    {"name": "広島大学東広島キャンパス", "lat": 34.4018, "lon": 132.7126, "population": 20000},
+    {"name": "八本松駅", "lat": 34.4241, "lon": 132.6913, "population": 8000},
+    {"name": "高屋駅", "lat": 34.4483, "lon": 132.8061, "population": 5000},
+    {"name": "黒瀬", "lat": 34.3686, "lon": 132.6626, "population": 6000},
+    {"name": "フジグラン東広島", "lat": 34.4320, "lon": 132.7380, "population": 12000},
+    {"name": "ゆめタウン東広島", "lat": 34.4250, "lon": 132.7450, "population": 10000},
+    
+    # 呉市（人口: 約21万人）
+    {"name": "呉駅", "lat": 34.2490, "lon": 132.5556, "population": 30000},
+    {"name": "呉市役所", "lat": 34.2381, "lon": 132.5659, "population": 8000},
+    {"name": "大和ミュージアム", "lat": 34.2415, "lon": 132.5552, "population": 10000},
+    {"name": "広駅", "lat": 34.2430, "lon": 132.5300, "population": 15000},
+    {"name": "安浦駅", "lat": 34.2770, "lon": 132.7550, "population": 5000},
+    {"name": "音戸", "lat": 34.1830, "lon": 132.5350, "population": 6000},
+    {"name": "呉中央商店街", "lat": 34.2480, "lon": 132.5570, "population": 8000},
+    {"name": "呉ポートピアパーク", "lat": 34.2520, "lon": 132.5480, "population": 5000},
+    
+    # 福山市（人口: 約46万人）
+    {"name": "福山駅", "lat": 34.4858, "lon": 133.3627, "population": 60000},
+    {"name": "福山城", "lat": 34.4900, "lon": 133.3627, "population": 8000},
+    {"name": "鞆の浦", "lat": 34.3833, "lon": 133.3883, "population": 5000},
+    {"name": "松永駅", "lat": 34.4500, "lon": 133.2550, "population": 15000},
+    {"name": "新市駅", "lat": 34.5350, "lon": 133.2880, "population": 8000},
+    {"name": "神辺駅", "lat": 34.5430, "lon": 133.3900, "population": 10000},
+    {"name": "福山市役所", "lat": 34.4870, "lon": 133.3600, "population": 10000},
+    {"name": "福山東IC", "lat": 34.5030, "lon": 133.3950, "population": 5000},
+    {"name": "福山駅前商店街", "lat": 34.4880, "lon": 133.3600, "population": 12000},
+    
+    # 尾道市（人口: 約13万人）
+    {"name": "尾道駅", "lat": 34.4090, "lon": 133.1950, "population": 20000},
+    {"name": "千光寺", "lat": 34.4097, "lon": 133.1989, "population": 8000},
+    {"name": "しまなみ海道（尾道IC）", "lat": 34.4041, "lon": 133.1875, "population": 10000},
+    {"name": "向島", "lat": 34.3890, "lon": 133.2150, "population": 6000},
+    {"name": "因島", "lat": 34.3100, "lon": 133.1650, "population": 5000},
+    {"name": "瀬戸田", "lat": 34.3050, "lon": 133.0870, "population": 3000},
+    
+    # 三原市（人口: 約9万人）
+    {"name": "三原駅", "lat": 34.3988, "lon": 133.0792, "population": 15000},
+    {"name": "三原市役所", "lat": 34.3992, "lon": 133.0783, "population": 5000},
+    {"name": "本郷駅", "lat": 34.4370, "lon": 132.9890, "population": 8000},
+    {"name": "三原港", "lat": 34.3950, "lon": 133.0820, "population": 5000},
+    {"name": "須波", "lat": 34.3430, "lon": 133.0250, "population": 3000},
+    
+    # 廿日市市（人口: 約12万人）
+    {"name": "廿日市駅", "lat": 34.3483, "lon": 132.3317, "population": 15000},
+    {"name": "宮島口駅", "lat": 34.3139, "lon": 132.3028, "population": 10000},
+    {"name": "厳島神社", "lat": 34.2968, "lon": 132.3198, "population": 20000},
+    {"name": "大野浦駅", "lat": 34.2870, "lon": 132.2750, "population": 5000},
+    {"name": "吉和", "lat": 34.5230, "lon": 132.0790, "population": 1000},
+    
+    # 三次市（人口: 約5万人、県北部）
+    {"name": "三次駅", "lat": 34.8056, "lon": 132.8528, "population": 8000},
+    {"name": "三次市役所", "lat": 34.8053, "lon": 132.8522, "population": 3000},
+    {"name": "十日市", "lat": 34.7950, "lon": 132.8600, "population": 5000},
+    {"name": "君田", "lat": 34.8522, "lon": 132.8556, "population": 1500},
+    {"name": "作木", "lat": 34.8430, "lon": 132.7450, "population": 1200},
+    
+    # 庄原市（人口: 約3.5万人、県北東部）
+    {"name": "備後庄原駅", "lat": 34.8572, "lon": 133.0167, "population": 5000},
+    {"name": "庄原市役所", "lat": 34.8569, "lon": 133.0169, "population": 2000},
+    {"name": "東城", "lat": 34.8890, "lon": 133.2780, "population": 3000},
+    {"name": "西城", "lat": 34.9260, "lon": 132.9940, "population": 2000},
+    {"name": "高野", "lat": 35.0350, "lon": 132.8560, "population": 1000},
+    
+    # 大竹市（人口: 約2.7万人）
+    {"name": "大竹駅", "lat": 34.2380, "lon": 132.2220, "population": 8000},
+    {"name": "玖波駅", "lat": 34.2080, "lon": 132.2000, "population": 5000},
+    
+    # 竹原市（人口: 約2.5万人）
+    {"name": "竹原駅", "lat": 34.3420, "lon": 132.9070, "population": 8000},
+    {"name": "忠海駅", "lat": 34.3750, "lon": 132.9680, "population": 3000},
+    
+    # 江田島市（人口: 約2.3万人）
+    {"name": "小用港", "lat": 34.2230, "lon": 132.4710, "population": 3000},
+    {"name": "切串港", "lat": 34.1890, "lon": 132.4440, "population": 2000},
+    
+    # 府中市（人口: 約4万人）
+    {"name": "府中駅", "lat": 34.5680, "lon": 133.2370, "population": 5000},
+    {"name": "上下駅", "lat": 34.6780, "lon": 133.1820, "population": 2000},
+    
+    # 安芸高田市（人口: 約2.8万人）
+    {"name": "向原駅", "lat": 34.5590, "lon": 132.6850, "population": 3000},
+    {"name": "吉田", "lat": 34.6730, "lon": 132.7050, "population": 4000},
+    
+    # 安芸太田町（人口: 約6千人）
+    {"name": "加計", "lat": 34.5890, "lon": 132.3180, "population": 2000},
+    {"name": "戸河内IC", "lat": 34.6350, "lon": 132.1780, "population": 1000},
+    
+    # 北広島町（人口: 約1.8万人）
+    {"name": "千代田", "lat": 34.6730, "lon": 132.5510, "population": 3000},
+    {"name": "豊平", "lat": 34.6890, "lon": 132.4230, "population": 1500},
+    
+    # 主要IC・JCT
+    {"name": "広島IC", "lat": 34.3847, "lon": 132.4147, "population": 10000},
+    {"name": "広島JCT", "lat": 34.3944, "lon": 132.3850, "population": 8000},
+    {"name": "福山西IC", "lat": 34.5156, "lon": 133.2775, "population": 5000},
+    {"name": "尾道IC", "lat": 34.4550, "lon": 133.1633, "population": 5000},
+    {"name": "東広島IC", "lat": 34.3910, "lon": 132.6740, "population": 3000},
+    {"name": "高田IC", "lat": 34.6210, "lon": 132.6930, "population": 2000}
+]
+
+# 山口県の主要地点
+YAMAGUCHI_POINTS = [
+    {"name": "下関駅", "lat": 33.9507, "lon": 130.9239},
+    {"name": "唐戸市場", "lat": 33.9567, "lon": 130.9444},
+    {"name": "山口駅", "lat": 34.1858, "lon": 131.4714},
+    {"name": "県庁", "lat": 34.1786, "lon": 131.4738},
+    {"name": "新山口駅", "lat": 34.0328, "lon": 131.0828},
+    {"name": "防府駅", "lat": 34.0511, "lon": 131.5639},
+    {"name": "徳山駅", "lat": 34.0520, "lon": 131.8058},
+    {"name": "岩国駅", "lat": 34.1658, "lon": 132.2200},
+    {"name": "萩市", "lat": 34.4083, "lon": 131.3989},
+    {"name": "宇部空港", "lat": 33.9301, "lon": 131.2788}
+]
+
+# 段階的読み込み（city_only）で使う広島市内の判定キーワード
+HIROSHIMA_CITY_KEYWORDS = [
+    '広島駅', '紙屋町', '八丁堀', '平和記念', '本通り', '広島城',
+    'マツダスタジアム', '宇品', '横川', '西広島', '広島市役所',
+    '安佐南区', '安佐北区', '佐伯区', '安芸区', '南区', '東区', '西区', '中区',
+    '広島IC', '広島JCT'
+]
+
+# バックグラウンドで事前計算する (都道府県, city_only) の組み合わせ
+PRECOMPUTE_TARGETS = [
+    ("広島県", False),
+    ("広島県", True),
+    ("山口県", False),
+]
+
+# 共有キャッシュ（Redis）に保存する期間（秒）。時間帯の切り替わり前後をまたげるよう2時間
+PAYLOAD_TTL = 2 * 3600
+
+# 次の時間帯の計算を切り替わりの何秒前に始めるか
+PRECOMPUTE_LEAD_SECONDS = 120
+
+# 配信形式（GeoJSON / 列指向バイナリ）
+PAYLOAD_FORMATS = ("geojson", "binary")
+PAYLOAD_MEDIA_TYPES = {
+    "geojson": "application/json",
+    "binary": "application/octet-stream",
+}
+BINARY_MAGIC = b"UMOB"
+
+
+def hour_bucket(now: Optional[datetime] = None) -> datetime:
+    """時刻を1時間単位に丸める"""
+    now = now or datetime.now()
+    return now.replace(minute=0, second=0, microsecond=0)
+
+
+def particle_counts(volumes: np.ndarray) -> np.ndarray:
+    """
+    フローの順位（流動量の降順）と流動量から基本パーティクル数を決める
+    パフォーマンスと表示品質のバランスを取り、上位フローほど多く割り当てる
+    """
+    rank = np.arange(len(volumes))
+    return np.where(
+        rank < 100, np.clip(volumes // 5000, 10, 30),        # 上位100フローは10～30個
+        np.where(
+            rank < 500, np.clip(volumes // 10000, 5, 15),    # 次の400フローは5～15個
+            np.clip(volumes // 20000, 3, 10)                 # それ以降は3～10個
+        )
+    )
+
+
+def estimate_flows(prefecture: str, city_only: bool, hour: int) -> List[Dict]:
+    """
+    指定時間帯の主要フローを推定
+    統計的推定モデルでOD行列を推定し、流動量の多い順に絞り込む（同じ引数なら同じ結果）
+    """
+    estimator = MobilityEstimator()
+    
+    # 統計的推定モデルを使用してリアルなフローを生成
+    points = HIROSHIMA_POINTS if prefecture == "広島県" else YAMAGUCHI_POINTS
+    
+    # OD行列の推定
+    estimated_flows = estimator.estimate_od_matrix(points, prefecture, hour=hour)
+    
+    # 段階的読み込み対応
+    if city_only and prefecture == "広島県":
+        # 広島市内のフローのみをフィルタリング
+        city_flows = []
+        for flow in estimated_flows:
+            origin_is_city = any(keyword in flow["origin"]["name"] for keyword in HIROSHIMA_CITY_KEYWORDS)
+            dest_is_city = any(keyword in flow["destination"]["name"] for keyword in HIROSHIMA_CITY_KEYWORDS)
+            if origin_is_city and dest_is_city:
+                city_flows.append(flow)
+        
+        # 上位の主要フローのみを抽出
+        city_flows.sort(key=lambda x: x["volume"], reverse=True)
+        flows = city_flows[:500]  # 市内は500フローまで
+    else:
+        # 上位の主要フローのみを抽出（視覚化のため）
+        estimated_flows.sort(key=lambda x: x["volume"], reverse=True)
+        # 広島県は全フロー表示（最大2000まで）、山口県は100
+        flows = estimated_flows[:2000] if prefecture == "広島県" else estimated_flows[:100]
+    
+    return flows
+
+
+def estimate_mobility(prefecture: str, city_only: bool, hour: int) -> Tuple[List[Dict], np.ndarray]:
+    """
+    指定時間帯の主要フローとパーティクルを推定
+    フローとパーティクルの構造化配列（PARTICLE_DTYPE）を返す
+    """
+    flows = estimate_flows(prefecture, city_only, hour)
+    volumes = np.array([flow["volume"] for flow in flows], dtype=np.int64)
+    particles = MobilityEstimator().generate_particle_arrays(flows, particle_counts(volumes))
+    return flows, particles
+
+
+def flow_route_coordinates(flows: List[Dict], zoom: int = ROUTE_PAYLOAD_ZOOM) -> List[List[List[float]]]:
+    """フローごとの経路座標列（GTFSの運行形状に沿わせられない場合は起点・終点の直線）"""
+    return [
+        route or [
+            [flow["origin"]["lon"], flow["origin"]["lat"]],
+            [flow["destination"]["lon"], flow["destination"]["lat"]]
+        ]
+        for flow, route in zip(flows, route_geometry.match_flows(flows, zoom))
+    ]
+
+
+def build_geojson_payload(flows: List[Dict], particles: np.ndarray) -> Dict:
+    """フローをGeoJSON LineString（可能なら路線に沿った経路）、パーティクルをGeoJSON Pointに変換"""
+    flow_features = [
+        {
+            "type": "Feature",
+            "geometry": {
+                "type": "LineString",
+                "coordinates": coordinates
+            },
+            "properties": {
+                "intensity": min(100, flow["volume"] / 500),  # 0-100にスケール
+                "volume": flow["volume"],
+                "origin_name": flow["origin"]["name"],
+                "destination_name": flow["destination"]["name"],
+                "flow_type": flow.get("flow_type", flow.get("type", "general"))  # フロータイプ
+            }
+        }
+        for flow, coordinates in zip(flows, flow_route_coordinates(flows))
+    ]
+    
+    # 列ごとにPythonのリストへ変換してから組み立てる（要素ごとの変換を避ける）
+    columns = {name: particles[name].tolist() for name in particles.dtype.names}
+    particle_features = [
+        {
+            "type": "Feature",
+            "geometry": {
+                "type": "Point",
+                "coordinates": [lon, lat]
+            },
+            "properties": {
+                "size": 2,
+                "color": FLOW_TYPE_COLORS[FLOW_TYPE_NAMES[type_code]],
+                "speed": speed,
+                "origin_lon": origin_lon,
+                "origin_lat": origin_lat,
+                "destination_lon": dest_lon,
+                "destination_lat": dest_lat,
+                "control_lon": control_lon,
+                "control_lat": control_lat,
+                "flow_index": flow_index,
+                "particle_index": particle_index,
+                "flow_type": FLOW_TYPE_NAMES[type_code]
+            }
+        }
+        for lon, lat, speed, origin_lon, origin_lat, dest_lon, dest_lat,
+            control_lon, control_lat, flow_index, particle_index, type_code in zip(
+            columns["lon"], columns["lat"], columns["speed"],
+            columns["origin_lon"], columns["origin_lat"], columns["dest_lon"], columns["dest_lat"],
+            columns["control_lon"], columns["control_lat"],
+            columns["flow_index"], columns["particle_index"], columns["type_code"]
+        )
+    ]
+    
+    return {
+        "flows": {
+            "type": "FeatureCollection",
+            "features": flow_features
+        },
+        "particles": {
+            "type": "FeatureCollection",
+            "features": particle_features
+        }
+    }
+
+
+def build_binary_payload(flows: List[Dict], particles: np.ndarray) -> bytes:
+    """
+    フロー・パーティクルを列指向のバイナリ形式に変換
+    
+    レイアウト（リトルエンディアン）:
+        b"UMOB" | uint32 ヘッダー長 | ヘッダー（UTF-8 JSON）| 列データ
+    ヘッダーには列ごとの name / dtype / offset（列データ先頭からのバイト位置）/ length と、
+    フロー名・流動タイプ表・色を含む。各列は8バイト境界に揃えてあり、
+    ブラウザ側で Float32Array などの型付き配列としてそのまま参照できる
+    パーティクルの起点・終点はflow_indexでフロー列を参照する
+    フローの経路は routes の offset（フロー数+1）で lon / lat の範囲を示す
+    """
+    flow_columns = {
+        "origin_lon": np.array([flow["origin"]["lon"] for flow in flows], dtype="<f4"),
+        "origin_lat": np.array([flow["origin"]["lat"] for flow in flows], dtype="<f4"),
+        "dest_lon": np.array([flow["destination"]["lon"] for flow in flows], dtype="<f4"),
+        "dest_lat": np.array([flow["destination"]["lat"] for flow in flows], dtype="<f4"),
+        "volume": np.array([flow["volume"] for flow in flows], dtype="<u4"),
+        "type_code": np.array(
+            [FLOW_TYPE_CODES.get(flow.get("type", "general"), FLOW_TYPE_CODES["general"]) for flow in flows],
+            dtype="u1"
+        ),
+    }
+    particle_columns = {
+        "flow_index": particles["flow_index"].astype("<u4"),
+        "lon": particles["lon"].astype("<f4"),
+        "lat": particles["lat"].astype("<f4"),
+        "control_lon": particles["control_lon"].astype("<f4"),
+        "control_lat": particles["control_lat"].astype("<f4"),
+        "progress": particles["progress"].astype("<f4"),
+        "speed": particles["speed"].astype("<f4"),
+        "type_code": particles["type_code"].astype("u1"),
+    }
+    
+    routes = flow_route_coordinates(flows)
+    route_lengths = np.array([len(route) for route in routes], dtype=np.int64)
+    route_points = np.array([point for route in routes for point in route], dtype=np.float64).reshape(-1, 2)
+    route_columns = {
+        "offset": np.concatenate([[0], np.cumsum(route_lengths)]).astype("<u4"),
+        "lon": route_points[:, 0].astype("<f4"),
+        "lat": route_points[:, 1].astype("<f4"),
+    }
+    
+    chunks = []
+    offset = 0
+    
+    def add_columns(columns: Dict[str, np.ndarray]) -> List[Dict]:
+        nonlocal offset
+        layout = []
+        for name, values in columns.items():
+            data = values.tobytes()
+            layout.append({
+                "name": name,
+                "dtype": values.dtype.str.lstrip("<|"),
+                "offset": offset,
+                "length": len(values)
+            })
+            padding = -len(data) % 8
+            chunks.append(data + b"\0" * padding)
+            offset += len(data) + padding
+        return layout
+    
+    header = {
+        "version": 1,
+        "flows": {
+            "count": len(flows),
+            "columns": add_columns(flow_columns),
+            "origin_names": [flow["origin"]["name"] for flow in flows],
+            "destination_names": [flow["destination"]["name"] for flow in flows],
+        },
+        "particles": {
+            "count": len(particles),
+            "columns": add_columns(particle_columns),
+        },
+        "routes": {
+            "count": len(route_points),
+            "columns": add_columns(route_columns),
+        },
+        "flow_types": FLOW_TYPE_NAMES,
+        "colors": [FLOW_TYPE_COLORS[name] for name in FLOW_TYPE_NAMES],
+    }
+    header_bytes = json.dumps(header, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    # 列データの先頭を8バイト境界に揃える
+    header_bytes += b" " * (-(len(BINARY_MAGIC) + 4 + len(header_bytes)) % 8)
+    
+    return b"".join([
+        BINARY_MAGIC,
+        struct.pack("<I", len(header_bytes)),
+        header_bytes,
+        *chunks
+    ])
+
+
+def build_mobility_payload(prefecture: str, city_only: bool, hour: int) -> Dict:
+    """指定時間帯の人流データ（フロー・パーティクルのGeoJSON）を生成"""
+    flows, particles = estimate_mobility(prefecture, city_only, hour)
+    return build_geojson_payload(flows, particles)
+
+
+def serialize_payload(payload: Dict) -> bytes:
+    """レスポンス用にJSONバイト列へシリアライズ"""
+    return json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _build_serialized_payloads(prefecture: str, city_only: bool, hour: int) -> Dict[str, bytes]:
+    """
+    ワーカースレッドで実行する生成＋シリアライズ処理
+    同じ推定結果からGeoJSONとバイナリの両形式を作る
+    """
+    flows, particles = estimate_mobility(prefecture, city_only, hour)
+    payloads = {
+        "geojson": serialize_payload(build_geojson_payload(flows, particles)),
+        "binary": build_binary_payload(flows, particles),
+    }
+    logger.info(
+        f"Mobility payload computed: {prefecture} city_only={city_only} hour={hour} "
+        f"(flows: {len(flows)}, particles: {len(particles)}, "
+        f"geojson: {len(payloads['geojson'])} bytes, binary: {len(payloads['binary'])} bytes)"
+    )
+    return payloads
+
+
+class MobilityPayloadStore:
+    """
+    事前計算済み人流データのストア
+    - プロセス内に（都道府県, city_only, 時間帯, 形式）ごとのバイト列を保持
+    - 未計算の場合は共有キャッシュ（Redis）を参照し、なければ計算する（同時要求は1回に集約）
+    - バックグラウンドタスクが時間帯の切り替わり前に次の時間帯を計算しておく
+    """
+
+    def __init__(self):
+        self._payloads: Dict[Tuple[str, bool, datetime, str], bytes] = {}
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def _cache_key(prefecture: str, city_only: bool, bucket: datetime, fmt: str) -> str:
+        return make_cache_key(
+            "mobility",
+            {"prefecture": prefecture, "city_only": city_only, "hour_bucket": bucket, "format": fmt}
+        )
+
+    def _store(self, prefecture: str, city_only: bool, bucket: datetime, fmt: str, payload: bytes):
+        self._payloads[(prefecture, city_only, bucket, fmt)] = payload
+        # 過ぎた時間帯のデータは破棄
+        current = hour_bucket()
+        for key in [key for key in self._payloads if key[2] < current]:
+            del self._payloads[key]
+
+    async def _compute(self, prefecture: str, city_only: bool, bucket: datetime) -> Dict[str, bytes]:
+        """両形式を計算してプロセス内に保存し、共有キャッシュにも書き込む"""
+        try:
+            await route_geometry.ensure_loaded()
+        except Exception as e:
+            logger.warning(f"Route geometry unavailable, using straight flows: {e}")
+        loop = asyncio.get_running_loop()
+        payloads = await loop.run_in_executor(
+            None, _build_serialized_payloads, prefecture, city_only, bucket.hour
+        )
+        for fmt, payload in payloads.items():
+            self._store(prefecture, city_only, bucket, fmt, payload)
+            await response_cache.set(
+                self._cache_key(prefecture, city_only, bucket, fmt), payload, PAYLOAD_TTL
+            )
+        return payloads
+
+    async def get(self, prefecture: str, city_only: bool = False, fmt: str = "geojson") -> Tuple[bytes, bool]:
+        """現在の時間帯のデータを取得。戻り値は (シリアライズ済みバイト列, 事前計算済みだったか)"""
+        bucket = hour_bucket()
+        payload = self._payloads.get((prefecture, city_only, bucket, fmt))
+        if payload is not None:
+            return payload, True
+
+        async def compute() -> bytes:
+            payloads = await self._compute(prefecture, city_only, bucket)
+            return payloads[fmt]
+
+        payload, hit = await response_cache.get_or_compute(
+            "mobility", self._cache_key(prefecture, city_only, bucket, fmt), PAYLOAD_TTL, compute
+        )
+        self._store(prefecture, city_only, bucket, fmt, payload)
+        return payload, hit
+
+    async def refresh(self, bucket: Optional[datetime] = None) -> int:
+        """指定時間帯（省略時は現在）の全対象を計算して保存。計算した件数を返す"""
+        bucket = bucket or hour_bucket()
+        computed = 0
+        for prefecture, city_only in PRECOMPUTE_TARGETS:
+            if all((prefecture, city_only, bucket, fmt) in self._payloads for fmt in PAYLOAD_FORMATS):
+                continue
+            try:
+                await self._compute(prefecture, city_only, bucket)
+                computed += 1
+            except Exception as e:
+                logger.error(f"Mobility precompute failed ({prefecture}, city_only={city_only}): {e}")
+        return computed
+
+    async def _refresh_loop(self):
+        """現在の時間帯を計算後、次の時間帯を切り替わり前に計算し続ける"""
+        while True:
+            try:
+                current = hour_bucket()
+                await self.refresh(current)
+
+                next_bucket = current + timedelta(hours=1)
+                wait = (next_bucket - datetime.now()).total_seconds() - PRECOMPUTE_LEAD_SECONDS
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                await self.refresh(next_bucket)
+
+                wait = (next_bucket - datetime.now()).total_seconds()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Mobility precompute loop error: {e}")
+                await asyncio.sleep(60)
+
+    def start(self):
+        """バックグラウンド再計算を開始"""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        """バックグラウンド再計算を停止"""
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+    def clear(self):
+        """プロセス内の計算済みデータを破棄（GTFS更新で経路が変わった場合など）"""
+        self._payloads.clear()
+
+    def get_stats(self) -> Dict:
+        return {
+            "running": self._refresh_task is not None and not self._refresh_task.done(),
+            "payloads": [
+                {
+                    "prefecture": prefecture,
+                    "city_only": city_only,
+                    "hour_bucket": bucket.isoformat(),
+                    "format": fmt,
+                    "bytes": len(payload)
+                }
+                for (prefecture, city_only, bucket, fmt), payload in self._payloads.items()
+            ]
+        }
+
+
+# グローバルインスタンス
+mobility_payload_store = MobilityPayloadStore()
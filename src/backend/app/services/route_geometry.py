@@ -0,0 +1,474 @@
+"""
+人流フローの経路ジオメトリサービス
+GTFSの運行形状（shapes）を連結したネットワーク上でODペアを結び、
+直線の代わりに実際の路線に沿った経路をズームレベルごとに簡略化して返す
+"""
+
+import asyncio
+import csv
+import heapq
+import math
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import shapely
+from loguru import logger
+from shapely import STRtree
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal
+from app.services.gtfs_stop_catalog import GTFS_EXTRACTED_DIR
+
+# 出発地・目的地から形状へ吸着できる最大距離（m）
+SNAP_DISTANCE_M = 1000
+
+# 頂点をまとめてノードにする格子の大きさ（m）。同じ格子を通る形状どうしを乗り継げるようにする
+NODE_GRID_M = 40
+
+# 経路長が直線距離のこの倍数を超える場合は不自然な迂回とみなし採用しない
+MAX_DETOUR_RATIO = 3.0
+
+# ズームレベルごとの簡略化許容誤差（度）。要求ズーム以下で最も細かいレベルを使う
+ROUTE_ZOOM_TOLERANCES = {8: 0.002, 11: 0.0005, 14: 0.0001}
+
+# 人流データのペイロードに埋め込む経路のズームレベル
+ROUTE_PAYLOAD_ZOOM = 11
+
+# 経路キャッシュの上限（ODペア数）
+MAX_CACHED_ROUTES = 20000
+
+# 緯度1度あたりの距離（m）
+METERS_PER_DEGREE = 111320
+
+ODKey = Tuple[float, float, float, float]
+
+
+def od_key(origin_lon: float, origin_lat: float, dest_lon: float, dest_lat: float) -> ODKey:
+    """ODペアのキャッシュキー（約1m単位に丸める）"""
+    return (round(origin_lon, 5), round(origin_lat, 5), round(dest_lon, 5), round(dest_lat, 5))
+
+
+def zoom_level(zoom: int) -> int:
+    """要求ズームに対応する簡略化レベル"""
+    levels = sorted(ROUTE_ZOOM_TOLERANCES)
+    return max([level for level in levels if level <= zoom], default=levels[0])
+
+
+def read_shape_file(gtfs_dir: Path) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """shapes.txtを形状ID・順序で並べて読み込み"""
+    rows = []
+    with open(gtfs_dir / "shapes.txt", "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            try:
+                rows.append((
+                    row["shape_id"], int(row["shape_pt_sequence"]),
+                    float(row["shape_pt_lon"]), float(row["shape_pt_lat"])
+                ))
+            except (KeyError, TypeError, ValueError):
+                continue
+    rows.sort(key=lambda r: (r[0], r[1]))
+    return (
+        [r[0] for r in rows],
+        np.array([r[2] for r in rows], dtype=np.float64),
+        np.array([r[3] for r in rows], dtype=np.float64)
+    )
+
+
+async def read_shape_table() -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """gtfs_shapesテーブルから形状を読み込み"""
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(text("""
+            SELECT shape_id, shape_pt_lon, shape_pt_lat
+            FROM gtfs_shapes
+            WHERE shape_pt_lon IS NOT NULL AND shape_pt_lat IS NOT NULL
+            ORDER BY shape_id, shape_pt_sequence
+        """))
+        rows = result.all()
+    return (
+        [row[0] for row in rows],
+        np.array([float(row[1]) for row in rows], dtype=np.float64),
+        np.array([float(row[2]) for row in rows], dtype=np.float64)
+    )
+
+
+class ShapeNetwork:
+    """
+    運行形状のネットワーク
+    - 全形状の頂点を1つの座標配列に詰め、形状ごとの開始位置を保持
+    - 隣り合う頂点を結ぶ線分のSTRtreeで出発地・目的地を吸着
+    - NODE_GRID_M四方の格子ごとに頂点をまとめてノードとし、重複・交差する路線区間を共有させる
+    - 分岐のないノードの連なり（チェーン）を1本の辺に縮約したグラフ（CSR形式）で経路を探索
+    """
+
+    def __init__(self, shape_ids: Sequence[str], lon: np.ndarray, lat: np.ndarray):
+        self.lon = lon
+        self.lat = lat
+        shape_ids = np.asarray(shape_ids, dtype=object)
+        boundaries = np.flatnonzero(shape_ids[1:] != shape_ids[:-1]) + 1 if len(shape_ids) else np.empty(0, dtype=np.int64)
+        self.shape_offsets = np.concatenate([[0], boundaries, [len(shape_ids)]]).astype(np.int64)
+        self.shape_count = len(self.shape_offsets) - 1 if len(shape_ids) else 0
+
+        # 同じ形状内で隣り合う頂点の線分（始点の添字）
+        same_shape = np.ones(max(len(lon) - 1, 0), dtype=bool)
+        same_shape[boundaries - 1] = False
+        self.segment_start = np.flatnonzero(same_shape)
+        self.segment_tree = STRtree(shapely.linestrings(np.stack([
+            np.stack([lon[self.segment_start], lat[self.segment_start]], axis=1),
+            np.stack([lon[self.segment_start + 1], lat[self.segment_start + 1]], axis=1)
+        ], axis=1))) if len(self.segment_start) else None
+
+        self._build_nodes()
+        self._build_graph()
+
+    def _build_nodes(self):
+        """頂点を格子ごとにまとめ、ノード座標を所属頂点の平均とする"""
+        if not len(self.lon):
+            self.node_of_vertex = np.empty(0, dtype=np.int64)
+            self.node_lon = self.node_lat = np.empty(0, dtype=np.float64)
+            return
+        self._kx = math.cos(math.radians(float(np.mean(self.lat))))
+        cell = NODE_GRID_M / METERS_PER_DEGREE
+        cells = np.stack([
+            np.floor(self.lon * self._kx / cell), np.floor(self.lat / cell)
+        ], axis=1).astype(np.int64)
+        _, self.node_of_vertex = np.unique(cells, axis=0, return_inverse=True)
+        self.node_of_vertex = self.node_of_vertex.ravel()
+        counts = np.bincount(self.node_of_vertex)
+        self.node_lon = np.bincount(self.node_of_vertex, weights=self.lon) / counts
+        self.node_lat = np.bincount(self.node_of_vertex, weights=self.lat) / counts
+
+    def _distance_m(self, i, j):
+        return np.hypot(
+            (self.node_lon[i] - self.node_lon[j]) * METERS_PER_DEGREE * self._kx,
+            (self.node_lat[i] - self.node_lat[j]) * METERS_PER_DEGREE
+        )
+
+    def _build_graph(self):
+        """ノード間の辺を求め、分岐ノード（次数が2以外）の間のチェーンを辺とするグラフを作る"""
+        node_count = len(self.node_lon)
+        source = self.node_of_vertex[self.segment_start]
+        target = self.node_of_vertex[self.segment_start + 1]
+        mask = source != target
+        edges = np.unique(np.sort(np.stack([source[mask], target[mask]], axis=1), axis=1), axis=0)
+        both = np.concatenate([edges, edges[:, ::-1]])
+        both = both[np.argsort(both[:, 0], kind="stable")]
+        neighbor_offsets = np.searchsorted(both[:, 0], np.arange(node_count + 1)).tolist()
+        neighbors = both[:, 1].tolist()
+        degree = np.diff(neighbor_offsets)
+
+        kept = (degree != 2).tolist()
+        # チェーン内部のノードが属するチェーンと位置（分岐ノードは-1）
+        self.node_chain = [-1] * node_count
+        self.node_position = [0] * node_count
+        self.chain_nodes: List[List[int]] = []
+        self.chain_cum: List[List[float]] = []
+
+        def walk(start: int, first: int):
+            if not kept[first] and self.node_chain[first] >= 0:
+                return  # 反対側の端から作成済み
+            if kept[first] and first < start:
+                return
+            chain = [start]
+            previous, current = start, first
+            while not kept[current]:
+                chain.append(current)
+                a, b = neighbors[neighbor_offsets[current]:neighbor_offsets[current + 1]]
+                previous, current = current, (b if a == previous else a)
+            chain.append(current)
+            index = len(self.chain_nodes)
+            for position, node in enumerate(chain[1:-1], start=1):
+                self.node_chain[node] = index
+                self.node_position[node] = position
+            steps = self._distance_m(np.array(chain[:-1]), np.array(chain[1:]))
+            self.chain_nodes.append(chain)
+            self.chain_cum.append(np.concatenate([[0.0], np.cumsum(steps)]).tolist())
+
+        def walk_from(node: int):
+            for k in range(neighbor_offsets[node], neighbor_offsets[node + 1]):
+                walk(node, neighbors[k])
+
+        for node in range(node_count):
+            if kept[node]:
+                walk_from(node)
+        # 分岐のない環状の区間は1ノードを分岐ノードとみなす
+        for node in range(node_count):
+            if not kept[node] and self.node_chain[node] < 0:
+                kept[node] = True
+                walk_from(node)
+        self.node_kept = kept
+
+        # チェーンを両方向の辺とするCSR（辺ごとにチェーン番号と向きを持つ）
+        arcs = []
+        for index, chain in enumerate(self.chain_nodes):
+            if chain[0] == chain[-1]:
+                continue  # 環状のチェーンは最短経路に使われない
+            length = self.chain_cum[index][-1]
+            arcs.append((chain[0], chain[-1], length, index, True))
+            arcs.append((chain[-1], chain[0], length, index, False))
+        arcs.sort(key=lambda arc: arc[0])
+        self.edge_target = [arc[1] for arc in arcs]
+        self.edge_weight = [arc[2] for arc in arcs]
+        self.edge_chain = [arc[3] for arc in arcs]
+        self.edge_forward = [arc[4] for arc in arcs]
+        self.edge_offsets = np.searchsorted(
+            np.array([arc[0] for arc in arcs], dtype=np.int64), np.arange(node_count + 1)
+        ).tolist()
+
+    @property
+    def branch_count(self) -> int:
+        return sum(self.node_kept) if len(self.node_lon) else 0
+
+    def snap(self, lon: float, lat: float) -> Optional[int]:
+        """地点に最も近い線分の、より近い端点のノード（SNAP_DISTANCE_M以内になければNone）"""
+        if self.segment_tree is None:
+            return None
+        max_distance = SNAP_DISTANCE_M / (METERS_PER_DEGREE * math.cos(math.radians(lat)))
+        nearest = self.segment_tree.query_nearest(shapely.Point(lon, lat), max_distance=max_distance)
+        if not len(nearest):
+            return None
+        start = int(self.segment_start[nearest[0]])
+        candidates = np.array([start, start + 1])
+        distance = np.hypot(
+            (self.lon[candidates] - lon) * math.cos(math.radians(lat)), self.lat[candidates] - lat
+        )
+        return int(self.node_of_vertex[candidates[np.argmin(distance)]])
+
+    def _attachments(self, node: int) -> List[Tuple[int, float, List[int]]]:
+        """ノードから出入りできる分岐ノードと距離、分岐ノードからノードまでの経路"""
+        chain_index = self.node_chain[node]
+        if chain_index < 0:
+            return [(node, 0.0, [node])]
+        chain = self.chain_nodes[chain_index]
+        cum = self.chain_cum[chain_index]
+        position = self.node_position[node]
+        return [
+            (chain[0], cum[position], chain[:position + 1]),
+            (chain[-1], cum[-1] - cum[position], chain[position:][::-1])
+        ]
+
+    def shortest_paths(self, source: int, targets: Sequence[int]) -> Dict[int, List[int]]:
+        """1つの始点から複数の終点への最短経路（ノードの列）。全終点の出入口が確定した時点で打ち切る"""
+        distance: Dict[int, float] = {}
+        previous: Dict[int, Optional[Tuple[int, int]]] = {}
+        seed_paths: Dict[int, List[int]] = {}
+        for branch, offset, path in self._attachments(source):
+            if offset < distance.get(branch, math.inf):
+                distance[branch] = offset
+                previous[branch] = None
+                seed_paths[branch] = path[::-1]
+
+        target_entries = {target: self._attachments(target) for target in targets}
+        remaining = {branch for entries in target_entries.values() for branch, _, _ in entries}
+        queue = [(d, node) for node, d in distance.items()]
+        heapq.heapify(queue)
+        settled = set()
+        offsets, edge_target, edge_weight = self.edge_offsets, self.edge_target, self.edge_weight
+
+        while queue and remaining:
+            d, node = heapq.heappop(queue)
+            if node in settled:
+                continue
+            settled.add(node)
+            remaining.discard(node)
+            for k in range(offsets[node], offsets[node + 1]):
+                neighbor = edge_target[k]
+                candidate = d + edge_weight[k]
+                if candidate < distance.get(neighbor, math.inf):
+                    distance[neighbor] = candidate
+                    previous[neighbor] = (node, k)
+                    heapq.heappush(queue, (candidate, neighbor))
+
+        paths = {}
+        source_chain = self.node_chain[source]
+        for target, entries in target_entries.items():
+            best, best_entry = math.inf, None
+            for branch, offset, path in entries:
+                if branch in settled and distance[branch] + offset < best:
+                    best, best_entry = distance[branch] + offset, (branch, path)
+            if source_chain >= 0 and source_chain == self.node_chain[target]:
+                # 同じチェーン上なら分岐ノードを経由しない経路も比べる
+                cum = self.chain_cum[source_chain]
+                p, q = self.node_position[source], self.node_position[target]
+                if abs(cum[q] - cum[p]) <= best:
+                    chain = self.chain_nodes[source_chain]
+                    paths[target] = chain[p:q + 1] if p <= q else chain[q:p + 1][::-1]
+                    continue
+            if best_entry is None:
+                continue
+            branch, entry_path = best_entry
+            segments = [entry_path]
+            node = branch
+            while previous[node] is not None:
+                node, k = previous[node]
+                chain = self.chain_nodes[self.edge_chain[k]]
+                segments.append(chain if self.edge_forward[k] else chain[::-1])
+            segments.append(seed_paths[node])
+            path = segments[-1]
+            for segment in reversed(segments[:-1]):
+                path = path + segment[1:]
+            paths[target] = path
+        return paths
+
+
+class RouteGeometryService:
+    """
+    ODペアの経路ジオメトリ
+    - 形状ネットワークを一度だけ読み込み（shapes.txt、なければgtfs_shapesテーブル）
+    - 同じ出発地のフローはまとめて1回の探索で結ぶ
+    - ODペアごとにズームレベル別の簡略化済み座標列をキャッシュ（経路が見つからない場合もNoneを保持）
+    - match_flowsは複数のスレッドから同時に呼ばれるため、キャッシュの操作はスレッドロックで保護する
+    """
+
+    def __init__(self, gtfs_dir: Path):
+        self.gtfs_dir = gtfs_dir
+        self.network: Optional[ShapeNetwork] = None
+        self.source: Optional[str] = None
+        self._routes: "OrderedDict[ODKey, Optional[Dict[int, List[List[float]]]]]" = OrderedDict()
+        self._routes_lock = threading.Lock()
+        self._generation = 0  # clear()のたびに増やし、破棄前のネットワークで求めた経路をキャッシュに入れない
+        self._lock = asyncio.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self.source is not None
+
+    async def ensure_loaded(self):
+        """未読み込みなら形状ネットワークを構築する。同時要求は1回に集約"""
+        if self.loaded:
+            return
+        async with self._lock:
+            if self.loaded:
+                return
+            loop = asyncio.get_running_loop()
+            if (self.gtfs_dir / "shapes.txt").exists():
+                shape_ids, lon, lat = await loop.run_in_executor(None, read_shape_file, self.gtfs_dir)
+                source = "file"
+            else:
+                shape_ids, lon, lat = await read_shape_table()
+                source = "database"
+            network = await loop.run_in_executor(None, ShapeNetwork, shape_ids, lon, lat)
+            with self._routes_lock:
+                self.network = network
+                self._routes.clear()
+                self._generation += 1
+            self.source = source
+            logger.info(
+                f"Route geometry network loaded from {source}: "
+                f"{self.network.shape_count} shapes, {len(lon)} vertices, "
+                f"{self.network.branch_count} branch nodes"
+            )
+
+    def clear(self):
+        """ネットワークとキャッシュを破棄（次回アクセス時に再読み込み）"""
+        with self._routes_lock:
+            self.network = None
+            self._routes.clear()
+            self._generation += 1
+        self.source = None
+
+    def _simplify(self, routes: List[np.ndarray]) -> List[Dict[int, List[List[float]]]]:
+        """経路をまとめてズームレベルごとに簡略化（Douglas-Peucker）"""
+        lines = shapely.linestrings(
+            np.concatenate(routes), indices=np.repeat(np.arange(len(routes)), [len(r) for r in routes])
+        )
+        simplified = [{} for _ in routes]
+        for level, tolerance in ROUTE_ZOOM_TOLERANCES.items():
+            coordinates, index = shapely.get_coordinates(
+                shapely.simplify(lines, tolerance, preserve_topology=False), return_index=True
+            )
+            splits = np.searchsorted(index, np.arange(1, len(routes)))
+            for route, part in zip(simplified, np.split(coordinates.round(6), splits)):
+                route[level] = part.tolist()
+        return simplified
+
+    def _match_origin(
+        self, network: ShapeNetwork, origin: Tuple[float, float], destinations: List[Tuple[float, float]]
+    ) -> Dict[ODKey, Optional[Dict[int, List[List[float]]]]]:
+        """1つの出発地から複数の目的地への経路を求める（経路が見つからない目的地はNone）"""
+        source = network.snap(*origin)
+        snapped = {dest: network.snap(*dest) for dest in destinations}
+        targets = [node for node in snapped.values() if node is not None and node != source]
+        paths = network.shortest_paths(source, targets) if source is not None and targets else {}
+
+        kx = math.cos(math.radians(origin[1]))
+        results: Dict[ODKey, Optional[Dict[int, List[List[float]]]]] = {}
+        matched, routes = [], []
+        for dest, target in snapped.items():
+            results[od_key(*origin, *dest)] = None
+            path = paths.get(target)
+            if path is None:
+                continue
+            coordinates = np.vstack([
+                [origin],
+                np.stack([network.node_lon[path], network.node_lat[path]], axis=1),
+                [dest]
+            ])
+            steps = np.diff(coordinates, axis=0)
+            length = np.hypot(steps[:, 0] * kx, steps[:, 1]).sum()
+            direct = math.hypot((dest[0] - origin[0]) * kx, dest[1] - origin[1])
+            if length <= direct * MAX_DETOUR_RATIO:
+                matched.append(dest)
+                routes.append(coordinates)
+
+        if routes:
+            for dest, route in zip(matched, self._simplify(routes)):
+                results[od_key(*origin, *dest)] = route
+        return results
+
+    def match_flows(self, flows: List[Dict], zoom: int) -> List[Optional[List[List[float]]]]:
+        """
+        フローごとの経路座標列（見つからない場合はNone）
+        ネットワーク未読み込みの場合はすべてNone（呼び出し側で直線にする）
+        """
+        keys = [
+            od_key(flow["origin"]["lon"], flow["origin"]["lat"], flow["destination"]["lon"], flow["destination"]["lat"])
+            for flow in flows
+        ]
+        with self._routes_lock:
+            # 途中でclear()されても同じネットワークで計算を続ける
+            network = self.network
+            generation = self._generation
+            found = {key: self._routes[key] for key in keys if key in self._routes}
+        if network is None:
+            return [None] * len(flows)
+
+        pending: Dict[Tuple[float, float], List[Tuple[float, float]]] = {}
+        for key in keys:
+            if key not in found:
+                pending.setdefault((key[0], key[1]), []).append((key[2], key[3]))
+        computed: Dict[ODKey, Optional[Dict[int, List[List[float]]]]] = {}
+        for origin, destinations in pending.items():
+            computed.update(self._match_origin(network, origin, list(dict.fromkeys(destinations))))
+
+        if computed:
+            with self._routes_lock:
+                if generation == self._generation:
+                    self._routes.update(computed)
+                    while len(self._routes) > MAX_CACHED_ROUTES:
+                        self._routes.popitem(last=False)
+        found.update(computed)
+
+        level = zoom_level(zoom)
+        routes = []
+        for key in keys:
+            route = found.get(key)
+            routes.append(route[level] if route else None)
+        return routes
+
+    def get_stats(self) -> Dict:
+        network = self.network
+        with self._routes_lock:
+            cached = list(self._routes.values())
+        return {
+            "source": self.source,
+            "shapes": network.shape_count if network else 0,
+            "branch_nodes": network.branch_count if network else 0,
+            "cached_routes": len(cached),
+            "matched_routes": sum(1 for route in cached if route)
+        }
+
+
+# グローバルインスタンス
+route_geometry = RouteGeometryService(GTFS_EXTRACTED_DIR)
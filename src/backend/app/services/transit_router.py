@@ -0,0 +1,356 @@
+"""
+公共交通到達圏サービス
+運行日の時刻表を接続（ある停留所を発車して次の停留所に到着する区間）の配列として読み込み、
+Connection Scan Algorithm で出発地点・出発時刻からの到達可能停留所と到着時刻を求める
+前日の運行日のうち24時以降に発車する接続（深夜便）も、24時間前にずらして含める
+"""
+
+import asyncio
+import math
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import shapely
+from loguru import logger
+from shapely import STRtree
+from shapely.geometry import mapping
+from sqlalchemy import text
+
+from app.core.database import AsyncSessionLocal
+from app.services.transit_supply import ACTIVE_SERVICES_CTE
+
+# 徒歩速度（m/秒、約4.3km/h）
+WALK_SPEED_MPS = 1.2
+
+# 出発地点から乗車停留所までの最大徒歩距離（m）
+MAX_ACCESS_WALK_M = 800
+
+# 乗り換え時に停留所間を歩ける最大距離（m）
+MAX_TRANSFER_WALK_M = 300
+
+# 同時に保持する運行日の時刻表の数
+MAX_LOADED_DATES = 3
+
+# 1日の秒数（前日の深夜便の時刻をずらす幅）
+DAY_SEC = 86400
+
+# 到着時刻の初期値（未到達）
+UNREACHED = np.iinfo(np.int32).max
+
+EARTH_RADIUS_M = 6371008.8
+
+CONNECTIONS_QUERY = text("WITH" + ACTIVE_SERVICES_CTE + """,
+stop_events AS (
+    SELECT
+        st.trip_id,
+        st.stop_id,
+        COALESCE(st.departure_sec, st.arrival_sec) AS departure_sec,
+        LEAD(st.stop_id) OVER trip_order AS next_stop_id,
+        LEAD(COALESCE(st.arrival_sec, st.departure_sec)) OVER trip_order AS next_arrival_sec
+    FROM gtfs_stop_times st
+    JOIN gtfs_trips t ON st.trip_id = t.trip_id
+    JOIN active_services a ON t.service_id = a.service_id
+    WINDOW trip_order AS (PARTITION BY st.trip_id ORDER BY st.stop_sequence)
+)
+SELECT trip_id, stop_id, departure_sec, next_stop_id, next_arrival_sec
+FROM stop_events
+WHERE next_stop_id IS NOT NULL
+  AND departure_sec >= :min_departure_sec
+  AND next_arrival_sec IS NOT NULL
+ORDER BY departure_sec, next_arrival_sec
+""")
+
+STOPS_QUERY = text("""
+SELECT stop_id, stop_name, stop_lon, stop_lat
+FROM gtfs_stops
+WHERE stop_lon IS NOT NULL AND stop_lat IS NOT NULL
+""")
+
+
+def haversine_m(lon1, lat1, lon2, lat2):
+    """2点間の距離（m）。配列同士でも計算できる"""
+    lon1, lat1, lon2, lat2 = map(np.radians, (lon1, lat1, lon2, lat2))
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+
+def format_service_time(seconds: int) -> str:
+    """0時からの秒数を HH:MM に変換（24時以降は25:10のように表す）"""
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
+
+class TransitTimetable:
+    """
+    1運行日分の時刻表
+    - 停留所: ID・名称・経度・緯度の配列と stop_id → 添字 の対応
+    - 接続: 発車時刻順に並べた (発停留所, 着停留所, 発車秒, 到着秒, 便) のint32配列
+      （connectionsの便IDは前日分と区別できる任意のキー）
+    - 徒歩乗り換え: 停留所ごとの (相手停留所, 徒歩秒) のリスト
+    """
+
+    def __init__(self, service_date: date, stops: List[Tuple], connections: List[Tuple]):
+        self.service_date = service_date
+        self.loaded_at = datetime.now()
+
+        self.stop_ids = np.array([stop[0] for stop in stops], dtype=object)
+        self.stop_names = np.array([stop[1] for stop in stops], dtype=object)
+        self.lon = np.array([float(stop[2]) for stop in stops], dtype=np.float64)
+        self.lat = np.array([float(stop[3]) for stop in stops], dtype=np.float64)
+        self.stop_index = {stop_id: i for i, stop_id in enumerate(self.stop_ids)}
+
+        trip_index: Dict[str, int] = {}
+        rows = [
+            (
+                self.stop_index[dep_stop],
+                self.stop_index[arr_stop],
+                dep_sec,
+                arr_sec,
+                trip_index.setdefault(trip_id, len(trip_index))
+            )
+            for trip_id, dep_stop, dep_sec, arr_stop, arr_sec in connections
+            if dep_stop in self.stop_index and arr_stop in self.stop_index
+        ]
+        columns = np.array(rows, dtype=np.int32).reshape(-1, 5)
+        # 当日分と前日の深夜便を合わせて発車時刻順（同時刻は到着時刻順）に並べる
+        columns = columns[np.lexsort((columns[:, 3], columns[:, 2]))]
+        self.dep_stop = np.ascontiguousarray(columns[:, 0])
+        self.arr_stop = np.ascontiguousarray(columns[:, 1])
+        self.dep_time = np.ascontiguousarray(columns[:, 2])
+        self.arr_time = np.ascontiguousarray(columns[:, 3])
+        self.trip = np.ascontiguousarray(columns[:, 4])
+        self.trip_count = len(trip_index)
+
+        self.footpaths = self._build_footpaths()
+
+    def _build_footpaths(self) -> List[List[Tuple[int, int]]]:
+        """MAX_TRANSFER_WALK_M以内の停留所間の徒歩乗り換え"""
+        footpaths: List[List[Tuple[int, int]]] = [[] for _ in range(len(self.stop_ids))]
+        if not len(self.stop_ids):
+            return footpaths
+
+        points = shapely.points(self.lon, self.lat)
+        # 経度方向の1度は緯度方向より短いため、最も高緯度の停留所での経度方向の度数（cosで割った大きい方）で
+        # 検索範囲を取れば取りこぼさない（距離はhaversineで絞り込む）
+        radius_deg = MAX_TRANSFER_WALK_M / 110540 / math.cos(math.radians(float(np.max(np.abs(self.lat)))))
+        source, target = STRtree(points).query(points, predicate="dwithin", distance=radius_deg)
+        distance = haversine_m(self.lon[source], self.lat[source], self.lon[target], self.lat[target])
+        mask = (source != target) & (distance <= MAX_TRANSFER_WALK_M)
+        walk_sec = np.ceil(distance[mask] / WALK_SPEED_MPS).astype(np.int32)
+        for s, t, w in zip(source[mask].tolist(), target[mask].tolist(), walk_sec.tolist()):
+            footpaths[s].append((t, w))
+        return footpaths
+
+    def reachable(self, lon: float, lat: float, departure_sec: int, budget_sec: int) -> np.ndarray:
+        """
+        出発地点から各停留所への最早到着時刻（秒、未到達はUNREACHED）
+        出発地点からMAX_ACCESS_WALK_M以内の停留所へ歩き、以降は接続を発車時刻順に1回走査する
+        """
+        arrival = np.full(len(self.stop_ids), UNREACHED, dtype=np.int64)
+        end_sec = departure_sec + budget_sec
+
+        access = haversine_m(lon, lat, self.lon, self.lat)
+        nearby = np.flatnonzero(access <= MAX_ACCESS_WALK_M)
+        arrival[nearby] = departure_sec + np.ceil(access[nearby] / WALK_SPEED_MPS).astype(np.int64)
+
+        start = int(np.searchsorted(self.dep_time, departure_sec, side="left"))
+        stop = int(np.searchsorted(self.dep_time, end_sec, side="right"))
+
+        # 走査範囲だけPythonのリストにして要素アクセスを速くする
+        best = arrival.tolist()
+        dep_stop = self.dep_stop[start:stop].tolist()
+        arr_stop = self.arr_stop[start:stop].tolist()
+        dep_time = self.dep_time[start:stop].tolist()
+        arr_time = self.arr_time[start:stop].tolist()
+        trips = self.trip[start:stop].tolist()
+        boarded = bytearray(self.trip_count)
+        footpaths = self.footpaths
+
+        for i in range(stop - start):
+            trip = trips[i]
+            if not boarded[trip]:
+                if best[dep_stop[i]] > dep_time[i]:
+                    continue
+                boarded[trip] = 1
+            arrive = arr_time[i]
+            target = arr_stop[i]
+            if arrive < best[target] and arrive <= end_sec:
+                best[target] = arrive
+                for neighbor, walk in footpaths[target]:
+                    if arrive + walk < best[neighbor]:
+                        best[neighbor] = arrive + walk
+
+        arrival = np.array(best, dtype=np.int64)
+        arrival[arrival > end_sec] = UNREACHED
+        return arrival
+
+    def isochrones(
+        self,
+        lon: float,
+        lat: float,
+        travel_sec: np.ndarray,
+        thresholds: List[int]
+    ) -> Dict:
+        """
+        到達時間ごとの到達圏ポリゴン
+        到達した各停留所（と出発地点）から、残り時間で歩ける距離（上限MAX_ACCESS_WALK_M）の円の和集合
+        """
+        # 出発地点付近を中心とした平面座標（m）で計算する
+        kx = 111320 * math.cos(math.radians(lat))
+        ky = 110540
+        reached = np.flatnonzero(travel_sec < UNREACHED)
+        xs = np.append((self.lon[reached] - lon) * kx, 0.0)
+        ys = np.append((self.lat[reached] - lat) * ky, 0.0)
+        times = np.append(travel_sec[reached], 0)
+
+        features = []
+        for threshold in thresholds:
+            radius = np.minimum((threshold - times) * WALK_SPEED_MPS, MAX_ACCESS_WALK_M)
+            mask = radius > 0
+            circles = shapely.buffer(shapely.points(xs[mask], ys[mask]), radius[mask], quad_segs=4)
+            area = shapely.union_all(circles)
+            polygon = shapely.transform(area, lambda coords: coords / [kx, ky] + [lon, lat])
+            features.append({
+                "type": "Feature",
+                "geometry": mapping(polygon),
+                "properties": {"minutes": threshold // 60}
+            })
+        return {"type": "FeatureCollection", "features": features}
+
+
+class TransitRouter:
+    """
+    運行日ごとの時刻表を保持し到達圏を計算する
+    - 起動時に今日の時刻表を読み込み、それ以外の日は初回要求時に読み込む（最大MAX_LOADED_DATES日分）
+    - GTFS統合後はclear()で破棄する
+    """
+
+    def __init__(self):
+        self._timetables: "OrderedDict[date, TransitTimetable]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._preload_task: Optional[asyncio.Task] = None
+
+    async def _load(self, service_date: date) -> TransitTimetable:
+        """運行日の接続と、前日の運行日で24時以降に発車する接続（24時間前にずらす）を読み込む"""
+        async with AsyncSessionLocal() as session:
+            stops = (await session.execute(STOPS_QUERY)).all()
+            connections = (await session.execute(
+                CONNECTIONS_QUERY, {"service_date": service_date, "min_departure_sec": 0}
+            )).all()
+            overnight = (await session.execute(
+                CONNECTIONS_QUERY,
+                {"service_date": service_date - timedelta(days=1), "min_departure_sec": DAY_SEC}
+            )).all()
+        connections = [tuple(row) for row in connections] + [
+            (("previous", trip_id), dep_stop, dep_sec - DAY_SEC, arr_stop, arr_sec - DAY_SEC)
+            for trip_id, dep_stop, dep_sec, arr_stop, arr_sec in overnight
+        ]
+        loop = asyncio.get_running_loop()
+        timetable = await loop.run_in_executor(None, TransitTimetable, service_date, stops, connections)
+        logger.info(
+            f"Transit timetable loaded for {service_date}: "
+            f"{len(timetable.stop_ids)} stops, {len(timetable.dep_time)} connections, {timetable.trip_count} trips"
+        )
+        return timetable
+
+    async def get_timetable(self, service_date: date) -> TransitTimetable:
+        timetable = self._timetables.get(service_date)
+        if timetable is not None:
+            self._timetables.move_to_end(service_date)
+            return timetable
+        async with self._lock:
+            timetable = self._timetables.get(service_date)
+            if timetable is None:
+                timetable = await self._load(service_date)
+                self._timetables[service_date] = timetable
+                while len(self._timetables) > MAX_LOADED_DATES:
+                    self._timetables.popitem(last=False)
+        return timetable
+
+    def clear(self):
+        """読み込み済みの時刻表を破棄（次回要求時に再読み込み）"""
+        self._timetables.clear()
+
+    async def _preload(self):
+        try:
+            await self.get_timetable(date.today())
+        except Exception as e:
+            logger.warning(f"Transit timetable preload failed: {e}")
+
+    def start(self):
+        """今日の時刻表をバックグラウンドで読み込む"""
+        if self._preload_task is None or self._preload_task.done():
+            self._preload_task = asyncio.create_task(self._preload())
+
+    async def stop(self):
+        if self._preload_task is not None:
+            self._preload_task.cancel()
+            try:
+                await self._preload_task
+            except asyncio.CancelledError:
+                pass
+            self._preload_task = None
+
+    async def reachability(
+        self,
+        lon: float,
+        lat: float,
+        service_date: date,
+        departure_sec: int,
+        budget_sec: int,
+        isochrone_interval_sec: Optional[int] = None
+    ) -> Dict:
+        """到達可能な停留所（到着時刻順）と、指定があれば到達圏ポリゴンを返す"""
+        timetable = await self.get_timetable(service_date)
+        loop = asyncio.get_running_loop()
+        arrival = await loop.run_in_executor(
+            None, timetable.reachable, lon, lat, departure_sec, budget_sec
+        )
+
+        reached = np.flatnonzero(arrival < UNREACHED)
+        reached = reached[np.argsort(arrival[reached], kind="stable")]
+        stops = [
+            {
+                "stop_id": timetable.stop_ids[i],
+                "stop_name": timetable.stop_names[i],
+                "lon": float(timetable.lon[i]),
+                "lat": float(timetable.lat[i]),
+                "arrival_time": format_service_time(int(arrival[i])),
+                "travel_min": round((int(arrival[i]) - departure_sec) / 60, 1)
+            }
+            for i in reached.tolist()
+        ]
+
+        result = {
+            "origin": {"lon": lon, "lat": lat},
+            "service_date": service_date.isoformat(),
+            "departure_time": format_service_time(departure_sec),
+            "budget_min": budget_sec // 60,
+            "stop_count": len(stops),
+            "stops": stops
+        }
+
+        if isochrone_interval_sec:
+            thresholds = list(range(isochrone_interval_sec, budget_sec, isochrone_interval_sec)) + [budget_sec]
+            travel_sec = np.where(arrival < UNREACHED, arrival - departure_sec, UNREACHED)
+            result["isochrones"] = await loop.run_in_executor(
+                None, timetable.isochrones, lon, lat, travel_sec, thresholds
+            )
+
+        return result
+
+    def get_stats(self) -> Dict:
+        return {
+            "loaded_dates": [service_date.isoformat() for service_date in self._timetables],
+            "connections": {
+                service_date.isoformat(): len(timetable.dep_time)
+                for service_date, timetable in self._timetables.items()
+            }
+        }
+
+
+# グローバルインスタンス
+transit_router = TransitRouter()
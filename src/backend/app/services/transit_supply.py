@@ -0,0 +1,307 @@
+"""
+公共交通供給量サービス
+GTFSの運行カレンダー（gtfs_calendar / gtfs_calendar_dates）から運行日に有効な便を求め、
+停留所別・路線別の時間帯別本数、平均運行間隔、始発・終発を事前計算して返す
+"""
+
+import asyncio
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+from loguru import logger
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models.transit import TransitRouteSupply, TransitStopSupply, TransitSupplyDate  # noqa: F401 テーブル登録
+
+# 時間帯別本数の時間数（GTFSでは24時以降の時刻があるため29時台までを保持し、それ以降は最後の枠に入れる）
+SERVICE_HOURS = 30
+
+# 運行日に有効なservice_id（WITH句の一部として使う）
+ACTIVE_SERVICES_CTE = """
+active_services AS (
+    SELECT service_id
+    FROM gtfs_calendar
+    WHERE :service_date BETWEEN start_date AND end_date
+      AND CASE EXTRACT(ISODOW FROM CAST(:service_date AS date))
+          WHEN 1 THEN monday
+          WHEN 2 THEN tuesday
+          WHEN 3 THEN wednesday
+          WHEN 4 THEN thursday
+          WHEN 5 THEN friday
+          WHEN 6 THEN saturday
+          ELSE sunday
+      END
+    UNION
+    SELECT service_id FROM gtfs_calendar_dates
+    WHERE date = :service_date AND exception_type = 1
+    EXCEPT
+    SELECT service_id FROM gtfs_calendar_dates
+    WHERE date = :service_date AND exception_type = 2
+)
+"""
+
+# 運行日に発車する停留所時刻
+DEPARTURES_CTE = "WITH" + ACTIVE_SERVICES_CTE + """,
+departures AS (
+    SELECT st.stop_id, t.route_id, st.trip_id, st.departure_sec
+    FROM gtfs_stop_times st
+    JOIN gtfs_trips t ON st.trip_id = t.trip_id
+    JOIN active_services a ON t.service_id = a.service_id
+    WHERE st.departure_sec IS NOT NULL
+      AND COALESCE(st.pickup_type, 0) <> 1
+)
+"""
+
+
+def _hourly_counts(column: str) -> str:
+    """時間帯別件数の配列を1回の集計で作るSQL式"""
+    last = SERVICE_HOURS - 1
+    counts = [
+        f"COUNT(*) FILTER (WHERE {column} / 3600 = {hour})" for hour in range(last)
+    ]
+    counts.append(f"COUNT(*) FILTER (WHERE {column} / 3600 >= {last})")
+    return f"ARRAY[{', '.join(counts)}]::integer[]"
+
+
+STOP_SUPPLY_QUERY = text(DEPARTURES_CTE + f"""
+INSERT INTO transit_stop_supply (
+    service_date, stop_id, stop_lon, stop_lat, departures, route_count,
+    first_departure_sec, last_departure_sec, avg_headway_sec, hourly_departures
+)
+SELECT
+    :service_date,
+    d.stop_id,
+    s.stop_lon,
+    s.stop_lat,
+    COUNT(*),
+    COUNT(DISTINCT d.route_id),
+    MIN(d.departure_sec),
+    MAX(d.departure_sec),
+    CASE WHEN COUNT(*) > 1
+        THEN (MAX(d.departure_sec) - MIN(d.departure_sec))::float / (COUNT(*) - 1)
+    END,
+    {_hourly_counts("d.departure_sec")}
+FROM departures d
+LEFT JOIN gtfs_stops s ON d.stop_id = s.stop_id
+GROUP BY d.stop_id, s.stop_lon, s.stop_lat
+""")
+
+ROUTE_SUPPLY_QUERY = text(DEPARTURES_CTE + f""",
+trip_starts AS (
+    SELECT route_id, trip_id, MIN(departure_sec) AS departure_sec, COUNT(DISTINCT stop_id) AS stop_count
+    FROM departures
+    GROUP BY route_id, trip_id
+)
+INSERT INTO transit_route_supply (
+    service_date, route_id, agency_id, route_short_name, route_long_name,
+    trips, stop_count, first_departure_sec, last_departure_sec, avg_headway_sec, hourly_trips
+)
+SELECT
+    :service_date,
+    t.route_id,
+    r.agency_id,
+    r.route_short_name,
+    r.route_long_name,
+    COUNT(*),
+    MAX(t.stop_count),
+    MIN(t.departure_sec),
+    MAX(t.departure_sec),
+    CASE WHEN COUNT(*) > 1
+        THEN (MAX(t.departure_sec) - MIN(t.departure_sec))::float / (COUNT(*) - 1)
+    END,
+    {_hourly_counts("t.departure_sec")}
+FROM trip_starts t
+LEFT JOIN gtfs_routes r ON t.route_id = r.route_id
+GROUP BY t.route_id, r.agency_id, r.route_short_name, r.route_long_name
+""")
+
+# 運行日ごとの計算は1つずつ行う（同じ日の同時計算による重複挿入を防ぐ）
+_compute_lock = asyncio.Lock()
+
+
+def format_service_time(seconds: Optional[int]) -> Optional[str]:
+    """0時からの秒数を HH:MM に変換（24時以降は25:10のように表す）"""
+    if seconds is None:
+        return None
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}"
+
+
+async def precompute_transit_supply(service_date: date) -> Dict[str, int]:
+    """運行日の停留所別・路線別供給量を計算して保存（既存分は置き換える）"""
+    params = {"service_date": service_date}
+    async with AsyncSessionLocal() as session:
+        for table in ("transit_stop_supply", "transit_route_supply", "transit_supply_dates"):
+            await session.execute(text(f"DELETE FROM {table} WHERE service_date = :service_date"), params)
+        stop_count = (await session.execute(STOP_SUPPLY_QUERY, params)).rowcount
+        route_count = (await session.execute(ROUTE_SUPPLY_QUERY, params)).rowcount
+        await session.execute(text("""
+            INSERT INTO transit_supply_dates (service_date, stop_count, route_count)
+            VALUES (:service_date, :stop_count, :route_count)
+        """), {**params, "stop_count": stop_count, "route_count": route_count})
+        await session.commit()
+
+    logger.info(f"Transit supply computed for {service_date}: {stop_count} stops, {route_count} routes")
+    return {"stops": stop_count, "routes": route_count}
+
+
+async def ensure_transit_supply(session: AsyncSession, service_date: date):
+    """運行日が未計算なら計算する"""
+    query = text("SELECT 1 FROM transit_supply_dates WHERE service_date = :service_date")
+    if (await session.execute(query, {"service_date": service_date})).first():
+        return
+    async with _compute_lock:
+        async with AsyncSessionLocal() as check_session:
+            if (await check_session.execute(query, {"service_date": service_date})).first():
+                return
+        await precompute_transit_supply(service_date)
+
+
+async def refresh_transit_supply(days: int) -> int:
+    """GTFS更新後に計算済みの供給量を破棄し、今日から指定日数分を再計算"""
+    async with _compute_lock:
+        async with AsyncSessionLocal() as session:
+            for table in ("transit_stop_supply", "transit_route_supply", "transit_supply_dates"):
+                await session.execute(text(f"DELETE FROM {table}"))
+            await session.commit()
+        today = date.today()
+        for offset in range(days):
+            await precompute_transit_supply(today + timedelta(days=offset))
+    return days
+
+
+def _window(hourly: List[int], start_hour: int, end_hour: int) -> Dict:
+    """時間帯（start_hour〜end_hour、終端は含まない）の本数・1時間あたり本数・平均間隔"""
+    count = sum(hourly[start_hour:end_hour])
+    hours = end_hour - start_hour
+    return {
+        "count": count,
+        "per_hour": round(count / hours, 2),
+        "headway_min": round(hours * 60 / count, 1) if count else None
+    }
+
+
+async def get_stop_supply(
+    session: AsyncSession,
+    service_date: date,
+    start_hour: int = 0,
+    end_hour: int = SERVICE_HOURS,
+    north: Optional[float] = None,
+    south: Optional[float] = None,
+    east: Optional[float] = None,
+    west: Optional[float] = None,
+    limit: int = 5000
+) -> Dict:
+    """停留所別の供給量をGeoJSONで返す（時間帯内に発車のない停留所は除く）"""
+    await ensure_transit_supply(session, service_date)
+
+    query = """
+    SELECT stop_id, stop_lon, stop_lat, departures, route_count,
+           first_departure_sec, last_departure_sec, avg_headway_sec, hourly_departures
+    FROM transit_stop_supply
+    WHERE service_date = :service_date AND stop_lon IS NOT NULL AND stop_lat IS NOT NULL
+    """
+    params = {"service_date": service_date}
+    for name, column, operator, value in (
+        ("north", "stop_lat", "<=", north),
+        ("south", "stop_lat", ">=", south),
+        ("east", "stop_lon", "<=", east),
+        ("west", "stop_lon", ">=", west),
+    ):
+        if value is not None:
+            query += f" AND {column} {operator} :{name}"
+            params[name] = value
+    query += " ORDER BY departures DESC"
+
+    result = await session.execute(text(query), params)
+
+    features = []
+    for row in result.mappings():
+        window = _window(row["hourly_departures"], start_hour, end_hour)
+        if not window["count"]:
+            continue
+        features.append({
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [row["stop_lon"], row["stop_lat"]]},
+            "properties": {
+                "stop_id": row["stop_id"],
+                "departures": window["count"],
+                "departures_per_hour": window["per_hour"],
+                "headway_min": window["headway_min"],
+                "daily_departures": row["departures"],
+                "daily_headway_min": (
+                    round(row["avg_headway_sec"] / 60, 1) if row["avg_headway_sec"] is not None else None
+                ),
+                "route_count": row["route_count"],
+                "first_departure": format_service_time(row["first_departure_sec"]),
+                "last_departure": format_service_time(row["last_departure_sec"]),
+                "hourly_departures": row["hourly_departures"]
+            }
+        })
+        if len(features) >= limit:
+            break
+
+    return {
+        "type": "FeatureCollection",
+        "features": features,
+        "metadata": {
+            "service_date": service_date.isoformat(),
+            "start_hour": start_hour,
+            "end_hour": end_hour
+        }
+    }
+
+
+async def get_route_supply(
+    session: AsyncSession,
+    service_date: date,
+    start_hour: int = 0,
+    end_hour: int = SERVICE_HOURS,
+    agency: Optional[str] = None
+) -> Dict:
+    """路線別の供給量（便数の多い順、時間帯内に便のない路線は除く）"""
+    await ensure_transit_supply(session, service_date)
+
+    query = """
+    SELECT route_id, agency_id, route_short_name, route_long_name, trips, stop_count,
+           first_departure_sec, last_departure_sec, avg_headway_sec, hourly_trips
+    FROM transit_route_supply
+    WHERE service_date = :service_date
+    """
+    params = {"service_date": service_date}
+    if agency:
+        query += " AND agency_id = :agency"
+        params["agency"] = agency
+    query += " ORDER BY trips DESC, route_id"
+
+    result = await session.execute(text(query), params)
+
+    routes = []
+    for row in result.mappings():
+        window = _window(row["hourly_trips"], start_hour, end_hour)
+        if not window["count"]:
+            continue
+        routes.append({
+            "route_id": row["route_id"],
+            "agency_id": row["agency_id"],
+            "route_short_name": row["route_short_name"],
+            "route_long_name": row["route_long_name"],
+            "trips": window["count"],
+            "trips_per_hour": window["per_hour"],
+            "headway_min": window["headway_min"],
+            "daily_trips": row["trips"],
+            "daily_headway_min": (
+                round(row["avg_headway_sec"] / 60, 1) if row["avg_headway_sec"] is not None else None
+            ),
+            "stop_count": row["stop_count"],
+            "first_departure": format_service_time(row["first_departure_sec"]),
+            "last_departure": format_service_time(row["last_departure_sec"]),
+            "hourly_trips": row["hourly_trips"]
+        })
+
+    return {
+        "service_date": service_date.isoformat(),
+        "start_hour": start_hour,
+        "end_hour": end_hour,
+        "routes": routes
+    }
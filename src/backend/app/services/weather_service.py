@@ -10,6 +10,7 @@ from datetime import datetime
 from loguru import logger
 from app.core.config import settings
 from app.core.database import AsyncSessionLocal
+from app.core.http_client import http_client
 from app.models.heatmap import WeatherData
 from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -22,6 +23,8 @@ class WeatherService:
         self.api_key = settings.OPENWEATHERMAP_API_KEY
         self.base_url = "https://api.openweathermap.org/data/2.5"
         self.timeout = 10.0
+        # 接続は共有HTTPクライアントのプールを再利用し、レート制限もそちらで行う
+        self.http = http_client
     
     async def get_current_weather(self, lat: float, lon: float) -> Optional[Dict]:
         """現在の気象データを取得"""
@@ -40,14 +43,13 @@ class WeatherService:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                logger.info(f"Weather data retrieved for ({lat}, {lon})")
-                return self._parse_weather_data(data, lat, lon)
-                
+            response = await self.http.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+            
+            logger.info(f"Weather data retrieved for ({lat}, {lon})")
+            return self._parse_weather_data(data, lat, lon)
+            
         except httpx.TimeoutException:
             logger.error(f"Weather API timeout for ({lat}, {lon})")
             return None
@@ -75,19 +77,18 @@ class WeatherService:
         }
         
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                
-                forecasts = []
-                for item in data.get("list", []):
-                    forecast = self._parse_forecast_item(item, lat, lon)
-                    if forecast:
-                        forecasts.append(forecast)
-                
-                return forecasts
-                
+            response = await self.http.get(url, params=params, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.json()
+            
+            forecasts = []
+            for item in data.get("list", []):
+                forecast = self._parse_forecast_item(item, lat, lon)
+                if forecast:
+                    forecasts.append(forecast)
+            
+            return forecasts
+            
         except Exception as e:
             logger.error(f"Forecast API error: {str(e)}")
             return None
@@ -171,13 +172,14 @@ class WeatherService:
         weather_data = []
         landmarks = settings.LANDMARKS
         
-        for name, coords in landmarks.items():
-            data = await self.get_current_weather(coords["lat"], coords["lon"])
+        # 全施設を同時に要求し、APIのレート制限は共有HTTPクライアントで守る
+        results = await asyncio.gather(
+            *(self.get_current_weather(coords["lat"], coords["lon"]) for coords in landmarks.values())
+        )
+        for name, data in zip(landmarks.keys(), results):
             if data:
                 data["landmark_name"] = name
                 weather_data.append(data)
-                # レート制限対応
-                await asyncio.sleep(0.1)
         
         return weather_data
     
@@ -48,6 +48,12 @@ export const apiClient = apiService;
 export const heatmapService = {
   getHeatmapPoints: (params) => apiService.get('/api/v1/heatmap/points', params),
   getDensityGrid: (params) => apiService.get('/api/v1/heatmap/density', params),
+  // Mapbox vector source用のタイルURLテンプレート（{z}/{x}/{y}はMapboxが置換）
+  getHeatmapTileUrl: (params = {}) => {
+    const queryString = new URLSearchParams(params).toString();
+    const template = `${API_BASE_URL}/api/v1/heatmap/tiles/{z}/{x}/{y}.mvt`;
+    return queryString ? `${template}?${queryString}` : template;
+  },
   getCategories: () => apiService.get('/api/v1/heatmap/categories'),
   getStatistics: (params) => apiService.get('/api/v1/statistics/summary', params),
 };
@@ -79,10 +85,61 @@ export const eventService = {
   getImpactZones: () => apiService.get('/api/v1/events/impact-zones'),
 };
 
+// 人流バイナリ（format=binary）の列型
+const MOBILITY_COLUMN_TYPES = {
+  f4: Float32Array,
+  u4: Uint32Array,
+  u2: Uint16Array,
+  u1: Uint8Array,
+};
+
+// 人流バイナリを型付き配列の列に展開する
+// レイアウト: "UMOB" | uint32 ヘッダー長 | ヘッダーJSON | 列データ（8バイト境界）
+const decodeMobilityColumns = (buffer) => {
+  const view = new DataView(buffer);
+  const headerLength = view.getUint32(4, true);
+  const header = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer, 8, headerLength)));
+  const dataOffset = 8 + headerLength;
+  const readColumns = (columns) => Object.fromEntries(columns.map((column) => {
+    const ArrayType = MOBILITY_COLUMN_TYPES[column.dtype];
+    return [column.name, new ArrayType(buffer, dataOffset + column.offset, column.length)];
+  }));
+  return {
+    flowTypes: header.flow_types,
+    colors: header.colors,
+    flows: {
+      count: header.flows.count,
+      originNames: header.flows.origin_names,
+      destinationNames: header.flows.destination_names,
+      ...readColumns(header.flows.columns),
+    },
+    particles: {
+      count: header.particles.count,
+      ...readColumns(header.particles.columns),
+    },
+    // フローiの経路は lon/lat の offset[i]〜offset[i+1] の範囲
+    routes: header.routes ? {
+      count: header.routes.count,
+      ...readColumns(header.routes.columns),
+    } : null,
+  };
+};
+
 // 実データサービス
 export const realDataService = {
   getAccommodation: (prefecture) => apiService.get(`/api/v1/real/accommodation/real/${prefecture}`),
   getMobility: (prefecture, cityOnly = false) => apiService.get(`/api/v1/real/mobility/real/${prefecture}`, { params: { city_only: cityOnly } }),
+  // 列指向バイナリ形式で取得（大量パーティクル向け）
+  getMobilityColumns: async (prefecture, cityOnly = false) => {
+    const queryString = new URLSearchParams({ city_only: cityOnly, format: 'binary' }).toString();
+    const response = await fetch(`${API_BASE_URL}/api/v1/real/mobility/real/${prefecture}?${queryString}`);
+    if (!response.ok) {
+      throw new Error(`HTTP error! status: ${response.status}`);
+    }
+    return decodeMobilityColumns(await response.arrayBuffer());
+  },
+  // GTFSの運行形状に沿ったフロー経路（ズームに応じて簡略化）
+  getMobilityRoutes: (prefecture, zoom, cityOnly = false) => apiService.get(`/api/v1/real/mobility/real/${prefecture}/routes`, { zoom, city_only: cityOnly }),
   getEvents: (prefecture) => apiService.get(`/api/v1/real/events/real/${prefecture}`),
   getTransportGTFS: () => apiService.get('/api/v1/real/transport/gtfs/hiroshima'),
   getTourismFacilities: () => apiService.get('/api/v1/real/tourism/facilities/yamaguchi'),
@@ -4,7 +4,9 @@
 APIキーなしでも動作するデータソースをテスト
 """
 import sys
+import asyncio
 sys.path.append('../src/backend/app')
+sys.path.append('../src/backend')
 
 from data_collectors.weather_collector import WeatherCollector
 from data_collectors.event_collector import EventCollector
@@ -21,7 +23,7 @@ weather = WeatherCollector()
 # 広島市の天気を取得
 city = "広島市"
 print(f"{city}の気象データを取得中...")
-weather_data = weather.fetch_current_weather(city)
+weather_data = asyncio.run(weather.fetch_current_weather(city))
 
 if weather_data:
     print(f"✓ 取得成功")
@@ -75,5 +77,5 @@ print(json.dumps(sample_format, ensure_ascii=False, indent=2))
 print("\n=== テスト完了 ===")
 print("\n次のステップ:")
 print("1. .envファイルにAPIキーを設定")
-print("2. python main_collector.py で全データ収集を実行")
+print("2. src/backend で python -m app.data_collectors.main_collector を実行して全データ収集")
 print("3. uesugi-engine-data/raw/ フォルダに収集データが保存されます")
\ No newline at end of file